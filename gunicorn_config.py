@@ -1,4 +1,13 @@
+import os
+
 bind = "0.0.0.0:10000"
 workers = 2
+# Threads por worker: conexões SSE do painel (/admin/dashboard/stream) e
+# long-polls de /api/mesas ocupam uma thread cada, e não um worker inteiro como
+# no worker síncrono. Ambos têm limite por worker (MAX_SSE_STREAMS e
+# MAX_LONG_POLLS, padrão 4 cada) e respondem 503 acima dele, de modo que
+# sobram threads para as demais requisições.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 16))
 timeout = 120
 preload_app = True
@@ -68,7 +68,7 @@ def create_app():
         r"/api/*": {
             "origins": allowed_origins,
             "methods": ["GET", "POST", "OPTIONS", "PUT", "DELETE"],
-            "allow_headers": ["Content-Type", "Authorization"],
+            "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key"],
             "supports_credentials": True,
             "max_age": 86400
         }
@@ -1,10 +1,465 @@
-from main import app, db
+import importlib
+import os
+import random
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Permite rodar `python src/manage.py <comando>` de qualquer diretório
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_PROJETO not in sys.path:
+    sys.path.insert(0, RAIZ_PROJETO)
+
+from sqlalchemy import inspect, or_, text
+from src.main import create_app
+from src.models.user import db
+
+MODELOS = ['user', 'admin', 'pedido', 'pedido_item', 'pagamento', 'reserva', 'dashboard', 'mesa', 'idempotencia']
+
+def _carregar_modelos():
+    """Importa todos os modelos para que o metadata conheça todas as tabelas"""
+    for modelo in MODELOS:
+        importlib.import_module(f'src.models.{modelo}')
+
+def criar_app(uri=None, **config):
+    """
+    App de create_app() com o SQLAlchemy inicializado
+    
+    create_app() não configura o banco; a URI vem do argumento ou de
+    DATABASE_URL (o prefixo postgres:// do Render é convertido). Demais
+    configurações (ex.: SQLALCHEMY_ENGINE_OPTIONS) podem ser passadas por nome.
+    """
+    aplicacao = create_app()
+    aplicacao.config.update(config)
+    uri = uri or os.getenv('DATABASE_URL')
+    if not uri:
+        raise SystemExit('Defina DATABASE_URL para usar o manage.py')
+    if uri.startswith('postgres://'):
+        uri = uri.replace('postgres://', 'postgresql://', 1)
+    aplicacao.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(aplicacao)
+    _carregar_modelos()
+    return aplicacao
+
+_app = None
+
+def obter_app():
+    """App dos comandos, criado na primeira utilização (importar o módulo não exige banco)"""
+    global _app
+    if _app is None:
+        _app = criar_app()
+    return _app
 
 def create_tables():
-    with app.app_context():
+    from src.models.mesa import garantir_mesas
+    with obter_app().app_context():
         db.create_all()
+        garantir_mesas()
         print("Tabelas criadas com sucesso!")
 
-if __name__ == '__main__':
-    create_tables()
+def rebuild_counters():
+    """Recalcula os contadores do painel a partir das tabelas"""
+    from src.utils.dashboard_counters import reconstruir_contadores
+    with obter_app().app_context():
+        contadores = reconstruir_contadores()
+        print(f"Contadores do painel recalculados em {contadores.updated_at}")
+
+def rebuild_rollup():
+    """Descarta o rollup diário das séries temporais para reagregação"""
+    from src.utils.dashboard_rollup import reconstruir_rollup
+    with obter_app().app_context():
+        removidos = reconstruir_rollup()
+        print(f"Rollup diário descartado ({removidos} registros); será refeito sob demanda")
+
+def purge_idempotency():
+    """Remove chaves de idempotência com mais de 24 horas"""
+    from src.utils.idempotencia import expurgar_chaves_antigas
+    with obter_app().app_context():
+        print(f"Chaves de idempotência removidas: {expurgar_chaves_antigas()}")
+
+def _adicionar_colunas_novas(conn, inspector):
+    """ALTER TABLE ADD COLUMN para colunas dos modelos ausentes no banco"""
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existentes = {coluna['name'] for coluna in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existentes:
+                continue
+            if not column.nullable and column.server_default is None:
+                print(f"Coluna {table.name}.{column.name} é NOT NULL sem default; crie manualmente")
+                continue
+            tipo = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo}'))
+            print(f"Coluna adicionada: {table.name}.{column.name}")
+
+def _duplicatas_do_indice(index, limite=5):
+    """Grupos de valores repetidos que impedem criar o índice único (respeita o WHERE parcial)"""
+    from sqlalchemy import func, select
+    colunas = list(index.columns)
+    consulta = select(*colunas, func.count().label('total')).group_by(*colunas).having(func.count() > 1)
+    where = index.dialect_kwargs.get(f'{db.engine.dialect.name}_where')
+    if where is not None:
+        consulta = consulta.where(where)
+    return db.session.execute(consulta.limit(limite)).all()
+
+def _criar_indices_novos():
+    """
+    Cria os índices declarados nos modelos que ainda não existem
+    
+    As rotas dependem dos índices únicos (ex.: um pedido pendente por usuário)
+    para impedir duplicatas, então linhas que os violam são listadas e o índice
+    entra nas falhas em vez de ser ignorado.
+    
+    Returns:
+        list: nomes dos índices únicos que não puderam ser criados
+    """
+    falhas = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.unique:
+                duplicatas = _duplicatas_do_indice(index)
+                if duplicatas:
+                    print(f"Índice único {index.name} não criado: valores repetidos em {table.name}")
+                    for linha in duplicatas:
+                        *valores, total = linha
+                        print(f"  {', '.join(map(str, valores))}: {total} linhas")
+                    falhas.append(index.name)
+                    continue
+            try:
+                index.create(db.engine, checkfirst=True)
+            except Exception as e:
+                print(f"Falha ao criar índice {index.name}: {e}")
+                if index.unique:
+                    falhas.append(index.name)
+    return falhas
+
+def _backfill_nome_busca(lote=500):
+    """Preenche a coluna de busca normalizada dos usuários antigos"""
+    from src.models.user import User
+    from src.utils.busca import normalizar_texto
+    total = 0
+    while True:
+        usuarios = User.query.filter(User.nome_busca.is_(None)).limit(lote).all()
+        if not usuarios:
+            break
+        for user in usuarios:
+            user.nome_busca = normalizar_texto(f'{user.nome_completo} {user.email}')
+        db.session.commit()
+        total += len(usuarios)
+    print(f"Busca normalizada preenchida para {total} usuários")
+
+def _backfill_pedido_itens(lote=500):
+    """Cria os itens (tamanho, quantidade) dos pedidos antigos a partir de camisas_json"""
+    from sqlalchemy import insert, select
+    from src.models.pedido import Pedido
+    from src.models.pedido_item import PedidoItem, itens_de_camisas
+    ultimo_id = 0
+    pedidos_total = itens_total = 0
+    while True:
+        pedidos = db.session.execute(
+            select(Pedido.id, Pedido.camisas_json)
+            .where(Pedido.id > ultimo_id, ~select(PedidoItem.id).where(PedidoItem.pedido_id == Pedido.id).exists())
+            .order_by(Pedido.id)
+            .limit(lote)
+        ).all()
+        if not pedidos:
+            break
+        itens = [
+            {'pedido_id': pedido.id, 'tamanho': tamanho, 'quantidade': quantidade}
+            for pedido in pedidos
+            for tamanho, quantidade in itens_de_camisas(pedido.camisas_json)
+        ]
+        if itens:
+            db.session.execute(insert(PedidoItem), itens)
+        db.session.commit()
+        ultimo_id = pedidos[-1].id
+        pedidos_total += len(pedidos)
+        itens_total += len(itens)
+    print(f"Itens criados: {itens_total} para {pedidos_total} pedidos")
+
+def _backfill_comprovantes_legados(lote=100):
+    """
+    Move para o storage endereçado por conteúdo os comprovantes antigos
 
+    Antes, o arquivo ficava em uploads/comprovantes/<comprovante_filename>
+    (pasta configurável por COMPROVANTES_LEGADOS) e não havia chave. O arquivo
+    antigo é mantido; o nome continua como nome de download e a miniatura
+    fica pendente para o generate_previews.
+    """
+    from src.models.pagamento import Pagamento
+    from src.utils.storage import armazenar
+    pasta = os.getenv('COMPROVANTES_LEGADOS', os.path.join(RAIZ_PROJETO, 'uploads', 'comprovantes'))
+    ultimo_id = migrados = ausentes = 0
+    while True:
+        pagamentos = Pagamento.query.filter(
+            Pagamento.id > ultimo_id,
+            Pagamento.comprovante_chave.is_(None),
+            Pagamento.comprovante_filename.isnot(None)
+        ).order_by(Pagamento.id).limit(lote).all()
+        if not pagamentos:
+            break
+        for pagamento in pagamentos:
+            caminho = os.path.join(pasta, os.path.basename(pagamento.comprovante_filename))
+            if not os.path.isfile(caminho):
+                ausentes += 1
+                print(f"Comprovante do pagamento {pagamento.id} não encontrado: {caminho}")
+                continue
+            extensao = pagamento.comprovante_filename.rsplit('.', 1)[-1].lower()
+            with open(caminho, 'rb') as legado:
+                arquivo = armazenar(legado, extensao)
+            pagamento.comprovante_chave = arquivo.chave
+            pagamento.comprovante_sha256 = arquivo.sha256
+            pagamento.comprovante_content_type = arquivo.content_type
+            pagamento.comprovante_tamanho = arquivo.tamanho
+            pagamento.preview_status = 'pendente'
+            migrados += 1
+        db.session.commit()
+        ultimo_id = pagamentos[-1].id
+    print(f"Comprovantes antigos migrados: {migrados} ({ausentes} sem arquivo)")
+
+def _normalizar_versao_mesas(conn):
+    """mesas.versao passou a ser NOT NULL DEFAULT 0 (era anulável)"""
+    conn.execute(text('UPDATE mesas SET versao = 0 WHERE versao IS NULL'))
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('ALTER TABLE mesas ALTER COLUMN versao SET DEFAULT 0'))
+        conn.execute(text('ALTER TABLE mesas ALTER COLUMN versao SET NOT NULL'))
+
+def backfill_pedido_itens():
+    """Preenche pedido_itens para pedidos criados antes da tabela"""
+    with obter_app().app_context():
+        db.create_all()
+        _backfill_pedido_itens()
+
+def migrate():
+    """Aplica ao banco existente as tabelas, colunas e índices novos dos modelos"""
+    with obter_app().app_context():
+        with db.engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            _adicionar_colunas_novas(conn, inspect(conn))
+        db.create_all()
+        with db.engine.begin() as conn:
+            _normalizar_versao_mesas(conn)
+        indices_faltando = _criar_indices_novos()
+        _backfill_nome_busca()
+        _backfill_pedido_itens()
+        _backfill_comprovantes_legados()
+        # O inventário de mesas e a linha de mesas_versao são cadastrados aqui,
+        # não na primeira leitura de /api/mesas
+        from src.models.mesa import garantir_mesas
+        print(f"Mesas cadastradas: {garantir_mesas()} novas")
+        # Idem para a linha de contadores: sem ela os ajustes incrementais
+        # (UPDATE ... WHERE id = 1) não alteram nada até a primeira leitura
+        from src.models.dashboard import DashboardCounters
+        from src.utils.dashboard_counters import COUNTERS_ID, reconstruir_contadores
+        if db.session.get(DashboardCounters, COUNTERS_ID) is None:
+            reconstruir_contadores()
+            print("Contadores do painel calculados")
+        if indices_faltando:
+            raise SystemExit(
+                f"Migração incompleta: corrija as duplicatas e rode de novo ({', '.join(indices_faltando)})"
+            )
+        print("Migração concluída!")
+
+def _consultas_principais():
+    """Consultas representativas das rotas mais acessadas"""
+    from sqlalchemy import select, func
+    from src.models.user import User
+    from src.models.admin import AuditLog
+    from src.models.pedido import Pedido
+    from src.models.pagamento import Pagamento
+    from src.models.reserva import Reserva
+    return {
+        'token_required (usuário atual)': select(User).where(User.id == 1),
+        'criar_pedido (pedido pendente)': select(Pedido).where(Pedido.usuario_id == 1, Pedido.status == 'pendente'),
+        'listar_pedidos': select(Pedido).where(Pedido.usuario_id == 1).order_by(Pedido.data_pedido.desc()),
+        'listar_pagamentos': select(Pagamento).where(Pagamento.usuario_id == 1).order_by(Pagamento.data_pagamento.desc()),
+        'criar_reserva (mesa ocupada)': select(Reserva).where(Reserva.mesa_numero == 'VIP-01', Reserva.status == 'confirmada'),
+        'obter_minha_reserva': select(Reserva).where(Reserva.usuario_id == 1, Reserva.status == 'confirmada'),
+        'get_audit_logs (por admin)': select(AuditLog).where(AuditLog.admin_id == 1).order_by(AuditLog.timestamp.desc()).limit(50),
+        'get_pedidos (cursor)': select(Pedido).order_by(Pedido.data_pedido.desc(), Pedido.id.desc()).limit(21),
+        'usuarios ativos por descendência': select(func.count(User.id)).where(User.descendencia == 'veras', User.is_active == True),
+    }
+
+def explain():
+    """Imprime o plano de execução das consultas principais"""
+    with obter_app().app_context():
+        with db.engine.connect() as conn:
+            prefixo = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+            for nome, stmt in _consultas_principais().items():
+                compilado = stmt.compile(dialect=conn.dialect)
+                if compilado.positiontup:
+                    params = tuple(compilado.params[chave] for chave in compilado.positiontup)
+                else:
+                    params = compilado.params
+                print(f"\n== {nome}")
+                for linha in conn.exec_driver_sql(prefixo + str(compilado), params):
+                    print('   ', ' | '.join(str(coluna) for coluna in linha))
+
+def executar_loadtest_reservas(uri, requisicoes=300, mesas_alvo=3, threads=50):
+    """
+    Dispara reservas simultâneas contra as primeiras `mesas_alvo` mesas
+    
+    O banco em `uri` é recriado do zero. O app vem de create_app(), como em
+    produção, com apenas o blueprint de reservas registrado.
+    
+    Returns:
+        dict: status (código HTTP de cada requisição), por_mesa (reservas
+        confirmadas por mesa) e mesas (números das mesas disputadas)
+    """
+    from sqlalchemy import func
+    from src.models.user import User
+    from src.models.reserva import Reserva
+    from src.models.mesa import Mesa, garantir_mesas
+    from src.routes.auth import generate_token
+    from src.routes.reservas import reservas_bp
+    
+    if uri.startswith(('postgres://', 'postgresql://')):
+        opcoes = {'pool_size': threads}
+    else:
+        opcoes = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    teste = criar_app(uri, SQLALCHEMY_ENGINE_OPTIONS=opcoes)
+    teste.register_blueprint(reservas_bp)
+    
+    with teste.app_context():
+        db.drop_all()
+        db.create_all()
+        garantir_mesas()
+        alvos = [mesa.to_dict() for mesa in Mesa.query.order_by(Mesa.ordem).limit(mesas_alvo)]
+        usuarios = [
+            User(nome_completo=f'Carga {n}', email=f'carga{n}@loadtest.local', password_hash='-',
+                 descendencia='veras', idade=30, cidade_residencia='Mossoró')
+            for n in range(requisicoes)
+        ]
+        db.session.add_all(usuarios)
+        db.session.commit()
+        tokens = [generate_token(user.id) for user in usuarios]
+    
+    largada = threading.Barrier(min(threads, requisicoes))
+    
+    def reservar(n):
+        if n < largada.parties:
+            largada.wait()
+        mesa = random.choice(alvos)
+        with teste.test_client() as client:
+            resposta = client.post('/api/reservas', json={
+                'mesa_numero': mesa['numero'],
+                'mesa_tipo': mesa['tipo'],
+                'mesa_capacidade': mesa['capacidade'],
+                'mesa_localizacao': mesa['localizacao']
+            }, headers={'Authorization': f'Bearer {tokens[n]}'})
+            return resposta.status_code
+    
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        status = list(pool.map(reservar, range(requisicoes)))
+    
+    with teste.app_context():
+        por_mesa = dict(
+            db.session.query(Reserva.mesa_numero, func.count(Reserva.id))
+            .filter_by(status='confirmada').group_by(Reserva.mesa_numero)
+        )
+        db.session.remove()
+        db.engine.dispose()
+    
+    return {'status': status, 'por_mesa': por_mesa, 'mesas': [mesa['numero'] for mesa in alvos]}
+
+def loadtest_reservas(requisicoes=300, mesas_alvo=3, threads=50):
+    """
+    Dispara reservas simultâneas contra poucas mesas e verifica que nenhuma
+    mesa termina com mais de uma reserva confirmada.
+    
+    Usa LOADTEST_DATABASE_URL (ex.: um PostgreSQL descartável) ou, se ausente,
+    um SQLite temporário. Nunca aponte para o banco de produção.
+    """
+    uri = os.getenv('LOADTEST_DATABASE_URL') or f"sqlite:///{tempfile.mkdtemp()}/loadtest.db"
+    resultado = executar_loadtest_reservas(uri, requisicoes, mesas_alvo, threads)
+    status, por_mesa = resultado['status'], resultado['por_mesa']
+    
+    duplicadas = {numero: total for numero, total in por_mesa.items() if total > 1}
+    print(f"Requisições: {requisicoes} em {threads} threads contra {len(resultado['mesas'])} mesas")
+    print(f"Respostas: {', '.join(f'{codigo}={status.count(codigo)}' for codigo in sorted(set(status)))}")
+    print(f"Reservas confirmadas por mesa: {por_mesa}")
+    if duplicadas:
+        print(f"FALHA: mesas com reserva dupla: {duplicadas}")
+        sys.exit(1)
+    print("OK: nenhuma reserva dupla")
+
+def generate_previews():
+    """Gera previews pendentes ou ausentes de comprovantes já enviados"""
+    from src.models.pagamento import Pagamento
+    from src.utils.previews import gerar_preview
+    with obter_app().app_context():
+        ids = [
+            pagamento_id for (pagamento_id,) in db.session.query(Pagamento.id).filter(
+                Pagamento.comprovante_chave.isnot(None),
+                or_(Pagamento.preview_status.is_(None), Pagamento.preview_status.in_(['pendente', 'erro']))
+            )
+        ]
+        resultados = [gerar_preview(pagamento_id) for pagamento_id in ids]
+        print(f"Previews processados: {len(ids)} ({', '.join(f'{s}={resultados.count(s)}' for s in sorted(set(map(str, resultados))))})")
+
+def benchmark_status(requisicoes=2000):
+    """
+    Mede requisições por segundo de /status sem e com o microcache,
+    atendendo uma requisição por vez como um worker síncrono.
+    
+    Chama o app WSGI em processo com um environ pronto, sem rede nem banco
+    de dados, para que o custo do cliente de teste não esconda a diferença.
+    As rotas de preço não entram na comparação: já são servidas de corpos
+    pré-serializados, sem microcache.
+    """
+    import time
+    from flask import Flask
+    from werkzeug.test import EnvironBuilder
+    from src.routes.status import status_bp
+    from src.utils.cache import public_cache
+    
+    teste = Flask(__name__)
+    teste.register_blueprint(status_bp)
+    rota = '/status'
+    environ = EnvironBuilder(path=rota).get_environ()
+    ttl_configurado = public_cache.ttl
+    
+    def atender():
+        b''.join(teste.wsgi_app(dict(environ), lambda status, headers, exc_info=None: None))
+    
+    resultados = {}
+    try:
+        for modo, ttl in (('sem microcache', 0), ('com microcache', ttl_configurado or 2)):
+            public_cache.ttl = ttl
+            public_cache.invalidate()
+            atender()  # aquecimento
+            inicio = time.perf_counter()
+            for _ in range(requisicoes):
+                atender()
+            resultados[modo] = requisicoes / (time.perf_counter() - inicio)
+    finally:
+        # O TTL é global do processo: devolve a configuração original
+        public_cache.ttl = ttl_configurado
+        public_cache.invalidate()
+    
+    antes, depois = resultados['sem microcache'], resultados['com microcache']
+    print(f"{requisicoes} requisições sequenciais")
+    print(f"{rota:<20} sem microcache: {antes:8.0f} req/s   com microcache: {depois:8.0f} req/s   ({depois / antes:.1f}x)")
+
+COMMANDS = {
+    'backfill_pedido_itens': backfill_pedido_itens,
+    'benchmark_status': benchmark_status,
+    'create_tables': create_tables,
+    'migrate': migrate,
+    'explain': explain,
+    'generate_previews': generate_previews,
+    'loadtest_reservas': loadtest_reservas,
+    'purge_idempotency': purge_idempotency,
+    'rebuild_counters': rebuild_counters,
+    'rebuild_rollup': rebuild_rollup
+}
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'create_tables'
+    if command not in COMMANDS:
+        print(f"Comando desconhecido: {command}. Opções: {', '.join(COMMANDS)}")
+        sys.exit(1)
+    COMMANDS[command]()
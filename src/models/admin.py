@@ -1,5 +1,6 @@
 from datetime import datetime
 from src.models.user import db
+from src.utils.password_hashing import gerar_hash, verificar_senha
 
 class Admin(db.Model):
     __tablename__ = 'admins'
@@ -19,13 +20,11 @@ class Admin(db.Model):
     
     def set_password(self, password):
         """Define a senha do administrador com hash"""
-        from werkzeug.security import generate_password_hash
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = gerar_hash(password)
     
     def check_password(self, password):
         """Verifica se a senha está correta"""
-        from werkzeug.security import check_password_hash
-        return check_password_hash(self.password_hash, password)
+        return verificar_senha(self.password_hash, password)
     
     def to_dict(self):
         """Converte o objeto para dicionário"""
@@ -57,6 +56,11 @@ class AuditLog(db.Model):
     # Relacionamento
     admin = db.relationship('Admin', backref='audit_logs')
     
+    __table_args__ = (
+        db.Index('ix_audit_logs_admin_timestamp', 'admin_id', 'timestamp'),
+        db.Index('ix_audit_logs_timestamp_id', 'timestamp', 'id'),
+    )
+    
     def __repr__(self):
         return f'<AuditLog {self.acao} by Admin {self.admin_id}>'
     
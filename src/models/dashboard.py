@@ -0,0 +1,56 @@
+from datetime import datetime
+from src.models.user import db
+
+class DashboardCounters(db.Model):
+    __tablename__ = 'dashboard_counters'
+    
+    # Tabela de linha única (id = 1), mantida pelas rotas de escrita
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Usuários ativos
+    usuarios_ativos = db.Column(db.Integer, nullable=False, default=0)
+    usuarios_veras = db.Column(db.Integer, nullable=False, default=0)
+    usuarios_saldanha = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Pedidos por status
+    pedidos_total = db.Column(db.Integer, nullable=False, default=0)
+    pedidos_pendentes = db.Column(db.Integer, nullable=False, default=0)
+    pedidos_pagos = db.Column(db.Integer, nullable=False, default=0)
+    pedidos_confirmados = db.Column(db.Integer, nullable=False, default=0)
+    pedidos_cancelados = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Vendas (pedidos pagos ou confirmados)
+    receita_total = db.Column(db.Float, nullable=False, default=0)
+    camisas_vendidas = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Reservas confirmadas por tipo de mesa
+    reservas_confirmadas = db.Column(db.Integer, nullable=False, default=0)
+    reservas_vip = db.Column(db.Integer, nullable=False, default=0)
+    reservas_premium = db.Column(db.Integer, nullable=False, default=0)
+    reservas_standard = db.Column(db.Integer, nullable=False, default=0)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DashboardCounters atualizado em {self.updated_at}>'
+
+class DashboardDailyRollup(db.Model):
+    __tablename__ = 'dashboard_daily_rollup'
+    
+    # Um registro por métrica e dia (UTC); dias fechados nunca são recalculados
+    metrica = db.Column(db.String(20), primary_key=True)  # cadastros, pedidos, receita
+    dia = db.Column(db.Date, primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    valor = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DashboardDailyRollup {self.metrica} {self.dia}>'
+    
+    def to_dict(self):
+        return {
+            'metrica': self.metrica,
+            'dia': self.dia.isoformat(),
+            'quantidade': self.quantidade,
+            'valor': self.valor
+        }
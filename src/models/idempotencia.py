@@ -0,0 +1,28 @@
+from datetime import datetime
+from src.models.user import db
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    chave = db.Column(db.String(100), nullable=False)  # valor do header Idempotency-Key
+    rota = db.Column(db.String(100), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # SHA-256 de método, rota e corpo
+    
+    # processando -> concluido
+    status = db.Column(db.String(20), nullable=False, default='processando')
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    response_content_type = db.Column(db.String(100), nullable=True)
+    
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'chave', name='uq_idempotency_usuario_chave'),
+        db.Index('ix_idempotency_created_at', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.chave} - Usuario {self.usuario_id} - {self.status}>'
@@ -0,0 +1,80 @@
+from src.models.user import db
+
+# Inventário inicial de mesas do evento
+MESAS_PADRAO = [
+    # Mesas VIP
+    {'numero': 'VIP-01', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
+    {'numero': 'VIP-02', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
+    {'numero': 'VIP-03', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
+    {'numero': 'VIP-04', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
+    
+    # Mesas Premium
+    {'numero': 'P-01', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
+    {'numero': 'P-02', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
+    {'numero': 'P-03', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
+    {'numero': 'P-04', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
+    {'numero': 'P-05', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
+    {'numero': 'P-06', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
+    
+    # Mesas Standard
+    {'numero': 'S-01', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-02', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-03', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-04', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-05', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-06', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-07', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+    {'numero': 'S-08', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
+]
+
+class Mesa(db.Model):
+    __tablename__ = 'mesas'
+    
+    # O número da mesa é a chave primária: busca O(1) pelo índice da PK
+    numero = db.Column(db.String(20), primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # VIP, Premium, Standard
+    capacidade = db.Column(db.Integer, nullable=False)
+    localizacao = db.Column(db.String(100), nullable=False)
+    ordem = db.Column(db.Integer, nullable=False, default=0)  # ordem de exibição
+    versao = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # versão em que a disponibilidade mudou
+    
+    def __repr__(self):
+        return f'<Mesa {self.numero} - {self.tipo}>'
+    
+    def to_dict(self):
+        return {
+            'numero': self.numero,
+            'tipo': self.tipo,
+            'capacidade': self.capacidade,
+            'localizacao': self.localizacao
+        }
+
+class MesasVersao(db.Model):
+    __tablename__ = 'mesas_versao'
+    
+    # Linha única (id = 1) incrementada a cada reserva ou cancelamento
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<MesasVersao {self.versao}>'
+
+def garantir_mesas():
+    """
+    Cadastra as mesas do inventário padrão que ainda não existem
+    
+    Returns:
+        int: quantidade de mesas inseridas
+    """
+    existentes = {numero for (numero,) in db.session.query(Mesa.numero)}
+    novas = [
+        Mesa(ordem=posicao, **mesa)
+        for posicao, mesa in enumerate(MESAS_PADRAO)
+        if mesa['numero'] not in existentes
+    ]
+    if novas:
+        db.session.add_all(novas)
+    if db.session.get(MesasVersao, 1) is None:
+        db.session.add(MesasVersao(id=1, versao=0))
+    db.session.commit()
+    return len(novas)
@@ -15,7 +15,16 @@ class Pagamento(db.Model):
     
     # Dados específicos do PIX
     pix_pagamentos_json = db.Column(db.Text, nullable=True)  # JSON com múltiplos pagamentos PIX
-    comprovante_filename = db.Column(db.String(255), nullable=True)
+    comprovante_filename = db.Column(db.String(255), nullable=True)  # nome original enviado
+    comprovante_chave = db.Column(db.String(120), nullable=True)  # chave no storage (ab/cd/<sha256>.ext)
+    comprovante_sha256 = db.Column(db.String(64), nullable=True)
+    comprovante_content_type = db.Column(db.String(50), nullable=True)
+    comprovante_tamanho = db.Column(db.Integer, nullable=True)
+    
+    # Miniatura WebP gerada em segundo plano (src/utils/previews.py)
+    preview_chave = db.Column(db.String(120), nullable=True)
+    preview_status = db.Column(db.String(20), nullable=True)  # pendente, pronto, erro, indisponivel
+    preview_gerado_em = db.Column(db.DateTime, nullable=True)
     
     # Dados específicos do cartão
     parcelas = db.Column(db.Integer, nullable=True)
@@ -28,6 +37,12 @@ class Pagamento(db.Model):
     # Relacionamentos
     usuario = db.relationship('User', backref=db.backref('pagamentos', lazy=True))
     
+    __table_args__ = (
+        db.Index('ix_pagamentos_usuario_data', 'usuario_id', 'data_pagamento'),
+        db.Index('ix_pagamentos_pedido', 'pedido_id'),
+        db.Index('ix_pagamentos_data_confirmacao', 'data_confirmacao'),
+    )
+    
     def __repr__(self):
         return f'<Pagamento {self.id} - {self.metodo_pagamento} - R$ {self.valor}>'
     
@@ -41,6 +56,9 @@ class Pagamento(db.Model):
             'status': self.status,
             'pix_pagamentos_json': self.pix_pagamentos_json,
             'comprovante_filename': self.comprovante_filename,
+            'comprovante_sha256': self.comprovante_sha256,
+            'comprovante_tamanho': self.comprovante_tamanho,
+            'preview_status': self.preview_status,
             'parcelas': self.parcelas,
             'valor_parcela': self.valor_parcela,
             'data_pagamento': self.data_pagamento.isoformat() if self.data_pagamento else None,
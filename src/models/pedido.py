@@ -22,11 +22,22 @@ class Pedido(db.Model):
     usuario = db.relationship('User', backref=db.backref('pedidos', lazy=True))
     pagamentos = db.relationship('Pagamento', backref='pedido', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_pedidos_usuario_status', 'usuario_id', 'status'),
+        db.Index('ix_pedidos_data_pedido_id', 'data_pedido', 'id'),
+        # No máximo um pedido pendente por usuário
+        db.Index(
+            'uq_pedidos_usuario_pendente', 'usuario_id', unique=True,
+            postgresql_where=db.text("status = 'pendente'"),
+            sqlite_where=db.text("status = 'pendente'")
+        ),
+    )
+    
     def __repr__(self):
         return f'<Pedido {self.id} - Usuario {self.usuario_id} - R$ {self.valor_total}>'
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_usuario=True):
+        dados = {
             'id': self.id,
             'usuario_id': self.usuario_id,
             'total_camisas': self.total_camisas,
@@ -35,7 +46,9 @@ class Pedido(db.Model):
             'camisas_json': self.camisas_json,
             'status': self.status,
             'data_pedido': self.data_pedido.isoformat() if self.data_pedido else None,
-            'data_pagamento': self.data_pagamento.isoformat() if self.data_pagamento else None,
-            'usuario': self.usuario.to_dict() if self.usuario else None
+            'data_pagamento': self.data_pagamento.isoformat() if self.data_pagamento else None
         }
+        if include_usuario:
+            dados['usuario'] = self.usuario.to_dict() if self.usuario else None
+        return dados
 
@@ -0,0 +1,65 @@
+import json
+from src.models.user import db
+
+class PedidoItem(db.Model):
+    __tablename__ = 'pedido_itens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pedido_id = db.Column(db.Integer, db.ForeignKey('pedidos.id', ondelete='CASCADE'), nullable=False)
+    
+    tamanho = db.Column(db.String(10), nullable=False)  # P, M, G, GG...
+    quantidade = db.Column(db.Integer, nullable=False, default=1)
+    
+    # Pedidos em grupo (família): para quem é a camisa e quanto custou
+    nome = db.Column(db.String(200), nullable=True)
+    idade = db.Column(db.Integer, nullable=True)
+    preco_unitario = db.Column(db.Float, nullable=True)
+    
+    # Relacionamentos
+    pedido = db.relationship('Pedido', backref=db.backref('itens', lazy=True, cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.Index('ix_pedido_itens_pedido', 'pedido_id'),
+        db.Index('ix_pedido_itens_tamanho', 'tamanho'),
+    )
+    
+    def __repr__(self):
+        return f'<PedidoItem {self.quantidade}x {self.tamanho} - Pedido {self.pedido_id}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pedido_id': self.pedido_id,
+            'tamanho': self.tamanho,
+            'quantidade': self.quantidade,
+            'nome': self.nome,
+            'idade': self.idade,
+            'preco_unitario': self.preco_unitario
+        }
+
+def itens_de_camisas(camisas):
+    """
+    Converte o mapa {tamanho: quantidade} de camisas_json em pares válidos
+    
+    Aceita o dict ou o texto JSON; ignora quantidades zeradas ou não numéricas.
+    
+    Returns:
+        list: [(tamanho, quantidade), ...]
+    """
+    if isinstance(camisas, str):
+        try:
+            camisas = json.loads(camisas)
+        except ValueError:
+            return []
+    if not isinstance(camisas, dict):
+        return []
+    
+    itens = []
+    for tamanho, quantidade in camisas.items():
+        try:
+            quantidade = int(quantidade)
+        except (TypeError, ValueError):
+            continue
+        if quantidade > 0:
+            itens.append((str(tamanho).strip().upper()[:10], quantidade))
+    return itens
@@ -21,11 +21,28 @@ class Reserva(db.Model):
     # Relacionamentos
     usuario = db.relationship('User', backref=db.backref('reservas', lazy=True))
     
+    __table_args__ = (
+        db.Index('ix_reservas_usuario_status', 'usuario_id', 'status'),
+        db.Index('ix_reservas_mesa_status', 'mesa_numero', 'status'),
+        db.Index('ix_reservas_data_reserva_id', 'data_reserva', 'id'),
+        # No máximo uma reserva confirmada por mesa e por usuário
+        db.Index(
+            'uq_reservas_mesa_confirmada', 'mesa_numero', unique=True,
+            postgresql_where=db.text("status = 'confirmada'"),
+            sqlite_where=db.text("status = 'confirmada'")
+        ),
+        db.Index(
+            'uq_reservas_usuario_confirmada', 'usuario_id', unique=True,
+            postgresql_where=db.text("status = 'confirmada'"),
+            sqlite_where=db.text("status = 'confirmada'")
+        ),
+    )
+    
     def __repr__(self):
         return f'<Reserva {self.id} - Mesa {self.mesa_numero} - Usuario {self.usuario_id}>'
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_usuario=True):
+        dados = {
             'id': self.id,
             'usuario_id': self.usuario_id,
             'mesa_numero': self.mesa_numero,
@@ -34,7 +51,9 @@ class Reserva(db.Model):
             'mesa_localizacao': self.mesa_localizacao,
             'status': self.status,
             'data_reserva': self.data_reserva.isoformat() if self.data_reserva else None,
-            'data_cancelamento': self.data_cancelamento.isoformat() if self.data_cancelamento else None,
-            'usuario': self.usuario.to_dict() if self.usuario else None
+            'data_cancelamento': self.data_cancelamento.isoformat() if self.data_cancelamento else None
         }
+        if include_usuario:
+            dados['usuario'] = self.usuario.to_dict() if self.usuario else None
+        return dados
 
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import DDL, event
+from src.utils.busca import normalizar_texto
+from src.utils.password_hashing import gerar_hash, verificar_senha
 
 db = SQLAlchemy()
 
@@ -16,17 +18,28 @@ class User(db.Model):
     cidade_residencia = db.Column(db.String(100), nullable=False)  # cidade onde reside
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    nome_busca = db.Column(db.String(330), nullable=True)  # nome + email sem acentos, para busca
+
+    __table_args__ = (
+        db.Index('ix_users_descendencia_ativo', 'descendencia', 'is_active'),
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        # Trigramas no PostgreSQL aceleram LIKE '%termo%'; nos demais bancos vira índice comum
+        db.Index(
+            'ix_users_nome_busca_trgm', 'nome_busca',
+            postgresql_using='gin', postgresql_ops={'nome_busca': 'gin_trgm_ops'}
+        ),
+    )
 
     def __repr__(self):
         return f'<User {self.nome_completo}>'
 
     def set_password(self, password):
         """Define a senha do usuário com hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = gerar_hash(password)
 
     def check_password(self, password):
         """Verifica se a senha está correta"""
-        return check_password_hash(self.password_hash, password)
+        return verificar_senha(self.password_hash, password)
 
     def to_dict(self):
         return {
@@ -39,3 +52,15 @@ class User(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'is_active': self.is_active
         }
+
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def atualizar_nome_busca(mapper, connection, target):
+    """Mantém a coluna de busca normalizada sincronizada com nome e email"""
+    target.nome_busca = normalizar_texto(f'{target.nome_completo or ""} {target.email or ""}')
+
+# A extensão pg_trgm precisa existir antes do índice GIN
+event.listen(
+    User.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
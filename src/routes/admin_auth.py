@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import db
 from src.models.admin import Admin, AuditLog
+from src.utils.principal import carregar_admin
+from src.utils.password_hashing import HashingBusy, precisa_rehash, registrar_rehash
 import jwt
 import datetime
 import re
@@ -25,6 +27,7 @@ def generate_admin_token(admin_id):
     payload = {
         'admin_id': admin_id,
         'type': 'admin',
+        'iat': datetime.datetime.utcnow(),
         'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=8)  # Token válido por 8 horas
     }
     return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
@@ -55,8 +58,8 @@ def admin_token_required(f):
             if token_type != 'admin':
                 return jsonify({'error': 'Token não é administrativo'}), 401
             
-            # Buscar administrador
-            current_admin = Admin.query.get(admin_id)
+            # Buscar administrador (retrato em cache por admin_id e iat)
+            current_admin = carregar_admin(admin_id, payload.get('iat'))
             if not current_admin or not current_admin.is_active:
                 return jsonify({'error': 'Token administrativo inválido'}), 401
                 
@@ -72,8 +75,8 @@ def admin_token_required(f):
     return decorated
 
 def log_admin_action(admin_id, acao, descricao, tabela_afetada=None, registro_id=None, 
-                    dados_anteriores=None, dados_novos=None):
-    """Registra ação administrativa no log de auditoria"""
+                    dados_anteriores=None, dados_novos=None, commit=True):
+    """Registra ação administrativa no log de auditoria (commit=False: na transação corrente)"""
     try:
         import json
         
@@ -90,7 +93,8 @@ def log_admin_action(admin_id, acao, descricao, tabela_afetada=None, registro_id
         )
         
         db.session.add(log)
-        db.session.commit()
+        if commit:
+            db.session.commit()
     except Exception as e:
         print(f"Erro ao registrar log de auditoria: {e}")
 
@@ -115,8 +119,11 @@ def admin_login():
         if not admin.is_active:
             return jsonify({'error': 'Conta administrativa desativada'}), 401
         
-        # Atualizar último login
+        # Atualizar último login (e o hash, se gerado com parâmetros antigos)
         admin.last_login = datetime.datetime.utcnow()
+        if precisa_rehash(admin.password_hash):
+            admin.set_password(password)
+            registrar_rehash()
         db.session.commit()
         
         # Registrar login no log
@@ -135,6 +142,8 @@ def admin_login():
             'token': token
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
@@ -239,6 +248,9 @@ def create_admin(current_admin):
             'admin': admin.to_dict()
         }), 201
         
+    except HashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -1,52 +1,79 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, case, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, raiseload
 from src.models.user import db, User
 from src.models.admin import Admin, AuditLog
 from src.models.pedido import Pedido
+from src.models.pedido_item import PedidoItem
 from src.models.pagamento import Pagamento
 from src.models.reserva import Reserva
 from src.routes.admin_auth import admin_token_required, log_admin_action
+from src.utils.dashboard_counters import (
+    obter_contadores, contar_atividade_recente, registrar_usuario, registrar_usuarios,
+    registrar_mudanca_status_pedido, registrar_reserva, transicionar, COLUNA_STATUS_PEDIDO, STATUS_PAGOS
+)
+from src.utils.cache import admin_cache, public_cache, cached_admin_view, invalidate_admin_cache
+from src.utils.dashboard_rollup import METRICAS, GRANULARIDADES, serie
+from src.utils.pagination import keyset_page
+from src.utils.busca import termos_busca
+from src.utils.principal import principal_cache, invalidar_usuario
+from src.utils import password_hashing, previews
+from src.utils.disponibilidade import marcar_mesa_alterada
+from src.utils.eventos import broker, iniciar_listener, publicar, publicar_lote, stream_sse, StreamsBusy
+from src.utils.lote import MAX_LOTE, ids_do_corpo, atualizar_status_pedidos, registrar_auditoria_lote
+from src.utils.db_errors import violou_restricao
 import json
 
 admin_dashboard_bp = Blueprint('admin_dashboard', __name__)
 
+STATUS_PEDIDO = tuple(COLUNA_STATUS_PEDIDO)
+
+def _filtro_busca_usuario(search):
+    """Filtro sem acentos sobre nome e email (todas as palavras devem casar)"""
+    return and_(*[User.nome_busca.contains(termo, autoescape=True) for termo in termos_busca(search)])
+
+def _ranking_busca_usuario(search):
+    """Ordenação por relevância: início do nome, início de palavra, demais"""
+    termo = termos_busca(search)[0]
+    ordem = [case(
+        (User.nome_busca.startswith(termo, autoescape=True), 0),
+        (User.nome_busca.contains(f' {termo}', autoescape=True), 1),
+        else_=2
+    )]
+    if db.engine.dialect.name == 'postgresql':
+        ordem.append(func.similarity(User.nome_busca, ' '.join(termos_busca(search))).desc())
+    return ordem
+
+def _filtro_busca_dono(coluna_usuario_id, search):
+    """Filtra pedidos/reservas pelo nome ou email do dono"""
+    return coluna_usuario_id.in_(select(User.id).where(_filtro_busca_usuario(search)))
+
+def _cursor_response(chave, pagina):
+    """Resposta padrão das listagens paginadas por cursor"""
+    return jsonify({
+        chave: pagina['items'],
+        'next_cursor': pagina['next_cursor'],
+        'per_page': pagina['per_page'],
+        'total': pagina['total']
+    }), 200
+
 @admin_dashboard_bp.route('/admin/dashboard/stats', methods=['GET'])
 @admin_token_required
+@cached_admin_view('stats')
 def get_dashboard_stats(current_admin):
     try:
-        # Estatísticas gerais
-        total_usuarios = User.query.filter_by(is_active=True).count()
-        total_pedidos = Pedido.query.count()
-        total_reservas = Reserva.query.filter_by(status='confirmada').count()
-        
-        # Receita total
-        pedidos_pagos = Pedido.query.filter(Pedido.status.in_(['pago', 'confirmado'])).all()
-        receita_total = sum(pedido.valor_total for pedido in pedidos_pagos)
+        # Contadores mantidos pelas rotas de escrita (leitura por chave primária)
+        contadores = obter_contadores()
         
-        # Camisas vendidas
-        camisas_vendidas = sum(pedido.total_camisas for pedido in pedidos_pagos)
-        
-        # Estatísticas por descendência
-        usuarios_veras = User.query.filter_by(descendencia='veras', is_active=True).count()
-        usuarios_saldanha = User.query.filter_by(descendencia='saldanha', is_active=True).count()
-        
-        # Pedidos por status
-        pedidos_pendentes = Pedido.query.filter_by(status='pendente').count()
-        pedidos_pagos = Pedido.query.filter_by(status='pago').count()
-        pedidos_confirmados = Pedido.query.filter_by(status='confirmado').count()
-        pedidos_cancelados = Pedido.query.filter_by(status='cancelado').count()
-        
-        # Mesas por tipo
-        reservas_vip = Reserva.query.filter_by(mesa_tipo='VIP', status='confirmada').count()
-        reservas_premium = Reserva.query.filter_by(mesa_tipo='Premium', status='confirmada').count()
-        reservas_standard = Reserva.query.filter_by(mesa_tipo='Standard', status='confirmada').count()
+        total_usuarios = contadores.usuarios_ativos
+        total_pedidos = contadores.pedidos_total
+        total_reservas = contadores.reservas_confirmadas
         
         # Atividade recente (últimos 7 dias)
         data_limite = datetime.utcnow() - timedelta(days=7)
-        novos_usuarios = User.query.filter(User.created_at >= data_limite).count()
-        novos_pedidos = Pedido.query.filter(Pedido.data_pedido >= data_limite).count()
-        novas_reservas = Reserva.query.filter(Reserva.data_reserva >= data_limite).count()
+        novos_usuarios, novos_pedidos, novas_reservas = contar_atividade_recente(data_limite)
         
         # Verificar prazo de compra
         data_limite_compra = datetime(2026, 6, 10, 23, 59, 59)
@@ -58,24 +85,24 @@ def get_dashboard_stats(current_admin):
                 'total_usuarios': total_usuarios,
                 'total_pedidos': total_pedidos,
                 'total_reservas': total_reservas,
-                'receita_total': receita_total,
-                'camisas_vendidas': camisas_vendidas
+                'receita_total': contadores.receita_total,
+                'camisas_vendidas': contadores.camisas_vendidas
             },
             'usuarios': {
-                'veras': usuarios_veras,
-                'saldanha': usuarios_saldanha,
+                'veras': contadores.usuarios_veras,
+                'saldanha': contadores.usuarios_saldanha,
                 'total': total_usuarios
             },
             'pedidos': {
-                'pendentes': pedidos_pendentes,
-                'pagos': pedidos_pagos,
-                'confirmados': pedidos_confirmados,
-                'cancelados': pedidos_cancelados
+                'pendentes': contadores.pedidos_pendentes,
+                'pagos': contadores.pedidos_pagos,
+                'confirmados': contadores.pedidos_confirmados,
+                'cancelados': contadores.pedidos_cancelados
             },
             'reservas': {
-                'vip': reservas_vip,
-                'premium': reservas_premium,
-                'standard': reservas_standard,
+                'vip': contadores.reservas_vip,
+                'premium': contadores.reservas_premium,
+                'standard': contadores.reservas_standard,
                 'total': total_reservas
             },
             'atividade_recente': {
@@ -93,8 +120,100 @@ def get_dashboard_stats(current_admin):
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@admin_dashboard_bp.route('/admin/dashboard/timeseries', methods=['GET'])
+@admin_token_required
+@cached_admin_view('timeseries')
+def get_timeseries(current_admin):
+    try:
+        metrica = request.args.get('metric', 'pedidos')
+        granularidade = request.args.get('granularity', 'dia')
+        
+        if metrica not in METRICAS:
+            return jsonify({'error': f'Métrica deve ser uma de: {", ".join(METRICAS)}'}), 400
+        
+        if granularidade not in GRANULARIDADES:
+            return jsonify({'error': f'Granularidade deve ser uma de: {", ".join(GRANULARIDADES)}'}), 400
+        
+        try:
+            fim = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else datetime.utcnow().date()
+            inicio = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else fim - timedelta(days=29)
+        except ValueError:
+            return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+        
+        if inicio > fim:
+            return jsonify({'error': 'Data inicial maior que a final'}), 400
+        
+        if (fim - inicio).days > 400:
+            return jsonify({'error': 'Intervalo máximo de 400 dias'}), 400
+        
+        pontos = serie(metrica, granularidade, inicio, fim)
+        
+        return jsonify({
+            'metric': metrica,
+            'granularity': granularidade,
+            'from': inicio.isoformat(),
+            'to': fim.isoformat(),
+            'series': pontos,
+            'total': {
+                'quantidade': sum(ponto['quantidade'] for ponto in pontos),
+                'valor': round(sum(ponto['valor'] for ponto in pontos), 2)
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+# Ordem de exibição dos tamanhos; tamanhos fora da lista vão ao final
+ORDEM_TAMANHOS = ['PP', 'P', 'M', 'G', 'GG', 'XG', 'XGG', 'EXG']
+
+def _ordem_tamanho(tamanho):
+    return (ORDEM_TAMANHOS.index(tamanho), '') if tamanho in ORDEM_TAMANHOS else (len(ORDEM_TAMANHOS), tamanho)
+
+@admin_dashboard_bp.route('/admin/dashboard/relatorios/camisas', methods=['GET'])
+@admin_token_required
+@cached_admin_view('pedidos')
+def get_relatorio_camisas(current_admin):
+    """Totais de camisas por tamanho, separados por status e descendência (uma query agregada)"""
+    try:
+        linhas = db.session.execute(
+            select(PedidoItem.tamanho, Pedido.status, User.descendencia,
+                   func.sum(PedidoItem.quantidade).label('quantidade'))
+            .join(Pedido, Pedido.id == PedidoItem.pedido_id)
+            .join(User, User.id == Pedido.usuario_id)
+            .group_by(PedidoItem.tamanho, Pedido.status, User.descendencia)
+        ).all()
+        
+        tamanhos = {}
+        for linha in linhas:
+            tamanho = tamanhos.setdefault(linha.tamanho, {
+                'total': 0, 'producao': 0, 'por_status': {}, 'por_descendencia': {}
+            })
+            quantidade = int(linha.quantidade)
+            tamanho['total'] += quantidade
+            if linha.status != 'cancelado':
+                tamanho['producao'] += quantidade
+            tamanho['por_status'][linha.status] = tamanho['por_status'].get(linha.status, 0) + quantidade
+            tamanho['por_descendencia'][linha.descendencia] = tamanho['por_descendencia'].get(linha.descendencia, 0) + quantidade
+        
+        ordenados = sorted(tamanhos, key=_ordem_tamanho)
+        
+        return jsonify({
+            'tamanhos': [dict(tamanhos[tamanho], tamanho=tamanho) for tamanho in ordenados],
+            'producao_total': sum(dados['producao'] for dados in tamanhos.values()),
+            'pagos_total': sum(
+                quantidade
+                for dados in tamanhos.values()
+                for status, quantidade in dados['por_status'].items()
+                if status in STATUS_PAGOS
+            )
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
 @admin_dashboard_bp.route('/admin/dashboard/usuarios', methods=['GET'])
 @admin_token_required
+@cached_admin_view('usuarios')
 def get_usuarios(current_admin):
     try:
         page = request.args.get('page', 1, type=int)
@@ -104,18 +223,24 @@ def get_usuarios(current_admin):
         
         query = User.query
         
-        # Filtros
-        if search:
-            query = query.filter(or_(
-                User.nome_completo.ilike(f'%{search}%'),
-                User.email.ilike(f'%{search}%')
-            ))
+        # Filtros (busca sem acentos, indexada por trigramas no PostgreSQL)
+        if termos_busca(search):
+            query = query.filter(_filtro_busca_usuario(search))
         
         if descendencia:
             query = query.filter_by(descendencia=descendencia)
         
-        # Paginação
-        usuarios = query.order_by(User.created_at.desc()).paginate(
+        # Paginação por cursor (opt-in): custo constante em qualquer página
+        if 'cursor' in request.args:
+            pagina = keyset_page(
+                query, User.created_at, User.id, request.args['cursor'],
+                per_page, lambda user: user.to_dict(), request.args.get('total')
+            )
+            return _cursor_response('usuarios', pagina)
+        
+        # Paginação (com busca, os resultados mais relevantes vêm primeiro)
+        ordem = _ranking_busca_usuario(search) if termos_busca(search) else []
+        usuarios = query.order_by(*ordem, User.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -127,57 +252,71 @@ def get_usuarios(current_admin):
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @admin_dashboard_bp.route('/admin/dashboard/pedidos', methods=['GET'])
 @admin_token_required
+@cached_admin_view('pedidos')
 def get_pedidos(current_admin):
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', '')
+        search = request.args.get('search', '')
         
-        query = Pedido.query
+        # Usuário carregado no mesmo SELECT; qualquer lazy load restante falha
+        query = Pedido.query.options(joinedload(Pedido.usuario), raiseload('*'))
         
         # Filtro por status
         if status:
             query = query.filter_by(status=status)
         
+        # Busca pelo nome ou email do dono do pedido
+        if termos_busca(search):
+            query = query.filter(_filtro_busca_dono(Pedido.usuario_id, search))
+        
+        # Paginação por cursor (opt-in): custo constante em qualquer página
+        if 'cursor' in request.args:
+            pagina = keyset_page(
+                query, Pedido.data_pedido, Pedido.id, request.args['cursor'],
+                per_page, lambda pedido: pedido.to_dict(), request.args.get('total')
+            )
+            return _cursor_response('pedidos', pagina)
+        
         # Paginação
         pedidos = query.order_by(Pedido.data_pedido.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        # Incluir dados do usuário
-        pedidos_data = []
-        for pedido in pedidos.items:
-            pedido_dict = pedido.to_dict()
-            user = User.query.get(pedido.usuario_id)
-            pedido_dict['usuario'] = user.to_dict() if user else None
-            pedidos_data.append(pedido_dict)
-        
         return jsonify({
-            'pedidos': pedidos_data,
+            'pedidos': [pedido.to_dict() for pedido in pedidos.items],
             'total': pedidos.total,
             'pages': pedidos.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @admin_dashboard_bp.route('/admin/dashboard/reservas', methods=['GET'])
 @admin_token_required
+@cached_admin_view('reservas')
 def get_reservas(current_admin):
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         tipo = request.args.get('tipo', '')
         status = request.args.get('status', '')
+        search = request.args.get('search', '')
         
-        query = Reserva.query
+        # Usuário carregado no mesmo SELECT; qualquer lazy load restante falha
+        query = Reserva.query.options(joinedload(Reserva.usuario), raiseload('*'))
         
         # Filtros
         if tipo:
@@ -186,32 +325,39 @@ def get_reservas(current_admin):
         if status:
             query = query.filter_by(status=status)
         
+        # Busca pelo nome ou email do dono da reserva
+        if termos_busca(search):
+            query = query.filter(_filtro_busca_dono(Reserva.usuario_id, search))
+        
+        # Paginação por cursor (opt-in): custo constante em qualquer página
+        if 'cursor' in request.args:
+            pagina = keyset_page(
+                query, Reserva.data_reserva, Reserva.id, request.args['cursor'],
+                per_page, lambda reserva: reserva.to_dict(), request.args.get('total')
+            )
+            return _cursor_response('reservas', pagina)
+        
         # Paginação
         reservas = query.order_by(Reserva.data_reserva.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        # Incluir dados do usuário
-        reservas_data = []
-        for reserva in reservas.items:
-            reserva_dict = reserva.to_dict()
-            user = User.query.get(reserva.usuario_id)
-            reserva_dict['usuario'] = user.to_dict() if user else None
-            reservas_data.append(reserva_dict)
-        
         return jsonify({
-            'reservas': reservas_data,
+            'reservas': [reserva.to_dict() for reserva in reservas.items],
             'total': reservas.total,
             'pages': reservas.pages,
             'current_page': page,
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @admin_dashboard_bp.route('/admin/dashboard/logs', methods=['GET'])
 @admin_token_required
+@cached_admin_view('logs')
 def get_audit_logs(current_admin):
     try:
         page = request.args.get('page', 1, type=int)
@@ -219,7 +365,7 @@ def get_audit_logs(current_admin):
         acao = request.args.get('acao', '')
         admin_id = request.args.get('admin_id', type=int)
         
-        query = AuditLog.query
+        query = AuditLog.query.options(joinedload(AuditLog.admin), raiseload('*'))
         
         # Filtros
         if acao:
@@ -228,6 +374,14 @@ def get_audit_logs(current_admin):
         if admin_id:
             query = query.filter_by(admin_id=admin_id)
         
+        # Paginação por cursor (opt-in): custo constante em qualquer página
+        if 'cursor' in request.args:
+            pagina = keyset_page(
+                query, AuditLog.timestamp, AuditLog.id, request.args['cursor'],
+                per_page, lambda log: log.to_dict(), request.args.get('total')
+            )
+            return _cursor_response('logs', pagina)
+        
         # Paginação
         logs = query.order_by(AuditLog.timestamp.desc()).paginate(
             page=page, per_page=per_page, error_out=False
@@ -241,6 +395,8 @@ def get_audit_logs(current_admin):
             'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -255,11 +411,14 @@ def toggle_user_status(current_admin, user_id):
         # Salvar estado anterior
         dados_anteriores = user.to_dict()
         
-        # Alternar status
-        user.is_active = not user.is_active
-        db.session.commit()
+        # Alternar status (condicional: dois cliques simultâneos não contam em dobro)
+        if not transicionar(user, 'is_active', user.is_active, not user.is_active):
+            db.session.rollback()
+            return jsonify({'error': 'O status do usuário foi alterado por outra requisição'}), 409
+        registrar_usuario(user, 1 if user.is_active else -1)
+        dados_novos = user.to_dict()
         
-        # Registrar ação no log
+        # Registrar ação no log (mesma transação da alteração)
         acao = 'ACTIVATE_USER' if user.is_active else 'DEACTIVATE_USER'
         descricao = f'{"Ativou" if user.is_active else "Desativou"} usuário: {user.nome_completo} ({user.email})'
         
@@ -270,12 +429,16 @@ def toggle_user_status(current_admin, user_id):
             'users',
             user.id,
             dados_anteriores,
-            user.to_dict()
+            dados_novos,
+            commit=False
         )
+        db.session.commit()
+        invalidate_admin_cache('stats', 'usuarios', 'pedidos', 'reservas', 'logs')
+        invalidar_usuario(user.id)
         
         return jsonify({
-            'message': f'Usuário {"ativado" if user.is_active else "desativado"} com sucesso',
-            'user': user.to_dict()
+            'message': f'Usuário {"ativado" if dados_novos["is_active"] else "desativado"} com sucesso',
+            'user': dados_novos
         }), 200
         
     except Exception as e:
@@ -289,7 +452,7 @@ def update_pedido_status(current_admin, pedido_id):
         data = request.json
         novo_status = data.get('status')
         
-        if not novo_status or novo_status not in ['pendente', 'pago', 'confirmado', 'cancelado']:
+        if not novo_status or novo_status not in STATUS_PEDIDO:
             return jsonify({'error': 'Status inválido'}), 400
         
         pedido = Pedido.query.get(pedido_id)
@@ -300,13 +463,18 @@ def update_pedido_status(current_admin, pedido_id):
         dados_anteriores = pedido.to_dict()
         status_anterior = pedido.status
         
-        # Atualizar status
-        pedido.status = novo_status
-        db.session.commit()
+        # Atualizar status (condicional ao status lido acima)
+        if not transicionar(pedido, 'status', status_anterior, novo_status):
+            db.session.rollback()
+            return jsonify({'error': 'O status do pedido foi alterado por outra requisição'}), 409
+        registrar_mudanca_status_pedido(pedido, status_anterior, novo_status)
+        publicar('pedido.status', id=pedido.id, usuario_id=pedido.usuario_id,
+                 status_anterior=status_anterior, status=novo_status)
+        dados_novos = pedido.to_dict()
         
-        # Registrar ação no log
-        user = User.query.get(pedido.usuario_id)
-        descricao = f'Alterou status do pedido #{pedido.id} de "{status_anterior}" para "{novo_status}" - Usuário: {user.nome_completo if user else "N/A"}'
+        # Registrar ação no log (mesma transação da alteração)
+        usuario = dados_novos.get('usuario')
+        descricao = f'Alterou status do pedido #{pedido.id} de "{status_anterior}" para "{novo_status}" - Usuário: {usuario["nome_completo"] if usuario else "N/A"}'
         
         log_admin_action(
             current_admin.id,
@@ -315,14 +483,22 @@ def update_pedido_status(current_admin, pedido_id):
             'pedidos',
             pedido.id,
             dados_anteriores,
-            pedido.to_dict()
+            dados_novos,
+            commit=False
         )
+        db.session.commit()
+        invalidate_admin_cache('stats', 'pedidos', 'logs')
         
         return jsonify({
             'message': 'Status do pedido atualizado com sucesso',
-            'pedido': pedido.to_dict()
+            'pedido': dados_novos
         }), 200
         
+    except IntegrityError as e:
+        db.session.rollback()
+        if violou_restricao(e, 'uq_pedidos_usuario_pendente', 'pedidos.usuario_id'):
+            return jsonify({'error': 'O usuário já possui um pedido pendente'}), 400
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -335,18 +511,18 @@ def cancel_reserva(current_admin, reserva_id):
         if not reserva:
             return jsonify({'error': 'Reserva não encontrada'}), 404
         
-        if reserva.status != 'confirmada':
-            return jsonify({'error': 'Apenas reservas confirmadas podem ser canceladas'}), 400
-        
         # Salvar estado anterior
         dados_anteriores = reserva.to_dict()
         
         # Cancelar reserva
-        reserva.status = 'cancelada'
-        reserva.data_cancelamento = datetime.utcnow()
-        db.session.commit()
+        if not transicionar(reserva, 'status', 'confirmada', 'cancelada', data_cancelamento=datetime.utcnow()):
+            db.session.rollback()
+            return jsonify({'error': 'Apenas reservas confirmadas podem ser canceladas'}), 400
+        registrar_reserva(reserva, -1)
+        publicar('reserva.cancelada', id=reserva.id, usuario_id=reserva.usuario_id,
+                 mesa_numero=reserva.mesa_numero, por_admin=current_admin.id)
         
-        # Registrar ação no log
+        # Registrar ação no log (mesma transação da alteração)
         user = User.query.get(reserva.usuario_id)
         descricao = f'Cancelou reserva da mesa {reserva.mesa_numero} - Usuário: {user.nome_completo if user else "N/A"}'
         
@@ -357,8 +533,12 @@ def cancel_reserva(current_admin, reserva_id):
             'reservas',
             reserva.id,
             dados_anteriores,
-            reserva.to_dict()
+            reserva.to_dict(),
+            commit=False
         )
+        db.session.commit()
+        marcar_mesa_alterada(reserva.mesa_numero)
+        invalidate_admin_cache('stats', 'reservas', 'logs')
         
         return jsonify({
             'message': 'Reserva cancelada com sucesso',
@@ -369,3 +549,173 @@ def cancel_reserva(current_admin, reserva_id):
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@admin_dashboard_bp.route('/admin/dashboard/usuarios/status-lote', methods=['POST'])
+@admin_token_required
+def update_users_status_batch(current_admin):
+    """Ativa ou desativa vários usuários com um único UPDATE ... RETURNING"""
+    try:
+        data = request.get_json(silent=True) or {}
+        ativo = data.get('ativo')
+        if not isinstance(ativo, bool):
+            return jsonify({'error': 'Informe "ativo" (true ou false)'}), 400
+        try:
+            ids = ids_do_corpo(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        alterados = db.session.execute(
+            update(User)
+            .where(User.id.in_(ids), User.is_active != ativo)
+            .values(is_active=ativo)
+            .returning(User.id, User.nome_completo, User.email, User.descendencia)
+            .execution_options(synchronize_session=False)
+        ).all()
+        
+        registrar_usuarios(alterados, 1 if ativo else -1)
+        registrar_auditoria_lote(current_admin.id, 'ACTIVATE_USER' if ativo else 'DEACTIVATE_USER', 'users', [
+            {
+                'registro_id': user.id,
+                'descricao': f'{"Ativou" if ativo else "Desativou"} usuário (lote): {user.nome_completo} ({user.email})',
+                'dados_anteriores': {'is_active': not ativo},
+                'dados_novos': {'is_active': ativo}
+            }
+            for user in alterados
+        ])
+        alterados_ids = [user.id for user in alterados]
+        if alterados_ids:
+            publicar_lote('usuario.status_lote', alterados_ids, ativo=ativo)
+        db.session.commit()
+        
+        if alterados_ids:
+            invalidate_admin_cache('stats', 'usuarios', 'pedidos', 'reservas', 'logs')
+            invalidar_usuario(*alterados_ids)
+        
+        return jsonify({
+            'message': f'{len(alterados_ids)} usuário(s) {"ativado(s)" if ativo else "desativado(s)"}',
+            'alterados': alterados_ids,
+            'sem_alteracao': [user_id for user_id in ids if user_id not in set(alterados_ids)]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+def _data_do_filtro(filtros, campo):
+    try:
+        return datetime.fromisoformat(filtros[campo])
+    except (TypeError, ValueError):
+        raise ValueError(f'"{campo}" deve estar no formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS')
+
+def _filtro_pedidos_lote(data):
+    """
+    Condição do lote de pedidos: lista de ids ou filtros
+    
+    Filtros aceitos: status (str ou lista), criado_antes, criado_depois (ISO 8601)
+    
+    Returns:
+        tuple: (condição, status de origem ou None, limite ou None)
+    """
+    if 'ids' in data:
+        return Pedido.id.in_(ids_do_corpo(data)), None, None
+    
+    filtros = data.get('filtros')
+    if not isinstance(filtros, dict) or not filtros:
+        raise ValueError('Informe "ids" ou "filtros"')
+    
+    condicoes = []
+    origens = filtros.get('status')
+    if isinstance(origens, str):
+        origens = [origens]
+    if origens is not None and (not origens or any(status not in STATUS_PEDIDO for status in origens)):
+        raise ValueError('Status de origem inválido')
+    if filtros.get('criado_antes'):
+        condicoes.append(Pedido.data_pedido < _data_do_filtro(filtros, 'criado_antes'))
+    if filtros.get('criado_depois'):
+        condicoes.append(Pedido.data_pedido >= _data_do_filtro(filtros, 'criado_depois'))
+    if not condicoes and origens is None:
+        raise ValueError('Informe ao menos um filtro')
+    # Filtros podem casar com qualquer número de pedidos: no máximo MAX_LOTE por chamada
+    return and_(true(), *condicoes), origens, MAX_LOTE
+
+@admin_dashboard_bp.route('/admin/dashboard/pedidos/status-lote', methods=['POST'])
+@admin_token_required
+def update_pedidos_status_batch(current_admin):
+    """
+    Altera o status de vários pedidos (ex.: cancelar pendentes anteriores a uma data)
+    
+    Corpo: {"status": "cancelado", "ids": [...]} ou
+           {"status": "cancelado", "filtros": {"status": "pendente", "criado_antes": "2026-06-10T23:59:59"}}
+    
+    Com filtros, cada chamada altera até MAX_LOTE pedidos; enquanto a resposta
+    trouxer "continua": true, repetir a mesma chamada processa os seguintes.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        novo_status = data.get('status')
+        if novo_status not in STATUS_PEDIDO:
+            return jsonify({'error': 'Status inválido'}), 400
+        try:
+            condicao, origens, limite = _filtro_pedidos_lote(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        alterados = atualizar_status_pedidos(condicao, novo_status, origens, limite=limite)
+        
+        registrar_auditoria_lote(current_admin.id, 'UPDATE_PEDIDO_STATUS', 'pedidos', [
+            {
+                'registro_id': pedido['id'],
+                'descricao': f'Alterou status do pedido #{pedido["id"]} de "{pedido["status_anterior"]}" para "{novo_status}" (lote)',
+                'dados_anteriores': {'status': pedido['status_anterior']},
+                'dados_novos': {'status': novo_status}
+            }
+            for pedido in alterados
+        ])
+        if alterados:
+            publicar_lote('pedido.status_lote', [pedido['id'] for pedido in alterados], status=novo_status)
+        db.session.commit()
+        
+        if alterados:
+            invalidate_admin_cache('stats', 'pedidos', 'logs')
+        
+        return jsonify({
+            'message': f'{len(alterados)} pedido(s) atualizado(s) para "{novo_status}"',
+            'pedidos': [{'id': pedido['id'], 'status_anterior': pedido['status_anterior']} for pedido in alterados],
+            'continua': limite is not None and len(alterados) == limite
+        }), 200
+        
+    except IntegrityError as e:
+        db.session.rollback()
+        if violou_restricao(e, 'uq_pedidos_usuario_pendente', 'pedidos.usuario_id'):
+            return jsonify({'error': 'O lote deixaria um usuário com mais de um pedido pendente'}), 400
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@admin_dashboard_bp.route('/admin/dashboard/metrics', methods=['GET'])
+@admin_token_required
+def get_metrics(current_admin):
+    """Métricas internas deste worker (caches e hashing de senhas)"""
+    return jsonify({
+        'admin_cache': admin_cache.stats(),
+        'public_cache': public_cache.stats(),
+        'principal_cache': principal_cache.stats(),
+        'password_hashing': password_hashing.stats(),
+        'eventos': broker.stats(),
+        'previews': previews.stats()
+    }), 200
+
+@admin_dashboard_bp.route('/admin/dashboard/stream', methods=['GET'])
+@admin_token_required
+def stream_eventos(current_admin):
+    """Feed ao vivo (Server-Sent Events) de pedidos, pagamentos e reservas"""
+    iniciar_listener()
+    try:
+        fila = broker.assinar()
+    except StreamsBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    
+    return Response(stream_sse(fila), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -1,13 +1,18 @@
 import os
 from flask import Blueprint, jsonify, request
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
+from src.utils.dashboard_counters import registrar_usuario
+from src.utils.principal import carregar_usuario
+from src.utils.eventos import publicar
+from src.utils.db_errors import violou_restricao
 import jwt
 import datetime
 import re
 from functools import wraps
 from werkzeug.exceptions import BadRequest, Unauthorized, Conflict
 import logging
-from werkzeug.security import generate_password_hash
+from src.utils.password_hashing import HashingBusy, gerar_hash, precisa_rehash, registrar_rehash
 
 logger = logging.getLogger(__name__)
 auth_bp = Blueprint('auth_bp', __name__, url_prefix='/api/auth')
@@ -111,6 +116,9 @@ def handle_auth_errors(f):
         except Conflict as e:
             logger.warning(f"Conflito: {str(e)}")
             return jsonify({'error': str(e)}), 409
+        except HashingBusy as e:
+            logger.warning(f"Pool de hashing lotado: {str(e)}")
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
         except Exception as e:
             logger.error(f"Erro inesperado: {str(e)}", exc_info=True)
             return jsonify({'error': 'Erro interno no servidor'}), 500
@@ -136,21 +144,21 @@ def cadastro():
     
     email = data['email'].strip().lower()
     
-    # Verificação de e-mail existente
-    if User.query.filter_by(email=email).first():
-        raise Conflict('E-mail já cadastrado')
-    
+    # A unicidade do e-mail é garantida pelo índice único no INSERT
     try:
         user = User(
             nome_completo=data['nomeCompleto'].strip(),
             email=email,
-            password_hash=generate_password_hash(data['password']),
+            password_hash=gerar_hash(data['password']),
             descendencia=data['descendencia'].lower(),
             idade=data['idade'],
             cidade_residencia=data['cidadeResidencia'].strip()
         )
         
         db.session.add(user)
+        db.session.flush()
+        registrar_usuario(user)
+        publicar('usuario.cadastrado', id=user.id, descendencia=user.descendencia)
         db.session.commit()
         logger.info(f"Usuário cadastrado: {email}")
         
@@ -164,6 +172,11 @@ def cadastro():
             'token': generate_token(user.id)
         }), 201
         
+    except IntegrityError as e:
+        db.session.rollback()
+        if violou_restricao(e, 'users_email_key', 'users.email'):
+            raise Conflict('E-mail já cadastrado')
+        raise  # outras restrições: erro interno, registrado por handle_auth_errors
     except Exception as e:
         db.session.rollback()
         logger.error(f"Erro no cadastro: {str(e)}", exc_info=True)
@@ -188,6 +201,12 @@ def login():
     if not user or not user.check_password(password):
         raise Unauthorized('Credenciais inválidas')
     
+    # Atualiza hashes gerados com parâmetros antigos enquanto temos a senha em mãos
+    if precisa_rehash(user.password_hash):
+        user.password_hash = gerar_hash(password)
+        db.session.commit()
+        registrar_rehash()
+    
     return jsonify({
         'message': 'Login realizado com sucesso',
         'user': {
@@ -242,7 +261,8 @@ def token_required(f):
         
         try:
             payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            current_user = User.query.get(payload['sub'])
+            # Retrato do usuário em cache por (sub, iat), sem ida ao banco em caso de hit
+            current_user = carregar_usuario(payload['sub'], payload.get('iat'))
             
             if not current_user:
                 raise Unauthorized('Token inválido')
@@ -0,0 +1,56 @@
+from flask import Blueprint, jsonify
+from datetime import datetime
+from sqlalchemy.orm import raiseload, selectinload
+from src.models.pedido import Pedido
+from src.models.reserva import Reserva
+from src.routes.auth import token_required
+
+me_bp = Blueprint('me', __name__)
+
+@me_bp.route('/api/me/resumo', methods=['GET'])
+@token_required
+def obter_resumo(current_user):
+    """
+    Resumo da conta do usuário logado em uma única resposta
+    
+    Substitui as chamadas separadas a /api/pedidos, /api/pagamentos,
+    /api/reservas/minha e /status/compra. O usuário vem do token (cache de
+    principal) e o restante de um número fixo de queries: pedidos, pagamentos
+    e itens dos pedidos (selectinload) e a reserva ativa.
+    """
+    try:
+        pedidos = Pedido.query.options(
+            selectinload(Pedido.pagamentos),
+            selectinload(Pedido.itens),
+            raiseload('*')
+        ).filter_by(usuario_id=current_user.id).order_by(Pedido.data_pedido.desc()).all()
+        
+        reserva = Reserva.query.options(raiseload('*')).filter_by(
+            usuario_id=current_user.id,
+            status='confirmada'
+        ).first()
+        
+        data_limite = datetime(2026, 6, 10, 23, 59, 59)
+        data_atual = datetime.now()
+        
+        return jsonify({
+            'usuario': current_user.to_dict(),
+            'pedidos': [
+                dict(
+                    pedido.to_dict(include_usuario=False),
+                    pagamentos=[pagamento.to_dict() for pagamento in pedido.pagamentos],
+                    itens=[item.to_dict() for item in pedido.itens]
+                )
+                for pedido in pedidos
+            ],
+            'reserva': reserva.to_dict(include_usuario=False) if reserva else None,
+            'compra': {
+                'pode_comprar': data_atual <= data_limite,
+                'data_limite': data_limite.isoformat(),
+                'dias_restantes': max((data_limite - data_atual).days, 0),
+                'pedido_pendente': any(pedido.status == 'pendente' for pedido in pedidos)
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
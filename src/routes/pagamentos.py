@@ -1,28 +1,33 @@
 import json
-import os
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from src.models.user import db, User
+from sqlalchemy import select, update
+from src.routes.admin_auth import admin_token_required, log_admin_action
+from src.models.user import db
 from src.models.pedido import Pedido
 from src.models.pagamento import Pagamento
 from src.routes.auth import token_required
+from src.utils.dashboard_counters import registrar_mudanca_status_pedido, transicionar
+from src.utils.cache import invalidate_admin_cache
+from src.utils.export import FORMATOS_EXPORTACAO, stream_export
+from src.utils.eventos import publicar, publicar_lote
+from src.utils.idempotencia import idempotente
+from src.utils.storage import armazenar, servir
+from src.utils.previews import enfileirar_preview
+from src.utils.lote import ids_do_corpo, atualizar_status_pedidos
 
 pagamentos_bp = Blueprint('pagamentos', __name__)
 
-# Configuração para upload de arquivos
-UPLOAD_FOLDER = 'uploads/comprovantes'
+# Configuração para upload de arquivos (armazenamento em src/utils/storage.py)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def ensure_upload_folder():
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-
 @pagamentos_bp.route('/api/pagamentos', methods=['POST'])
 @token_required
+@idempotente
 def processar_pagamento(current_user):
     try:
         data = request.get_json()
@@ -80,11 +85,19 @@ def processar_pagamento(current_user):
             novo_pagamento.status = 'confirmado'  # Cartão é confirmado automaticamente (simulação)
             novo_pagamento.data_confirmacao = datetime.utcnow()
             
-            # Atualizar status do pedido
-            pedido.status = 'pago'
-            pedido.data_pagamento = datetime.utcnow()
+            # Atualizar status do pedido (condicional: outro pagamento pode ter chegado antes)
+            if not transicionar(pedido, 'status', 'pendente', 'pago', data_pagamento=datetime.utcnow()):
+                db.session.rollback()
+                return jsonify({'error': 'Pedido já foi processado'}), 400
+            registrar_mudanca_status_pedido(pedido, 'pendente', 'pago')
         
         db.session.add(novo_pagamento)
+        db.session.flush()
+        publicar(
+            'pagamento.pendente' if novo_pagamento.status == 'pendente' else 'pagamento.confirmado',
+            id=novo_pagamento.id, pedido_id=pedido.id, usuario_id=current_user.id,
+            metodo=novo_pagamento.metodo_pagamento, valor=novo_pagamento.valor
+        )
         db.session.commit()
         
         return jsonify({
@@ -120,19 +133,28 @@ def upload_comprovante(current_user, pagamento_id):
         if not allowed_file(file.filename):
             return jsonify({'error': 'Formato de arquivo não permitido'}), 400
         
-        # Salvar arquivo
-        ensure_upload_folder()
-        filename = secure_filename(f"{current_user.id}_{pagamento_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # Salvar arquivo (em blocos, endereçado pelo SHA-256 do conteúdo)
+        filename = secure_filename(file.filename)
+        extensao = filename.rsplit('.', 1)[1].lower()
+        arquivo = armazenar(file.stream, extensao)
         
         # Atualizar pagamento
         pagamento.comprovante_filename = filename
+        pagamento.comprovante_chave = arquivo.chave
+        pagamento.comprovante_sha256 = arquivo.sha256
+        pagamento.comprovante_content_type = arquivo.content_type
+        pagamento.comprovante_tamanho = arquivo.tamanho
+        pagamento.preview_chave = None
+        pagamento.preview_status = 'pendente'
         db.session.commit()
         
+        # Miniatura gerada fora da requisição
+        enfileirar_preview(pagamento.id)
+        
         return jsonify({
             'message': 'Comprovante enviado com sucesso',
             'filename': filename,
+            'duplicado': arquivo.duplicado,
             'pagamento': pagamento.to_dict()
         }), 200
         
@@ -140,6 +162,46 @@ def upload_comprovante(current_user, pagamento_id):
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+def _servir_comprovante(pagamento):
+    if not pagamento:
+        return jsonify({'error': 'Pagamento não encontrado'}), 404
+    if not pagamento.comprovante_chave:
+        return jsonify({'error': 'Comprovante não enviado'}), 404
+    return servir(pagamento.comprovante_chave, pagamento.comprovante_content_type, pagamento.comprovante_filename)
+
+@pagamentos_bp.route('/api/pagamentos/<int:pagamento_id>/comprovante', methods=['GET'])
+@token_required
+def baixar_comprovante(current_user, pagamento_id):
+    try:
+        pagamento = Pagamento.query.filter_by(id=pagamento_id, usuario_id=current_user.id).first()
+        return _servir_comprovante(pagamento)
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@pagamentos_bp.route('/api/admin/pagamentos/<int:pagamento_id>/comprovante', methods=['GET'])
+@admin_token_required
+def baixar_comprovante_admin(current_admin, pagamento_id):
+    try:
+        return _servir_comprovante(db.session.get(Pagamento, pagamento_id))
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@pagamentos_bp.route('/api/admin/pagamentos/<int:pagamento_id>/preview', methods=['GET'])
+@admin_token_required
+def baixar_preview_admin(current_admin, pagamento_id):
+    try:
+        pagamento = db.session.get(Pagamento, pagamento_id)
+        if not pagamento:
+            return jsonify({'error': 'Pagamento não encontrado'}), 404
+        if not pagamento.preview_chave:
+            return jsonify({'error': 'Preview não disponível', 'preview_status': pagamento.preview_status}), 404
+        return servir(pagamento.preview_chave, 'image/webp')
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
 @pagamentos_bp.route('/api/pagamentos', methods=['GET'])
 @token_required
 def listar_pagamentos(current_user):
@@ -154,15 +216,29 @@ def listar_pagamentos(current_user):
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 # Rotas administrativas
+def _com_preview(pagamento):
+    """Pagamento com a URL da miniatura (o painel só baixa o original se abrir)"""
+    dados = pagamento.to_dict()
+    dados['preview_url'] = f'/api/admin/pagamentos/{pagamento.id}/preview' if pagamento.preview_chave else None
+    dados['comprovante_url'] = f'/api/admin/pagamentos/{pagamento.id}/comprovante' if pagamento.comprovante_chave else None
+    return dados
+
 @pagamentos_bp.route('/api/admin/pagamentos', methods=['GET'])
 @token_required
 def listar_todos_pagamentos(current_user):
     try:
         # Em produção, adicionar verificação de permissão de admin
-        pagamentos = Pagamento.query.order_by(Pagamento.data_pagamento.desc()).all()
+        query = Pagamento.query.order_by(Pagamento.data_pagamento.desc())
+        
+        # Exportação em streaming (?format=ndjson|csv)
+        formato = request.args.get('format')
+        if formato in FORMATOS_EXPORTACAO:
+            return stream_export(query, lambda pagamento: pagamento.to_dict(), formato, 'pagamentos')
+        
+        pagamentos = query.all()
         
         return jsonify({
-            'pagamentos': [pagamento.to_dict() for pagamento in pagamentos]
+            'pagamentos': [_com_preview(pagamento) for pagamento in pagamentos]
         }), 200
         
     except Exception as e:
@@ -177,19 +253,23 @@ def confirmar_pagamento(current_user, pagamento_id):
         if not pagamento:
             return jsonify({'error': 'Pagamento não encontrado'}), 404
         
-        if pagamento.status != 'pendente':
-            return jsonify({'error': 'Pagamento já foi processado'}), 400
-        
         # Confirmar pagamento
-        pagamento.status = 'confirmado'
-        pagamento.data_confirmacao = datetime.utcnow()
+        agora = datetime.utcnow()
+        if not transicionar(pagamento, 'status', 'pendente', 'confirmado', data_confirmacao=agora):
+            db.session.rollback()
+            return jsonify({'error': 'Pagamento já foi processado'}), 400
         
-        # Atualizar status do pedido
+        # Atualizar status do pedido (como no lote, apenas pedidos pendentes passam a 'pago')
         pedido = pagamento.pedido
-        pedido.status = 'pago'
-        pedido.data_pagamento = datetime.utcnow()
+        if not transicionar(pedido, 'status', 'pendente', 'pago', data_pagamento=agora):
+            db.session.rollback()
+            return jsonify({'error': 'Apenas pagamentos de pedidos pendentes podem ser confirmados'}), 400
+        registrar_mudanca_status_pedido(pedido, 'pendente', 'pago')
         
+        publicar('pagamento.confirmado', id=pagamento.id, pedido_id=pedido.id,
+                 usuario_id=pagamento.usuario_id, metodo=pagamento.metodo_pagamento, valor=pagamento.valor)
         db.session.commit()
+        invalidate_admin_cache('stats', 'pedidos')
         
         return jsonify({
             'message': 'Pagamento confirmado com sucesso',
@@ -200,3 +280,82 @@ def confirmar_pagamento(current_user, pagamento_id):
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@pagamentos_bp.route('/api/admin/pagamentos/confirmar-lote', methods=['POST'])
+@admin_token_required
+def confirmar_pagamentos_lote(current_admin):
+    """Confirma vários pagamentos pendentes (e seus pedidos) em uma única transação"""
+    try:
+        try:
+            ids = ids_do_corpo(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        agora = datetime.utcnow()
+        confirmados = db.session.execute(
+            update(Pagamento)
+            .where(Pagamento.id.in_(ids), Pagamento.status == 'pendente')
+            .values(status='confirmado', data_confirmacao=agora)
+            .returning(Pagamento.id, Pagamento.pedido_id, Pagamento.valor)
+            .execution_options(synchronize_session=False)
+        ).all()
+        
+        # Só pedidos ainda pendentes passam a 'pago'; cancelados ou já pagos ficam como estão
+        pedido_ids = sorted({pagamento.pedido_id for pagamento in confirmados})
+        pagos = {
+            pedido['id'] for pedido in atualizar_status_pedidos(
+                Pedido.id.in_(pedido_ids), 'pago', origens=['pendente'], data_pagamento=agora
+            )
+        } if pedido_ids else set()
+        pedido_por_pagamento = {pagamento.id: pagamento.pedido_id for pagamento in confirmados}
+        
+        confirmados_ids = {pagamento.id for pagamento in confirmados}
+        restantes = [pagamento_id for pagamento_id in ids if pagamento_id not in confirmados_ids]
+        status_atual = dict(db.session.execute(
+            select(Pagamento.id, Pagamento.status).where(Pagamento.id.in_(restantes))
+        ).all()) if restantes else {}
+        
+        resultados = []
+        for pagamento_id in ids:
+            if pagamento_id in confirmados_ids:
+                pedido_id = pedido_por_pagamento[pagamento_id]
+                resultados.append({'id': pagamento_id, 'resultado': 'confirmado', 'pedido_id': pedido_id,
+                                   'pedido': 'pago' if pedido_id in pagos else 'ignorado'})
+            elif pagamento_id in status_atual:
+                resultados.append({'id': pagamento_id, 'resultado': 'ja_processado', 'status': status_atual[pagamento_id]})
+            else:
+                resultados.append({'id': pagamento_id, 'resultado': 'nao_encontrado'})
+        
+        resumo = {
+            'confirmados': len(confirmados_ids),
+            'ja_processados': len(status_atual),
+            'nao_encontrados': len(ids) - len(confirmados_ids) - len(status_atual),
+            'pedidos_pagos': len(pagos),
+            'pedidos_ignorados': sorted(set(pedido_ids) - pagos)
+        }
+        
+        if confirmados:
+            log_admin_action(
+                admin_id=current_admin.id,
+                acao='CONFIRM_PAGAMENTOS_LOTE',
+                descricao=f'Confirmou {len(confirmados)} pagamentos em lote',
+                tabela_afetada='pagamentos',
+                dados_novos={'pagamentos': sorted(confirmados_ids), 'pedidos': sorted(pagos),
+                             'valor_total': sum(pagamento.valor for pagamento in confirmados)},
+                commit=False
+            )
+            publicar_lote('pagamento.confirmado_lote', sorted(confirmados_ids), pedidos_pagos=len(pagos),
+                          valor_total=sum(pagamento.valor for pagamento in confirmados))
+        db.session.commit()
+        
+        if confirmados:
+            invalidate_admin_cache('stats', 'pedidos', 'logs')
+        
+        return jsonify({
+            'message': f'{resumo["confirmados"]} pagamento(s) confirmado(s)',
+            'resumo': resumo,
+            'resultados': resultados
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -1,15 +1,147 @@
 import json
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from src.models.user import db, User
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, raiseload
+from src.models.user import db
 from src.models.pedido import Pedido
-from src.models.pagamento import Pagamento
+from src.models.pedido_item import PedidoItem, itens_de_camisas
 from src.routes.auth import token_required
+from src.utils.export import FORMATOS_EXPORTACAO, stream_export
+from src.utils.db_errors import violou_restricao
+from src.utils.eventos import publicar
+from src.utils.idempotencia import idempotente
+from src.utils.dashboard_counters import registrar_pedido, registrar_mudanca_status_pedido, transicionar
+from src.utils.pricing import calcular_preco_camisa, calcular_precos_lote
 
 pedidos_bp = Blueprint('pedidos', __name__)
 
+MAX_MEMBROS_GRUPO = 30
+
+def _montar_pedido_individual(current_user, data):
+    """Pedido com camisas no preço da idade do próprio usuário"""
+    # Validar dados obrigatórios
+    required_fields = ['camisas', 'total_camisas', 'valor_total']
+    for field in required_fields:
+        if field not in data:
+            return None, (jsonify({'error': f'Campo {field} é obrigatório'}), 400)
+    
+    # Validar se há camisas no pedido
+    if data['total_camisas'] <= 0:
+        return None, (jsonify({'error': 'Pedido deve ter pelo menos uma camisa'}), 400)
+    
+    # Calcular preço baseado na idade do usuário
+    preco_unitario = calcular_preco_camisa(current_user.idade)
+    
+    # Validar se usuário pode comprar (idade mínima 6 anos)
+    if preco_unitario == 0:
+        return None, (jsonify({'error': 'Crianças menores de 6 anos não precisam de camisa'}), 400)
+    
+    # Validar valor total
+    valor_esperado = data['total_camisas'] * preco_unitario
+    if abs(data['valor_total'] - valor_esperado) > 0.01:
+        return None, (jsonify({
+            'error': 'Valor total incorreto',
+            'valor_esperado': valor_esperado,
+            'preco_unitario': preco_unitario,
+            'idade_usuario': current_user.idade
+        }), 400)
+    
+    # Criar novo pedido (o índice uq_pedidos_usuario_pendente impede um segundo pendente)
+    novo_pedido = Pedido(
+        usuario_id=current_user.id,
+        total_camisas=data['total_camisas'],
+        valor_total=data['valor_total'],
+        preco_unitario=preco_unitario,
+        camisas_json=json.dumps(data['camisas']),
+        status='pendente'
+    )
+    novo_pedido.itens = [
+        PedidoItem(tamanho=tamanho, quantidade=quantidade)
+        for tamanho, quantidade in itens_de_camisas(data['camisas'])
+    ]
+    
+    return novo_pedido, None
+
+def _montar_pedido_grupo(current_user, data):
+    """
+    Pedido em grupo: uma camisa por membro, cada uma no preço da idade do membro
+    
+    Corpo: {"membros": [{"nome": ..., "idade": ..., "tamanho": ...}], "valor_total": ...}
+    """
+    membros = data['membros']
+    if not isinstance(membros, list) or not membros:
+        return None, (jsonify({'error': 'Informe ao menos um membro'}), 400)
+    if len(membros) > MAX_MEMBROS_GRUPO:
+        return None, (jsonify({'error': f'Máximo de {MAX_MEMBROS_GRUPO} membros por pedido'}), 400)
+    if 'valor_total' not in data:
+        return None, (jsonify({'error': 'Campo valor_total é obrigatório'}), 400)
+    
+    erros = []
+    for posicao, membro in enumerate(membros):
+        if not isinstance(membro, dict):
+            erros.append({'membro': posicao, 'error': 'Membro inválido'})
+            continue
+        nome = membro.get('nome')
+        idade = membro.get('idade')
+        tamanho = membro.get('tamanho')
+        if not isinstance(nome, str) or not nome.strip() or len(nome) > 200:
+            erros.append({'membro': posicao, 'error': 'Nome inválido'})
+        elif not isinstance(idade, int) or isinstance(idade, bool) or not 0 <= idade <= 120:
+            erros.append({'membro': posicao, 'error': 'Idade inválida'})
+        elif not isinstance(tamanho, str) or not tamanho.strip() or len(tamanho.strip()) > 10:
+            erros.append({'membro': posicao, 'error': 'Tamanho inválido'})
+    if erros:
+        return None, (jsonify({'error': 'Dados dos membros inválidos', 'membros': erros}), 400)
+    
+    precos = calcular_precos_lote([membro['idade'] for membro in membros])
+    
+    # Validar se todos podem comprar (idade mínima 6 anos)
+    menores = [posicao for posicao, preco in enumerate(precos) if preco == 0]
+    if menores:
+        return None, (jsonify({
+            'error': 'Crianças menores de 6 anos não precisam de camisa',
+            'membros': menores
+        }), 400)
+    
+    # Validar valor total
+    valor_esperado = sum(precos)
+    if abs(data['valor_total'] - valor_esperado) > 0.01:
+        return None, (jsonify({
+            'error': 'Valor total incorreto',
+            'valor_esperado': valor_esperado,
+            'precos': precos
+        }), 400)
+    
+    # camisas_json continua com o resumo {tamanho: quantidade}
+    camisas = {}
+    for membro in membros:
+        tamanho = membro['tamanho'].strip().upper()
+        camisas[tamanho] = camisas.get(tamanho, 0) + 1
+    
+    novo_pedido = Pedido(
+        usuario_id=current_user.id,
+        total_camisas=len(membros),
+        valor_total=valor_esperado,
+        preco_unitario=round(valor_esperado / len(membros), 2),  # preço médio do grupo
+        camisas_json=json.dumps(camisas),
+        status='pendente'
+    )
+    novo_pedido.itens = [
+        PedidoItem(
+            tamanho=membro['tamanho'].strip().upper(),
+            quantidade=1,
+            nome=membro['nome'].strip(),
+            idade=membro['idade'],
+            preco_unitario=preco
+        )
+        for membro, preco in zip(membros, precos)
+    ]
+    return novo_pedido, None
+
 @pedidos_bp.route('/api/pedidos', methods=['POST'])
 @token_required
+@idempotente
 def criar_pedido(current_user):
     try:
         # Verificar data limite para compra de camisas
@@ -26,54 +158,19 @@ def criar_pedido(current_user):
         
         data = request.get_json()
         
-        # Validar dados obrigatórios
-        required_fields = ['camisas', 'total_camisas', 'valor_total']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
-        
-        # Validar se há camisas no pedido
-        if data['total_camisas'] <= 0:
-            return jsonify({'error': 'Pedido deve ter pelo menos uma camisa'}), 400
-        
-        # Calcular preço baseado na idade do usuário
-        from src.utils.pricing import calcular_preco_camisa
-        preco_unitario = calcular_preco_camisa(current_user.idade)
-        
-        # Validar se usuário pode comprar (idade mínima 6 anos)
-        if preco_unitario == 0:
-            return jsonify({'error': 'Crianças menores de 6 anos não precisam de camisa'}), 400
-        
-        # Validar valor total
-        valor_esperado = data['total_camisas'] * preco_unitario
-        if abs(data['valor_total'] - valor_esperado) > 0.01:
-            return jsonify({
-                'error': 'Valor total incorreto',
-                'valor_esperado': valor_esperado,
-                'preco_unitario': preco_unitario,
-                'idade_usuario': current_user.idade
-            }), 400
-        
-        # Verificar se usuário já tem pedido pendente
-        pedido_existente = Pedido.query.filter_by(
-            usuario_id=current_user.id,
-            status='pendente'
-        ).first()
-        
-        if pedido_existente:
-            return jsonify({'error': 'Você já possui um pedido pendente'}), 400
-        
-        # Criar novo pedido
-        novo_pedido = Pedido(
-            usuario_id=current_user.id,
-            total_camisas=data['total_camisas'],
-            valor_total=data['valor_total'],
-            preco_unitario=preco_unitario,
-            camisas_json=json.dumps(data['camisas']),
-            status='pendente'
-        )
+        # Pedido em grupo (família) ou só para o próprio usuário
+        if 'membros' in data:
+            novo_pedido, erro = _montar_pedido_grupo(current_user, data)
+        else:
+            novo_pedido, erro = _montar_pedido_individual(current_user, data)
+        if erro:
+            return erro
         
         db.session.add(novo_pedido)
+        db.session.flush()
+        registrar_pedido(novo_pedido)
+        publicar('pedido.criado', id=novo_pedido.id, usuario_id=current_user.id,
+                 total_camisas=novo_pedido.total_camisas, valor_total=novo_pedido.valor_total)
         db.session.commit()
         
         return jsonify({
@@ -81,6 +178,11 @@ def criar_pedido(current_user):
             'pedido': novo_pedido.to_dict()
         }), 201
         
+    except IntegrityError as e:
+        db.session.rollback()
+        if violou_restricao(e, 'uq_pedidos_usuario_pendente', 'pedidos.usuario_id'):
+            return jsonify({'error': 'Você já possui um pedido pendente'}), 400
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -123,10 +225,12 @@ def cancelar_pedido(current_user, pedido_id):
         if not pedido:
             return jsonify({'error': 'Pedido não encontrado'}), 404
         
-        if pedido.status != 'pendente':
+        if not transicionar(pedido, 'status', 'pendente', 'cancelado'):
+            db.session.rollback()
             return jsonify({'error': 'Apenas pedidos pendentes podem ser cancelados'}), 400
         
-        pedido.status = 'cancelado'
+        registrar_mudanca_status_pedido(pedido, 'pendente', 'cancelado')
+        publicar('pedido.cancelado', id=pedido.id, usuario_id=current_user.id)
         db.session.commit()
         
         return jsonify({
@@ -144,7 +248,16 @@ def cancelar_pedido(current_user, pedido_id):
 def listar_todos_pedidos(current_user):
     try:
         # Em produção, adicionar verificação de permissão de admin
-        pedidos = Pedido.query.order_by(Pedido.data_pedido.desc()).all()
+        query = Pedido.query.options(
+            joinedload(Pedido.usuario), raiseload('*')
+        ).order_by(Pedido.data_pedido.desc())
+        
+        # Exportação em streaming (?format=ndjson|csv)
+        formato = request.args.get('format')
+        if formato in FORMATOS_EXPORTACAO:
+            return stream_export(query, lambda pedido: pedido.to_dict(), formato, 'pedidos')
+        
+        pedidos = query.all()
         
         return jsonify({
             'pedidos': [pedido.to_dict() for pedido in pedidos]
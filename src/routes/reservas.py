@@ -1,65 +1,93 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from datetime import datetime
-from src.models.user import db, User
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, raiseload
+from src.models.user import db
 from src.models.reserva import Reserva
+from src.models.mesa import Mesa
 from src.routes.auth import token_required
+from src.utils.export import FORMATOS_EXPORTACAO, stream_export
+from src.utils.db_errors import violou_restricao
+from src.utils.disponibilidade import marcar_mesa_alterada, versao_atual, aguardar_nova_versao, LongPollBusy
+from src.utils.eventos import publicar
+from src.utils.idempotencia import idempotente
+from src.utils.dashboard_counters import registrar_reserva, transicionar
 
 reservas_bp = Blueprint('reservas', __name__)
 
-# Dados das mesas (em produção, isso viria de uma tabela separada)
-MESAS_DISPONIVEIS = [
-    # Mesas VIP
-    {'numero': 'VIP-01', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
-    {'numero': 'VIP-02', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
-    {'numero': 'VIP-03', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
-    {'numero': 'VIP-04', 'tipo': 'VIP', 'capacidade': 8, 'localizacao': 'Frente do palco'},
-    
-    # Mesas Premium
-    {'numero': 'P-01', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
-    {'numero': 'P-02', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
-    {'numero': 'P-03', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
-    {'numero': 'P-04', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
-    {'numero': 'P-05', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
-    {'numero': 'P-06', 'tipo': 'Premium', 'capacidade': 10, 'localizacao': 'Área central'},
-    
-    # Mesas Standard
-    {'numero': 'S-01', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-02', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-03', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-04', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-05', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-06', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-07', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-    {'numero': 'S-08', 'tipo': 'Standard', 'capacidade': 12, 'localizacao': 'Área geral'},
-]
+def _mesas_cadastradas(since=None):
+    """Inventário de mesas em ordem de exibição (cadastrado pelo manage.py migrate)"""
+    query = Mesa.query
+    if since is not None:
+        query = query.filter(Mesa.versao > since)
+    return query.order_by(Mesa.ordem).all()
+
+def _numeros_reservados():
+    """Números das mesas com reserva confirmada (apenas a coluna necessária)"""
+    return {
+        numero for (numero,) in
+        db.session.query(Reserva.mesa_numero).filter_by(status='confirmada')
+    }
 
 @reservas_bp.route('/api/mesas', methods=['GET'])
 @token_required
 def listar_mesas(current_user):
     try:
-        # Obter reservas ativas
-        reservas_ativas = Reserva.query.filter_by(status='confirmada').all()
-        mesas_reservadas = {reserva.mesa_numero for reserva in reservas_ativas}
+        since = request.args.get('since', type=int)
+        espera = request.args.get('wait', 0, type=float)
+        
+        # Versão que o cliente já conhece (via ?since= ou If-None-Match)
+        conhecida = since
+        if conhecida is None:
+            for etag in request.if_none_match.as_set():
+                if etag.startswith('mesas-') and etag[6:].isdigit():
+                    conhecida = int(etag[6:])
+        
+        # Long-poll opcional: segura a requisição até a versão avançar
+        if espera > 0 and conhecida is not None:
+            versao = aguardar_nova_versao(conhecida, espera)
+        else:
+            versao = versao_atual()
+        
+        etag = f'mesas-{versao}'
+        if since is None and request.if_none_match.contains(etag):
+            resposta = make_response('', 304)
+            resposta.set_etag(etag)
+            return resposta
+        
+        # Com ?since=, apenas as mesas alteradas depois daquela versão
+        mesas = _mesas_cadastradas(since)
+        
+        # Obter mesas reservadas
+        mesas_reservadas = _numeros_reservados() if mesas else set()
         
         # Preparar lista de mesas com status
         mesas_com_status = []
-        for mesa in MESAS_DISPONIVEIS:
-            mesa_info = mesa.copy()
-            if mesa['numero'] in mesas_reservadas:
+        for mesa in mesas:
+            mesa_info = mesa.to_dict()
+            if mesa.numero in mesas_reservadas:
                 mesa_info['status'] = 'reservada'
             else:
                 mesa_info['status'] = 'disponivel'
             mesas_com_status.append(mesa_info)
         
-        return jsonify({
-            'mesas': mesas_com_status
-        }), 200
-        
+        resposta = make_response(jsonify({
+            'mesas': mesas_com_status,
+            'versao': versao,
+            'parcial': since is not None
+        }), 200)
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta
+        
+    except LongPollBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @reservas_bp.route('/api/reservas', methods=['POST'])
 @token_required
+@idempotente
 def criar_reserva(current_user):
     try:
         data = request.get_json()
@@ -70,41 +98,19 @@ def criar_reserva(current_user):
             if field not in data:
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
-        # Verificar se usuário já tem reserva ativa
-        reserva_existente = Reserva.query.filter_by(
-            usuario_id=current_user.id,
-            status='confirmada'
-        ).first()
-        
-        if reserva_existente:
-            return jsonify({'error': 'Você já possui uma reserva ativa'}), 400
-        
-        # Verificar se mesa existe
-        mesa_valida = None
-        for mesa in MESAS_DISPONIVEIS:
-            if mesa['numero'] == data['mesa_numero']:
-                mesa_valida = mesa
-                break
-        
+        # Verificar se mesa existe (busca pela chave primária)
+        mesa_valida = db.session.get(Mesa, data['mesa_numero'])
         if not mesa_valida:
             return jsonify({'error': 'Mesa não encontrada'}), 404
         
-        # Verificar se mesa já está reservada
-        reserva_mesa = Reserva.query.filter_by(
-            mesa_numero=data['mesa_numero'],
-            status='confirmada'
-        ).first()
-        
-        if reserva_mesa:
-            return jsonify({'error': 'Mesa já está reservada'}), 400
-        
         # Validar dados da mesa
-        if (data['mesa_tipo'] != mesa_valida['tipo'] or 
-            data['mesa_capacidade'] != mesa_valida['capacidade'] or
-            data['mesa_localizacao'] != mesa_valida['localizacao']):
+        if (data['mesa_tipo'] != mesa_valida.tipo or 
+            data['mesa_capacidade'] != mesa_valida.capacidade or
+            data['mesa_localizacao'] != mesa_valida.localizacao):
             return jsonify({'error': 'Dados da mesa não conferem'}), 400
         
-        # Criar nova reserva
+        # Criar nova reserva: os índices únicos parciais garantem uma reserva
+        # confirmada por mesa e por usuário, sem SELECT prévio nem lock de tabela
         nova_reserva = Reserva(
             usuario_id=current_user.id,
             mesa_numero=data['mesa_numero'],
@@ -115,13 +121,25 @@ def criar_reserva(current_user):
         )
         
         db.session.add(nova_reserva)
+        db.session.flush()  # conflitos de índice único aparecem antes de ajustar os contadores
+        registrar_reserva(nova_reserva)
+        publicar('reserva.criada', id=nova_reserva.id, usuario_id=current_user.id,
+                 mesa_numero=nova_reserva.mesa_numero)
         db.session.commit()
+        marcar_mesa_alterada(nova_reserva.mesa_numero)
         
         return jsonify({
             'message': 'Reserva criada com sucesso',
             'reserva': nova_reserva.to_dict()
         }), 201
         
+    except IntegrityError as e:
+        db.session.rollback()
+        if violou_restricao(e, 'uq_reservas_mesa_confirmada', 'reservas.mesa_numero'):
+            return jsonify({'error': 'Mesa já está reservada'}), 400
+        if violou_restricao(e, 'uq_reservas_usuario_confirmada', 'reservas.usuario_id'):
+            return jsonify({'error': 'Você já possui uma reserva ativa'}), 400
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -148,12 +166,15 @@ def cancelar_reserva(current_user, reserva_id):
         if not reserva:
             return jsonify({'error': 'Reserva não encontrada'}), 404
         
-        if reserva.status != 'confirmada':
+        if not transicionar(reserva, 'status', 'confirmada', 'cancelada', data_cancelamento=datetime.utcnow()):
+            db.session.rollback()
             return jsonify({'error': 'Apenas reservas confirmadas podem ser canceladas'}), 400
         
-        reserva.status = 'cancelada'
-        reserva.data_cancelamento = datetime.utcnow()
+        registrar_reserva(reserva, -1)
+        publicar('reserva.cancelada', id=reserva.id, usuario_id=current_user.id,
+                 mesa_numero=reserva.mesa_numero)
         db.session.commit()
+        marcar_mesa_alterada(reserva.mesa_numero)
         
         return jsonify({
             'message': 'Reserva cancelada com sucesso',
@@ -189,7 +210,16 @@ def obter_minha_reserva(current_user):
 def listar_todas_reservas(current_user):
     try:
         # Em produção, adicionar verificação de permissão de admin
-        reservas = Reserva.query.order_by(Reserva.data_reserva.desc()).all()
+        query = Reserva.query.options(
+            joinedload(Reserva.usuario), raiseload('*')
+        ).order_by(Reserva.data_reserva.desc())
+        
+        # Exportação em streaming (?format=ndjson|csv)
+        formato = request.args.get('format')
+        if formato in FORMATOS_EXPORTACAO:
+            return stream_export(query, lambda reserva: reserva.to_dict(), formato, 'reservas')
+        
+        reservas = query.all()
         
         return jsonify({
             'reservas': [reserva.to_dict() for reserva in reservas]
@@ -203,17 +233,21 @@ def listar_todas_reservas(current_user):
 def status_mesas(current_user):
     try:
         # Em produção, adicionar verificação de permissão de admin
-        reservas_ativas = Reserva.query.filter_by(status='confirmada').all()
+        reservas_ativas = Reserva.query.options(
+            joinedload(Reserva.usuario), raiseload('*')
+        ).filter_by(status='confirmada').all()
+        
+        mesas = _mesas_cadastradas()
         
         # Estatísticas
-        total_mesas = len(MESAS_DISPONIVEIS)
+        total_mesas = len(mesas)
         mesas_reservadas = len(reservas_ativas)
         mesas_disponiveis = total_mesas - mesas_reservadas
         
         # Detalhes por tipo
         tipos_stats = {}
-        for mesa in MESAS_DISPONIVEIS:
-            tipo = mesa['tipo']
+        for mesa in mesas:
+            tipo = mesa.tipo
             if tipo not in tipos_stats:
                 tipos_stats[tipo] = {'total': 0, 'reservadas': 0, 'disponiveis': 0}
             tipos_stats[tipo]['total'] += 1
@@ -1,14 +1,47 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request
 from datetime import datetime
 from src.routes.auth import token_required
-from src.utils.pricing import get_info_preco
+from src.utils.cache import microcache
+from src.utils.pricing import IDADE_MAXIMA, TABELA_PRECOS, get_catalogo_precos
 from functools import wraps
+import hashlib
+import json
 import logging
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
 status_bp = Blueprint('status_bp', __name__)  # Nome deve bater com o registrado no main.py
 
+# Os preços só mudam com um deploy: as respostas são serializadas uma vez na
+# importação e servidas com ETag forte e cache longo
+CACHE_CONTROL_PRECOS = 'public, max-age=86400'
+
+def _corpo_json(dados):
+    return (json.dumps(dados, ensure_ascii=False, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+def _etag(corpo):
+    return hashlib.sha256(corpo).hexdigest()[:32]
+
+CATALOGO_CORPO = _corpo_json(get_catalogo_precos())
+CATALOGO_ETAG = _etag(CATALOGO_CORPO)
+
+PRECOS_POR_IDADE = tuple(
+    _corpo_json({'preco': info, 'idade_validada': info['idade']})
+    for info in TABELA_PRECOS
+)
+ETAGS_POR_IDADE = tuple(_etag(corpo) for corpo in PRECOS_POR_IDADE)
+
+def _resposta_precalculada(corpo, etag):
+    """Resposta JSON pronta, com 304 quando o cliente já tem a versão atual"""
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(corpo, mimetype='application/json')
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = CACHE_CONTROL_PRECOS
+    resposta.vary.add('Accept-Encoding')
+    return resposta
+
 def handle_status_errors(f):
     """Decorator para tratamento centralizado de erros"""
     @wraps(f)
@@ -24,9 +57,10 @@ def handle_status_errors(f):
     return wrapper
 
 @status_bp.route('/status', methods=['GET'])
+@microcache()
 @handle_status_errors
 def verificar_status():
-    """Rota pública para verificar status do sistema"""
+    """Rota pública para verificar status do sistema (microcache de poucos segundos)"""
     data_limite_compra = datetime(2026, 6, 10, 23, 59, 59)
     data_atual = datetime.now()
     dias_restantes = max((data_limite_compra - data_atual).days, 0)
@@ -67,11 +101,14 @@ def verificar_status_compra(current_user):
 @status_bp.route('/status/preco/<int:idade>', methods=['GET'])
 @handle_status_errors
 def calcular_preco_por_idade(idade):
-    """Calcula preço com validação robusta"""
-    if not 0 <= idade <= 120:
-        raise ValueError("Idade deve estar entre 0 e 120 anos")
+    """Preço para uma idade, servido da tabela pré-calculada"""
+    if not 0 <= idade <= IDADE_MAXIMA:
+        raise ValueError(f"Idade deve estar entre 0 e {IDADE_MAXIMA} anos")
     
-    return jsonify({
-        'preco': get_info_preco(idade),
-        'idade_validada': idade
-    })
+    return _resposta_precalculada(PRECOS_POR_IDADE[idade], ETAGS_POR_IDADE[idade])
+
+@status_bp.route('/status/precos', methods=['GET'])
+@handle_status_errors
+def listar_precos():
+    """Faixas e tabela completa de preços (0 a 120 anos) em uma única resposta"""
+    return _resposta_precalculada(CATALOGO_CORPO, CATALOGO_ETAG)
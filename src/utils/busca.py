@@ -0,0 +1,29 @@
+"""
+Normalização de texto para busca sem acentos
+
+"João Saldanha" e "joao saldanha" produzem a mesma forma normalizada, que é
+gravada em User.nome_busca e comparada com o termo digitado no painel.
+"""
+import re
+import unicodedata
+
+def normalizar_texto(texto):
+    """
+    Remove acentos, converte para minúsculas e colapsa espaços
+    
+    Args:
+        texto (str): texto original
+        
+    Returns:
+        str: texto normalizado
+    """
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', sem_acentos).strip().lower()
+
+def termos_busca(texto, limite=5):
+    """Quebra o termo digitado em palavras normalizadas (no máximo `limite`)"""
+    normalizado = normalizar_texto(texto)
+    return normalizado.split(' ')[:limite] if normalizado else []
@@ -0,0 +1,246 @@
+"""
+Cache em memória (por worker) com TTL, LRU e single-flight
+
+Requisições concorrentes para a mesma chave ausente esperam uma única
+computação em vez de repetirem as mesmas queries.
+
+Cada worker do gunicorn tem os seus caches; as invalidações do painel são
+difundidas aos demais pelo canal de eventos (src/utils/eventos.py).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response
+from src.utils.eventos import ao_receber, difundir, iniciar_listener
+
+class TTLCache:
+    """Cache LRU com expiração por TTL e colapso de misses concorrentes"""
+    
+    def __init__(self, ttl, maxsize=256, wait_timeout=30):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.wait_timeout = wait_timeout
+        self._data = OrderedDict()  # chave -> (expira_em, valor)
+        self._inflight = {}  # chave -> threading.Event
+        self._lock = threading.Lock()
+        # Avança a cada invalidate(): um cálculo iniciado antes dela não é gravado
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0  # misses atendidos pela computação de outra thread
+    
+    def _lookup(self, key, now):
+        """Busca uma entrada válida; deve ser chamado com o lock adquirido"""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expira_em, valor = entry
+        if expira_em <= now:
+            del self._data[key]
+            self.evictions += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, valor
+    
+    def _store(self, key, valor, ttl):
+        """Grava uma entrada; deve ser chamado com o lock adquirido"""
+        self._data[key] = (time.monotonic() + ttl, valor)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def get(self, key):
+        with self._lock:
+            encontrado, valor = self._lookup(key, time.monotonic())
+            if encontrado:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return valor if encontrado else None
+    
+    def set(self, key, valor, ttl=None):
+        with self._lock:
+            self._store(key, valor, self.ttl if ttl is None else ttl)
+    
+    def get_or_compute(self, key, compute, ttl=None, cacheable=None):
+        """
+        Retorna o valor em cache ou o calcula uma única vez por chave
+        
+        Args:
+            key: chave (hashable)
+            compute: função sem argumentos que produz o valor
+            ttl (float): TTL específico desta entrada (padrão: self.ttl)
+            cacheable: função valor -> bool; valores recusados não são gravados
+        
+        Returns:
+            valor em cache ou recém-calculado
+        """
+        ttl = self.ttl if ttl is None else ttl
+        contabilizado = False
+        
+        while True:
+            with self._lock:
+                encontrado, valor = self._lookup(key, time.monotonic())
+                if encontrado:
+                    if not contabilizado:
+                        self.hits += 1
+                    return valor
+                
+                if not contabilizado:
+                    self.misses += 1
+                    contabilizado = True
+                
+                evento = self._inflight.get(key)
+                if evento is None:
+                    evento = threading.Event()
+                    self._inflight[key] = evento
+                    geracao = self._geracao
+                    lider = True
+                else:
+                    lider = False
+            
+            if lider:
+                break
+            
+            # Outra thread já está calculando: espera e tenta ler de novo
+            if not evento.wait(self.wait_timeout):
+                return compute()
+            with self._lock:
+                encontrado, valor = self._lookup(key, time.monotonic())
+                if encontrado:
+                    self.coalesced += 1
+                    return valor
+            # Líder falhou ou o valor não era cacheável: calcula sem cache
+            return compute()
+        
+        try:
+            valor = compute()
+            if cacheable is None or cacheable(valor):
+                with self._lock:
+                    # Houve invalidação durante o cálculo: o valor pode ser anterior à mutação
+                    if self._geracao == geracao:
+                        self._store(key, valor, ttl)
+            return valor
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+    
+    def invalidate(self, predicate=None):
+        """Remove as entradas cuja chave satisfaz o predicado (ou todas)"""
+        with self._lock:
+            if predicate is None:
+                removidas = list(self._data)
+            else:
+                removidas = [key for key in self._data if predicate(key)]
+            for key in removidas:
+                del self._data[key]
+            self._geracao += 1
+            self.invalidations += len(removidas)
+            return len(removidas)
+    
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced,
+                'hit_rate': round(self.hits / total, 4) if total else None
+            }
+
+# Cache das leituras administrativas (TTL configurável por ADMIN_CACHE_TTL)
+admin_cache = TTLCache(ttl=float(os.getenv('ADMIN_CACHE_TTL', 10)), maxsize=512)
+
+def cached_admin_view(namespace, ttl=None):
+    """
+    Decorator para rotas administrativas de leitura
+    
+    Deve ser aplicado abaixo de @admin_token_required, para que a autenticação
+    aconteça antes de consultar o cache. A chave é o namespace mais a rota e os
+    argumentos da query string; apenas respostas 200 são guardadas.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = (
+                namespace,
+                request.path,
+                tuple(sorted(request.args.items(multi=True)))
+            )
+            
+            def compute():
+                # Este worker passa a guardar dados: precisa ouvir as invalidações
+                iniciar_listener()
+                response = make_response(f(*args, **kwargs))
+                return response.status_code, response.content_type, response.get_data()
+            
+            status_code, content_type, body = admin_cache.get_or_compute(
+                key, compute, ttl=ttl, cacheable=lambda valor: valor[0] == 200
+            )
+            return make_response(body, status_code, {'Content-Type': content_type})
+        return decorated
+    return decorator
+
+def _invalidar_local(namespaces):
+    if not namespaces:
+        return admin_cache.invalidate()
+    return admin_cache.invalidate(lambda key: key[0] in namespaces)
+
+def invalidate_admin_cache(*namespaces):
+    """
+    Invalida as leituras administrativas dos namespaces informados (ou todas)
+    
+    Chamar depois do commit: invalida neste worker na hora e avisa os demais.
+    """
+    removidas = _invalidar_local(namespaces)
+    difundir('cache.admin', namespaces=list(namespaces))
+    return removidas
+
+ao_receber('cache.admin', lambda dados: _invalidar_local(dados['namespaces']))
+
+# Microcache das rotas públicas: poucos segundos, compartilhado pelas threads do worker
+public_cache = TTLCache(ttl=float(os.getenv('PUBLIC_MICROCACHE_TTL', 2)), maxsize=256)
+
+def microcache(ttl=None):
+    """
+    Decorator para rotas públicas e anônimas (não dependem de usuário nem cookies)
+    
+    Guarda respostas 200 por `ttl` segundos (PUBLIC_MICROCACHE_TTL, padrão 2)
+    e as marca com Cache-Control público, para que CDN ou proxy reverso também
+    as reaproveitem. Com TTL 0 o cache fica desligado.
+    
+    A entrada guarda o corpo em bytes e a lista final de headers; um acerto
+    apenas monta o Response com eles, sem serializar nem copiar o corpo de novo.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            validade = public_cache.ttl if ttl is None else ttl
+            if validade <= 0:
+                return f(*args, **kwargs)
+            
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            
+            def compute():
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    response.headers['Cache-Control'] = f'public, max-age={int(validade)}'
+                    response.vary.add('Accept-Encoding')
+                return response.status_code, response.headers.to_wsgi_list(), response.get_data()
+            
+            status_code, headers, body = public_cache.get_or_compute(
+                key, compute, ttl=validade, cacheable=lambda valor: valor[0] == 200
+            )
+            return current_app.response_class(body, status=status_code, headers=headers)
+        return decorated
+    return decorator
@@ -0,0 +1,254 @@
+"""
+Contadores incrementais do painel administrativo
+
+As rotas que alteram usuários, pedidos e reservas ajustam a linha única de
+`dashboard_counters` na mesma transação da alteração, de modo que o endpoint
+de estatísticas lê tudo por chave primária em vez de varrer as tabelas.
+"""
+from datetime import datetime
+from sqlalchemy import func, select, update
+from src.models.user import db, User
+from src.models.dashboard import DashboardCounters
+from src.models.pedido import Pedido
+from src.models.reserva import Reserva
+
+COUNTERS_ID = 1
+
+STATUS_PAGOS = ('pago', 'confirmado')
+
+COLUNA_STATUS_PEDIDO = {
+    'pendente': 'pedidos_pendentes',
+    'pago': 'pedidos_pagos',
+    'confirmado': 'pedidos_confirmados',
+    'cancelado': 'pedidos_cancelados'
+}
+
+COLUNA_DESCENDENCIA = {
+    'veras': 'usuarios_veras',
+    'saldanha': 'usuarios_saldanha'
+}
+
+COLUNA_TIPO_MESA = {
+    'VIP': 'reservas_vip',
+    'Premium': 'reservas_premium',
+    'Standard': 'reservas_standard'
+}
+
+def ajustar_contadores(**deltas):
+    """
+    Soma os deltas informados às colunas do contador com um único UPDATE
+    
+    Args:
+        **deltas: coluna=delta (ex.: pedidos_pendentes=-1, pedidos_pagos=1)
+    """
+    deltas = {coluna: delta for coluna, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    
+    valores = {
+        coluna: getattr(DashboardCounters, coluna) + delta
+        for coluna, delta in deltas.items()
+    }
+    valores['updated_at'] = datetime.utcnow()
+    
+    db.session.execute(
+        update(DashboardCounters)
+        .where(DashboardCounters.id == COUNTERS_ID)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+
+def transicionar(objeto, coluna, anterior, novo, **valores):
+    """
+    Troca `coluna` de `anterior` para `novo` com um UPDATE condicional
+    
+    Ler o status e depois gravá-lo não é atômico: duas requisições simultâneas
+    sobre a mesma linha passariam ambas pela verificação e aplicariam o delta
+    duas vezes. Só a requisição cujo UPDATE alterou a linha deve ajustar os
+    contadores.
+    
+    Args:
+        objeto: instância já carregada (é atualizada em memória também)
+        coluna (str): nome da coluna de status
+        anterior: valor esperado no banco
+        novo: valor a gravar
+        **valores: colunas extras a atualizar junto
+    
+    Returns:
+        bool: True se esta requisição fez a transição
+    """
+    modelo = type(objeto)
+    resultado = db.session.execute(
+        update(modelo)
+        .where(modelo.id == objeto.id, getattr(modelo, coluna) == anterior)
+        .values({coluna: novo, **valores})
+    )
+    return resultado.rowcount == 1
+
+def _somar(deltas, coluna, valor):
+    if coluna:
+        deltas[coluna] = deltas.get(coluna, 0) + valor
+
+def registrar_usuario(user, sinal=1):
+    """Conta (sinal=1) ou desconta (sinal=-1) um usuário ativo"""
+    deltas = {}
+    _somar(deltas, 'usuarios_ativos', sinal)
+    _somar(deltas, COLUNA_DESCENDENCIA.get(user.descendencia), sinal)
+    ajustar_contadores(**deltas)
+
+def registrar_usuarios(usuarios, sinal=1):
+    """Versão em lote de registrar_usuario (linhas com descendencia)"""
+    deltas = {}
+    for user in usuarios:
+        _somar(deltas, 'usuarios_ativos', sinal)
+        _somar(deltas, COLUNA_DESCENDENCIA.get(user.descendencia), sinal)
+    ajustar_contadores(**deltas)
+
+def registrar_pedido(pedido):
+    """Conta um pedido recém-criado"""
+    deltas = {'pedidos_total': 1}
+    _somar(deltas, COLUNA_STATUS_PEDIDO.get(pedido.status), 1)
+    if pedido.status in STATUS_PAGOS:
+        deltas['receita_total'] = pedido.valor_total
+        deltas['camisas_vendidas'] = pedido.total_camisas
+    ajustar_contadores(**deltas)
+
+def registrar_mudanca_status_pedido(pedido, status_anterior, status_novo):
+    """Move um pedido entre os contadores de status (e de vendas, se for o caso)"""
+    if status_anterior == status_novo:
+        return
+    
+    deltas = {}
+    _somar(deltas, COLUNA_STATUS_PEDIDO.get(status_anterior), -1)
+    _somar(deltas, COLUNA_STATUS_PEDIDO.get(status_novo), 1)
+    
+    era_pago = status_anterior in STATUS_PAGOS
+    e_pago = status_novo in STATUS_PAGOS
+    if era_pago != e_pago:
+        sinal = 1 if e_pago else -1
+        deltas['receita_total'] = sinal * pedido.valor_total
+        deltas['camisas_vendidas'] = sinal * pedido.total_camisas
+    
+    ajustar_contadores(**deltas)
+
+def registrar_mudancas_status_pedidos(pedidos, status_novo):
+    """
+    Versão em lote de registrar_mudanca_status_pedido (um único UPDATE do contador)
+    
+    Args:
+        pedidos: linhas com status_anterior, valor_total e total_camisas
+            (ex.: resultado de UPDATE ... RETURNING)
+        status_novo (str): status de destino de todas as linhas
+    """
+    deltas = {}
+    e_pago = status_novo in STATUS_PAGOS
+    for pedido in pedidos:
+        if pedido.status_anterior == status_novo:
+            continue
+        _somar(deltas, COLUNA_STATUS_PEDIDO.get(pedido.status_anterior), -1)
+        _somar(deltas, COLUNA_STATUS_PEDIDO.get(status_novo), 1)
+        if (pedido.status_anterior in STATUS_PAGOS) != e_pago:
+            sinal = 1 if e_pago else -1
+            _somar(deltas, 'receita_total', sinal * pedido.valor_total)
+            _somar(deltas, 'camisas_vendidas', sinal * pedido.total_camisas)
+    
+    if deltas:
+        ajustar_contadores(**deltas)
+
+def registrar_reserva(reserva, sinal=1):
+    """Conta (sinal=1) ou desconta (sinal=-1) uma reserva confirmada"""
+    deltas = {}
+    _somar(deltas, 'reservas_confirmadas', sinal)
+    _somar(deltas, COLUNA_TIPO_MESA.get(reserva.mesa_tipo), sinal)
+    ajustar_contadores(**deltas)
+
+def calcular_contadores():
+    """
+    Recalcula todos os contadores a partir das tabelas (3 queries agregadas)
+    
+    Returns:
+        dict: valores de cada coluna de DashboardCounters
+    """
+    ativo = User.is_active == True
+    usuarios = db.session.query(
+        func.count(User.id).filter(ativo),
+        func.count(User.id).filter(ativo, User.descendencia == 'veras'),
+        func.count(User.id).filter(ativo, User.descendencia == 'saldanha')
+    ).one()
+    
+    pago = Pedido.status.in_(STATUS_PAGOS)
+    pedidos = db.session.query(
+        func.count(Pedido.id),
+        func.count(Pedido.id).filter(Pedido.status == 'pendente'),
+        func.count(Pedido.id).filter(Pedido.status == 'pago'),
+        func.count(Pedido.id).filter(Pedido.status == 'confirmado'),
+        func.count(Pedido.id).filter(Pedido.status == 'cancelado'),
+        func.coalesce(func.sum(Pedido.valor_total).filter(pago), 0),
+        func.coalesce(func.sum(Pedido.total_camisas).filter(pago), 0)
+    ).one()
+    
+    confirmada = Reserva.status == 'confirmada'
+    reservas = db.session.query(
+        func.count(Reserva.id).filter(confirmada),
+        func.count(Reserva.id).filter(confirmada, Reserva.mesa_tipo == 'VIP'),
+        func.count(Reserva.id).filter(confirmada, Reserva.mesa_tipo == 'Premium'),
+        func.count(Reserva.id).filter(confirmada, Reserva.mesa_tipo == 'Standard')
+    ).one()
+    
+    return {
+        'usuarios_ativos': usuarios[0],
+        'usuarios_veras': usuarios[1],
+        'usuarios_saldanha': usuarios[2],
+        'pedidos_total': pedidos[0],
+        'pedidos_pendentes': pedidos[1],
+        'pedidos_pagos': pedidos[2],
+        'pedidos_confirmados': pedidos[3],
+        'pedidos_cancelados': pedidos[4],
+        'receita_total': float(pedidos[5]),
+        'camisas_vendidas': int(pedidos[6]),
+        'reservas_confirmadas': reservas[0],
+        'reservas_vip': reservas[1],
+        'reservas_premium': reservas[2],
+        'reservas_standard': reservas[3]
+    }
+
+def reconstruir_contadores():
+    """
+    Recalcula os contadores do zero e grava a linha única (reparo de divergências)
+    
+    Returns:
+        DashboardCounters: linha atualizada
+    """
+    valores = calcular_contadores()
+    
+    contadores = db.session.get(DashboardCounters, COUNTERS_ID, with_for_update=True)
+    if contadores is None:
+        contadores = DashboardCounters(id=COUNTERS_ID)
+        db.session.add(contadores)
+    
+    for coluna, valor in valores.items():
+        setattr(contadores, coluna, valor)
+    contadores.updated_at = datetime.utcnow()
+    
+    db.session.commit()
+    return contadores
+
+def obter_contadores():
+    """Lê a linha de contadores por chave primária, criando-a se ainda não existir"""
+    contadores = db.session.get(DashboardCounters, COUNTERS_ID)
+    if contadores is None:
+        contadores = reconstruir_contadores()
+    return contadores
+
+def contar_atividade_recente(desde):
+    """
+    Conta cadastros, pedidos e reservas a partir de uma data em uma única query
+    
+    Returns:
+        tuple: (novos_usuarios, novos_pedidos, novas_reservas)
+    """
+    return db.session.execute(select(
+        select(func.count(User.id)).where(User.created_at >= desde).scalar_subquery(),
+        select(func.count(Pedido.id)).where(Pedido.data_pedido >= desde).scalar_subquery(),
+        select(func.count(Reserva.id)).where(Reserva.data_reserva >= desde).scalar_subquery()
+    )).one()
@@ -0,0 +1,136 @@
+"""
+Séries temporais do painel a partir de um rollup diário
+
+Cada dia já encerrado (UTC) é agregado uma única vez e gravado em
+`dashboard_daily_rollup`; apenas o dia corrente (bucket aberto) é recalculado
+a cada consulta, com uma query restrita às últimas horas.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db, User
+from src.models.dashboard import DashboardDailyRollup
+from src.models.pedido import Pedido
+from src.models.pagamento import Pagamento
+
+METRICAS = ('cadastros', 'pedidos', 'receita')
+GRANULARIDADES = ('dia', 'semana')
+
+def _definicao_metrica(metrica):
+    """Retorna (coluna de data, expressão de valor, filtros) da métrica"""
+    if metrica == 'cadastros':
+        return User.created_at, None, []
+    if metrica == 'pedidos':
+        return Pedido.data_pedido, Pedido.valor_total, []
+    if metrica == 'receita':
+        return Pagamento.data_confirmacao, Pagamento.valor, [Pagamento.status == 'confirmado']
+    raise ValueError(f'Métrica inválida: {metrica}')
+
+def _para_data(valor):
+    """Normaliza o retorno de func.date (date no PostgreSQL, texto no SQLite)"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+def agregar_por_dia(metrica, inicio, fim):
+    """
+    Agrega a métrica por dia diretamente nas tabelas de origem
+    
+    Args:
+        metrica (str): cadastros, pedidos ou receita
+        inicio (date): primeiro dia (inclusive)
+        fim (date): último dia (inclusive)
+        
+    Returns:
+        dict: {date: (quantidade, valor)}
+    """
+    coluna, valor, filtros = _definicao_metrica(metrica)
+    dia = func.date(coluna)
+    soma = func.coalesce(func.sum(valor), 0) if valor is not None else db.literal(0)
+    
+    linhas = db.session.query(dia, func.count(), soma).filter(
+        coluna >= datetime.combine(inicio, datetime.min.time()),
+        coluna < datetime.combine(fim + timedelta(days=1), datetime.min.time()),
+        *filtros
+    ).group_by(dia).all()
+    
+    return {
+        _para_data(d): (quantidade, float(total))
+        for d, quantidade, total in linhas
+    }
+
+def _dias(inicio, fim):
+    return [inicio + timedelta(days=n) for n in range((fim - inicio).days + 1)]
+
+def serie_diaria(metrica, inicio, fim):
+    """
+    Série diária [inicio, fim] lida do rollup, completando dias fechados ausentes
+    
+    Returns:
+        list: [(date, quantidade, valor)] em ordem cronológica
+    """
+    _definicao_metrica(metrica)
+    hoje = datetime.utcnow().date()
+    ultimo_fechado = min(fim, hoje - timedelta(days=1))
+    
+    valores = {}
+    if inicio <= ultimo_fechado:
+        linhas = DashboardDailyRollup.query.filter(
+            DashboardDailyRollup.metrica == metrica,
+            DashboardDailyRollup.dia >= inicio,
+            DashboardDailyRollup.dia <= ultimo_fechado
+        ).all()
+        valores = {linha.dia: (linha.quantidade, linha.valor) for linha in linhas}
+        
+        ausentes = [d for d in _dias(inicio, ultimo_fechado) if d not in valores]
+        if ausentes:
+            # Uma única query cobre todo o intervalo ainda não agregado
+            calculados = agregar_por_dia(metrica, ausentes[0], ausentes[-1])
+            novos = []
+            for d in ausentes:
+                quantidade, valor = calculados.get(d, (0, 0.0))
+                valores[d] = (quantidade, valor)
+                novos.append({'metrica': metrica, 'dia': d, 'quantidade': quantidade,
+                              'valor': valor, 'updated_at': datetime.utcnow()})
+            try:
+                db.session.execute(db.insert(DashboardDailyRollup), novos)
+                db.session.commit()
+            except IntegrityError:
+                # Outro worker gravou os mesmos dias; os valores calculados são iguais
+                db.session.rollback()
+    
+    if fim >= hoje:
+        # Bucket aberto: sempre recalculado, nunca gravado
+        valores.update(agregar_por_dia(metrica, hoje, hoje))
+    
+    return [(d, *valores.get(d, (0, 0.0))) for d in _dias(inicio, fim)]
+
+def serie(metrica, granularidade, inicio, fim):
+    """
+    Série agrupada por dia ou por semana (semanas começando na segunda-feira)
+    
+    Returns:
+        list: [{'inicio': 'AAAA-MM-DD', 'quantidade': int, 'valor': float}]
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f'Granularidade inválida: {granularidade}')
+    
+    buckets = {}
+    for d, quantidade, valor in serie_diaria(metrica, inicio, fim):
+        chave = d if granularidade == 'dia' else d - timedelta(days=d.weekday())
+        atual = buckets.setdefault(chave, [0, 0.0])
+        atual[0] += quantidade
+        atual[1] += valor
+    
+    return [
+        {'inicio': chave.isoformat(), 'quantidade': quantidade, 'valor': round(valor, 2)}
+        for chave, (quantidade, valor) in sorted(buckets.items())
+    ]
+
+def reconstruir_rollup():
+    """Apaga o rollup diário; os dias são reagregados na próxima consulta"""
+    removidos = DashboardDailyRollup.query.delete()
+    db.session.commit()
+    return removidos
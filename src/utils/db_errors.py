@@ -0,0 +1,26 @@
+"""
+Identificação de violações de restrições do banco
+
+As rotas de escrita inserem direto e deixam o banco garantir unicidade; este
+helper diz qual restrição foi violada para mapear o erro à resposta certa.
+"""
+
+def violou_restricao(erro, nome_restricao, coluna=None):
+    """
+    Verifica se um IntegrityError veio de uma restrição específica
+    
+    Args:
+        erro (IntegrityError): erro capturado no commit/flush
+        nome_restricao (str): nome do índice/restrição (PostgreSQL informa o nome)
+        coluna (str): 'tabela.coluna' como o SQLite reporta a violação
+        
+    Returns:
+        bool: True se a violação corresponde à restrição
+    """
+    original = getattr(erro, 'orig', erro)
+    diag = getattr(original, 'diag', None)
+    if diag is not None and getattr(diag, 'constraint_name', None):
+        return diag.constraint_name == nome_restricao
+    
+    mensagem = str(original)
+    return nome_restricao in mensagem or (coluna is not None and coluna in mensagem)
@@ -0,0 +1,90 @@
+"""
+Versão da disponibilidade de mesas
+
+Cada reserva ou cancelamento incrementa um contador global e grava o novo
+valor na mesa alterada. Com isso /api/mesas responde 304 quando nada mudou,
+devolve apenas as mesas alteradas desde uma versão e pode segurar a
+requisição (long-poll) até a versão avançar.
+
+O contador é avançado depois do commit da reserva, numa transação própria e
+curta: a linha única de mesas_versao fica travada só durante esse UPDATE, e
+não durante toda a transação da reserva, o que serializava reservas de mesas
+diferentes. Como a versão só avança com a alteração já visível, quem lê a
+versão nova sempre enxerga a mesa alterada.
+"""
+import logging
+import os
+import threading
+import time
+from sqlalchemy import select, update
+from src.models.user import db
+from src.models.mesa import Mesa, MesasVersao
+
+logger = logging.getLogger(__name__)
+
+MAX_ESPERA = 25  # segundos; abaixo do timeout do gunicorn
+INTERVALO_ESPERA = 0.5
+# Long-polls simultâneos por worker: cada um segura uma thread do gthread
+MAX_ESPERAS = int(os.getenv('MAX_LONG_POLLS', 4))
+
+class LongPollBusy(Exception):
+    """Todas as vagas de long-poll deste worker estão ocupadas"""
+
+_vagas_espera = threading.BoundedSemaphore(MAX_ESPERAS)
+
+def marcar_mesa_alterada(numero):
+    """
+    Incrementa a versão global e a registra na mesa (chamar depois do commit)
+    
+    A reserva já foi gravada quando isto roda, então uma falha aqui é apenas
+    registrada: o cliente recebe o sucesso e só o aviso de mudança se perde
+    (a próxima alteração avança a versão de novo).
+    
+    Returns:
+        int | None: nova versão, ou None se não foi possível avançá-la
+    """
+    try:
+        with db.engine.begin() as conn:
+            versao = conn.execute(
+                update(MesasVersao)
+                .where(MesasVersao.id == 1)
+                .values(versao=MesasVersao.versao + 1)
+                .returning(MesasVersao.versao)
+            ).scalar()
+            if versao is None:
+                raise RuntimeError('mesas_versao não inicializada; rode python src/manage.py migrate')
+            conn.execute(update(Mesa).where(Mesa.numero == numero).values(versao=versao))
+        return versao
+    except Exception:
+        logger.exception("Falha ao avançar a versão das mesas (mesa %s)", numero)
+        return None
+
+def versao_atual():
+    """Versão global atual (0 se nenhuma alteração foi registrada)"""
+    return db.session.execute(
+        select(MesasVersao.versao).where(MesasVersao.id == 1)
+    ).scalar() or 0
+
+def aguardar_nova_versao(conhecida, espera):
+    """
+    Long-poll: aguarda até `espera` segundos a versão passar de `conhecida`
+    
+    Returns:
+        int: versão atual ao fim da espera
+    
+    Raises:
+        LongPollBusy: já há MAX_ESPERAS long-polls neste worker
+    """
+    if not _vagas_espera.acquire(blocking=False):
+        raise LongPollBusy('Muitas requisições aguardando, tente novamente em instantes')
+    try:
+        limite = time.monotonic() + min(max(espera, 0), MAX_ESPERA)
+        versao = versao_atual()
+        while versao <= conhecida and time.monotonic() < limite:
+            # Encerra a transação para enxergar commits de outros workers
+            db.session.rollback()
+            time.sleep(INTERVALO_ESPERA)
+            versao = versao_atual()
+        return versao
+    finally:
+        _vagas_espera.release()
@@ -0,0 +1,265 @@
+"""
+Feed de eventos do painel administrativo
+
+As rotas de escrita publicam eventos compactos (pedido.criado,
+pagamento.pendente, reserva.cancelada...). No PostgreSQL o evento vai por
+pg_notify dentro da transação, sendo entregue apenas no commit e a todos os
+workers, onde uma thread com LISTEN repassa aos assinantes locais. Nos
+demais bancos (ex.: SQLite em testes) a entrega é em processo, após o commit.
+
+O mesmo canal leva eventos internos (difundir/ao_receber), como a
+invalidação dos caches em memória de cada worker; esses não chegam ao SSE.
+"""
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'admin_eventos'
+TAMANHO_FILA = 100
+# Cada stream ocupa uma thread do worker gthread enquanto o painel está aberto;
+# o limite deixa threads livres para as demais requisições
+MAX_STREAMS = int(os.getenv('MAX_SSE_STREAMS', 4))
+# O PostgreSQL recusa payloads de NOTIFY com 8000 bytes ou mais, abortando a
+# transação de quem publica; eventos maiores que isto são resumidos
+LIMITE_PAYLOAD = 7900
+
+class StreamsBusy(Exception):
+    """Todas as vagas de stream SSE deste worker estão ocupadas"""
+
+class Broker:
+    """Distribui eventos para as filas dos assinantes deste worker"""
+    
+    def __init__(self, max_assinantes=MAX_STREAMS):
+        self._assinantes = set()
+        self._lock = threading.Lock()
+        self.max_assinantes = max_assinantes
+        self.publicados = 0
+        self.descartados = 0
+        self.recusados = 0
+    
+    def assinar(self):
+        """Nova fila de assinante; StreamsBusy se o limite do worker foi atingido"""
+        fila = queue.Queue(maxsize=TAMANHO_FILA)
+        with self._lock:
+            if len(self._assinantes) >= self.max_assinantes:
+                self.recusados += 1
+                raise StreamsBusy('Limite de painéis ao vivo atingido, tente novamente em instantes')
+            self._assinantes.add(fila)
+        return fila
+    
+    def cancelar(self, fila):
+        with self._lock:
+            self._assinantes.discard(fila)
+    
+    def entregar(self, evento):
+        with self._lock:
+            assinantes = list(self._assinantes)
+            self.publicados += 1
+        for fila in assinantes:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                # Assinante lento: descarta em vez de bloquear quem publica
+                with self._lock:
+                    self.descartados += 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'assinantes': len(self._assinantes),
+                'max_assinantes': self.max_assinantes,
+                'publicados': self.publicados,
+                'descartados': self.descartados,
+                'recusados': self.recusados
+            }
+
+broker = Broker()
+
+def _serializar(evento):
+    """
+    JSON do evento, resumido se passar de LIMITE_PAYLOAD bytes
+    
+    Listas (ex.: ids de uma operação em lote) viram a sua contagem em
+    total_<campo> e o evento ganha 'resumido': True. Se ainda assim não
+    couber, só o tipo e a marcação de resumo são enviados.
+    """
+    payload = json.dumps(evento, default=str)
+    if len(payload.encode()) < LIMITE_PAYLOAD:
+        return payload
+    
+    dados = {}
+    for chave, valor in evento['dados'].items():
+        if isinstance(valor, (list, tuple, set)):
+            dados[f'total_{chave}'] = len(valor)
+        else:
+            dados[chave] = valor
+    resumido = {**evento, 'dados': dados, 'resumido': True}
+    payload = json.dumps(resumido, default=str)
+    if len(payload.encode()) < LIMITE_PAYLOAD:
+        return payload
+    return json.dumps({**evento, 'dados': {}, 'resumido': True}, default=str)
+
+_tratadores = {}  # tipo -> funções executadas em cada worker ao receber o evento interno
+
+def ao_receber(tipo, tratador):
+    """Registra tratador(dados) para os eventos internos do tipo, em todos os workers"""
+    _tratadores.setdefault(tipo, []).append(tratador)
+
+def _tratar_interno(evento):
+    for tratador in _tratadores.get(evento['tipo'], []):
+        try:
+            tratador(evento['dados'])
+        except Exception:
+            logger.exception("Falha ao tratar o evento interno %s", evento['tipo'])
+
+def difundir(tipo, **dados):
+    """
+    Envia um evento interno aos demais workers, fora da transação corrente
+    
+    Chamado depois do commit, quando o worker local já se atualizou. No
+    PostgreSQL o pg_notify vai numa conexão própria; nos demais bancos há um
+    único processo e não há a quem avisar. Falhas são apenas registradas: o
+    TTL dos caches continua limitando a defasagem.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    evento = {'tipo': tipo, 'dados': dados, 'interno': True}
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                text('SELECT pg_notify(:canal, :payload)'),
+                {'canal': CANAL, 'payload': _serializar(evento)}
+            )
+    except Exception as e:
+        logger.error(f"Falha ao difundir {tipo}: {str(e)}")
+
+def _usa_notify(session):
+    return session.get_bind().dialect.name == 'postgresql'
+
+def publicar(tipo, **dados):
+    """
+    Publica um evento na transação corrente (entregue somente se houver commit)
+    
+    Args:
+        tipo (str): nome do evento, ex.: 'pedido.criado'
+        **dados: campos compactos do evento (ids, valores)
+    """
+    evento = {'tipo': tipo, 'dados': dados, 'ts': datetime.utcnow().isoformat()}
+    session = db.session()
+    
+    if _usa_notify(session):
+        session.execute(
+            text('SELECT pg_notify(:canal, :payload)'),
+            {'canal': CANAL, 'payload': _serializar(evento)}
+        )
+    else:
+        # Mesmo formato que os demais workers receberiam pelo LISTEN
+        session.info.setdefault('eventos_pendentes', []).append(json.loads(_serializar(evento)))
+
+def publicar_lote(tipo, ids, tamanho=500, **dados):
+    """
+    Publica o evento de uma operação em lote, com os ids em partes
+    
+    Cada parte vira um evento próprio (com parte/partes), de modo que nenhum
+    payload se aproxime do limite do NOTIFY mesmo nos maiores lotes.
+    
+    Args:
+        tipo (str): nome do evento, ex.: 'pedido.status_lote'
+        ids (list): ids alterados
+        tamanho (int): ids por evento
+        **dados: campos repetidos em todas as partes
+    """
+    partes = [ids[inicio:inicio + tamanho] for inicio in range(0, len(ids), tamanho)]
+    for numero, parte in enumerate(partes, 1):
+        publicar(tipo, ids=parte, total=len(ids), parte=numero, partes=len(partes), **dados)
+
+@event.listens_for(Session, 'after_commit')
+def _entregar_pendentes(session):
+    for evento in session.info.pop('eventos_pendentes', []):
+        broker.entregar(evento)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_pendentes(session, transacao_anterior):
+    session.info.pop('eventos_pendentes', None)
+
+_listener_lock = threading.Lock()
+_listener = None
+
+def _escutar(url):
+    """Thread de LISTEN no PostgreSQL; reconecta com espera em caso de erro"""
+    import psycopg2
+    import psycopg2.extensions
+    
+    while True:
+        try:
+            conn = psycopg2.connect(url)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {CANAL}')
+            logger.info("Escutando eventos do painel no canal %s", CANAL)
+            
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notificacao = conn.notifies.pop(0)
+                    try:
+                        evento = json.loads(notificacao.payload)
+                    except ValueError:
+                        logger.warning("Evento inválido ignorado: %s", notificacao.payload)
+                        continue
+                    if evento.get('interno'):
+                        _tratar_interno(evento)
+                    else:
+                        broker.entregar(evento)
+        except Exception as e:
+            logger.error(f"Falha no LISTEN de eventos, reconectando: {str(e)}")
+            time.sleep(5)
+
+def iniciar_listener():
+    """
+    Inicia (uma vez por worker) a thread de LISTEN quando o banco é PostgreSQL
+    
+    Chamado pelo stream do painel e sempre que um cache em memória é
+    preenchido, para que todo worker com dados em cache receba as invalidações.
+    """
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            url = db.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+            _listener = threading.Thread(target=_escutar, args=(url,), name='admin-eventos', daemon=True)
+            _listener.start()
+
+def stream_sse(fila, heartbeat=15):
+    """
+    Gera o corpo text/event-stream a partir da fila de um assinante
+    
+    O gerador não usa o banco, então não segura sessão nem conexão enquanto
+    o painel estiver aberto; a fila é liberada quando o cliente desconecta.
+    """
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                evento = fila.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            yield f"event: {evento['tipo']}\ndata: {json.dumps(evento, default=str)}\n\n"
+    finally:
+        broker.cancelar(fila)
@@ -0,0 +1,91 @@
+"""
+Exportação em streaming (NDJSON/CSV) das listagens administrativas
+
+As linhas são lidas em lotes com cursor no servidor (yield_per) e enviadas
+à medida que são serializadas, com memória constante em relação à tabela.
+"""
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+from sqlalchemy import inspect
+
+FORMATOS_EXPORTACAO = ('ndjson', 'csv')
+TAMANHO_LOTE = 500
+
+def _achatar(dados, prefixo=''):
+    """Achata dicionários aninhados (ex.: usuario.email) para colunas CSV"""
+    linha = {}
+    for chave, valor in dados.items():
+        nome = f'{prefixo}{chave}'
+        if isinstance(valor, dict):
+            linha.update(_achatar(valor, f'{nome}.'))
+        else:
+            linha[nome] = valor
+    return linha
+
+def _linhas(query):
+    return query.execution_options(stream_results=True).yield_per(TAMANHO_LOTE)
+
+def _gerar_ndjson(query, serializer):
+    for item in _linhas(query):
+        yield json.dumps(serializer(item), ensure_ascii=False, default=str) + '\n'
+
+def _colunas_sem_linhas(query, serializer):
+    """
+    Colunas do CSV quando a consulta não retorna linhas
+    
+    Serializa uma instância transitória do modelo consultado, com as relações
+    muitos-para-um preenchidas, para obter o mesmo cabeçalho de uma linha real.
+    """
+    modelo = query.column_descriptions[0]['entity']
+    item = modelo()
+    for relacao in inspect(modelo).relationships:
+        if not relacao.uselist:
+            setattr(item, relacao.key, relacao.mapper.class_())
+    return list(_achatar(serializer(item)))
+
+def _gerar_csv(query, serializer):
+    buffer = io.StringIO()
+    writer = None
+    for item in _linhas(query):
+        linha = _achatar(serializer(item))
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(linha), extrasaction='ignore', restval='')
+            writer.writeheader()
+        writer.writerow(linha)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    
+    # Resultado vazio: ainda assim um CSV válido, só com o cabeçalho
+    if writer is None:
+        csv.writer(buffer).writerow(_colunas_sem_linhas(query, serializer))
+        yield buffer.getvalue()
+
+def stream_export(query, serializer, formato, nome_arquivo):
+    """
+    Resposta em streaming para uma consulta
+    
+    Args:
+        query: consulta ordenada (sem .all())
+        serializer: função item -> dict
+        formato (str): 'ndjson' ou 'csv'
+        nome_arquivo (str): nome do anexo, sem extensão
+        
+    Returns:
+        Response: resposta com corpo gerado sob demanda
+    """
+    if formato == 'csv':
+        gerador, mimetype = _gerar_csv(query, serializer), 'text/csv'
+    else:
+        gerador, mimetype = _gerar_ndjson(query, serializer), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(gerador),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={nome_arquivo}.{formato}',
+            'X-Accel-Buffering': 'no'
+        }
+    )
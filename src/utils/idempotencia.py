@@ -0,0 +1,144 @@
+"""
+Suporte ao header Idempotency-Key nas rotas de criação
+
+A primeira requisição com uma chave grava um registro 'processando' e, ao
+terminar, guarda a resposta. Repetições com a mesma chave recebem a resposta
+guardada sem executar a rota (nem consultar as tabelas de negócio);
+duplicatas concorrentes aguardam a primeira terminar.
+
+Um registro 'processando' mais antigo que PRAZO_PROCESSANDO (acima do timeout
+do gunicorn) é de um worker que morreu no meio da requisição: a próxima
+repetição o assume em vez de receber 409 até o expurgo.
+"""
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, make_response
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.idempotencia import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+TAMANHO_MAXIMO_CHAVE = 100
+ESPERA_DUPLICATA = 10  # segundos aguardando a requisição original
+VALIDADE = timedelta(hours=24)
+PRAZO_PROCESSANDO = timedelta(seconds=int(os.getenv('IDEMPOTENCY_STALE_AFTER', 130)))
+
+def _fingerprint():
+    conteudo = b'\n'.join([request.method.encode(), request.path.encode(), request.get_data()])
+    return hashlib.sha256(conteudo).hexdigest()
+
+def _resposta_guardada(registro):
+    resposta = make_response(registro.response_body or '', registro.response_status)
+    if registro.response_content_type:
+        resposta.headers['Content-Type'] = registro.response_content_type
+    resposta.headers['Idempotent-Replayed'] = 'true'
+    return resposta
+
+def _aguardar_original(usuario_id, chave, fingerprint):
+    """Resposta para uma chave já registrada (replay, conflito ou espera)"""
+    limite = time.monotonic() + ESPERA_DUPLICATA
+    while True:
+        db.session.rollback()
+        registro = IdempotencyKey.query.filter_by(usuario_id=usuario_id, chave=chave).first()
+        
+        if registro is None:
+            # A requisição original falhou e liberou a chave
+            return None
+        
+        if registro.fingerprint != fingerprint:
+            return jsonify({'error': f'{HEADER} já utilizada com outra requisição'}), 422
+        
+        if registro.status == 'concluido':
+            return _resposta_guardada(registro)
+        
+        if registro.created_at < datetime.utcnow() - PRAZO_PROCESSANDO:
+            # Original abandonada: libera a chave (só uma repetição vence o DELETE)
+            db.session.execute(
+                delete(IdempotencyKey)
+                .where(IdempotencyKey.id == registro.id, IdempotencyKey.status == 'processando')
+            )
+            db.session.commit()
+            return None
+        
+        if time.monotonic() >= limite:
+            return jsonify({'error': 'Requisição original ainda em processamento'}), 409, {'Retry-After': '1'}
+        
+        time.sleep(0.2)
+
+def idempotente(f):
+    """
+    Decorator para rotas POST protegidas por token_required
+    
+    Deve ser aplicado abaixo de @token_required. Sem o header a rota funciona
+    como antes. Respostas 5xx não são guardadas, permitindo nova tentativa.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        chave = request.headers.get(HEADER)
+        if not chave:
+            return f(current_user, *args, **kwargs)
+        
+        if len(chave) > TAMANHO_MAXIMO_CHAVE:
+            return jsonify({'error': f'{HEADER} deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres'}), 400
+        
+        fingerprint = _fingerprint()
+        
+        # Reserva a chave; o índice único decide quem processa
+        while True:
+            registro = IdempotencyKey(
+                usuario_id=current_user.id,
+                chave=chave,
+                rota=request.path,
+                fingerprint=fingerprint,
+                status='processando'
+            )
+            try:
+                db.session.add(registro)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                resposta = _aguardar_original(current_user.id, chave, fingerprint)
+                if resposta is not None:
+                    return resposta
+        
+        registro_id = registro.id
+        try:
+            resposta = make_response(f(current_user, *args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == registro_id))
+            db.session.commit()
+            raise
+        
+        db.session.rollback()
+        if resposta.status_code >= 500:
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == registro_id))
+        else:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.id == registro_id)
+                .values(
+                    status='concluido',
+                    response_status=resposta.status_code,
+                    response_body=resposta.get_data(as_text=True),
+                    response_content_type=resposta.content_type,
+                    completed_at=datetime.utcnow()
+                )
+            )
+        db.session.commit()
+        return resposta
+    
+    return decorated
+
+def expurgar_chaves_antigas():
+    """Remove chaves com mais de 24 horas"""
+    removidas = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - VALIDADE)
+    ).rowcount
+    db.session.commit()
+    return removidas
@@ -0,0 +1,151 @@
+"""
+Operações administrativas em lote
+
+Alterações de status aplicadas com UPDATE ... RETURNING sobre conjuntos de
+linhas, em vez de carregar e salvar um objeto por vez. Os contadores do
+painel são ajustados uma única vez por lote.
+"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from flask import request
+from sqlalchemy import case, insert, select, update
+from src.models.user import db
+from src.models.admin import AuditLog
+from src.models.pedido import Pedido
+from src.utils.dashboard_counters import COLUNA_STATUS_PEDIDO, registrar_mudancas_status_pedidos
+
+MAX_LOTE = 1000
+
+def ids_do_corpo(data, campo='ids'):
+    """
+    Lê e valida a lista de ids de um corpo JSON
+
+    Returns:
+        list: ids únicos, na ordem recebida
+
+    Raises:
+        ValueError: lista ausente, vazia, com valores não inteiros ou acima de MAX_LOTE
+    """
+    ids = (data or {}).get(campo)
+    if not isinstance(ids, list) or not ids:
+        raise ValueError(f'Informe uma lista não vazia em "{campo}"')
+    if len(ids) > MAX_LOTE:
+        raise ValueError(f'Máximo de {MAX_LOTE} itens por lote')
+    if not all(isinstance(item, int) and not isinstance(item, bool) for item in ids):
+        raise ValueError(f'"{campo}" deve conter apenas números inteiros')
+    return list(dict.fromkeys(ids))
+
+def _update_com_status_anterior(condicao, origens, status_novo, valores):
+    """
+    UPDATE ... FROM (SELECT ... FOR UPDATE) ... RETURNING anterior.status
+
+    A subconsulta trava as linhas e lê o status antes da escrita; o RETURNING
+    devolve esse valor junto com o id, tudo num único comando (PostgreSQL).
+    """
+    anterior = (
+        select(Pedido.id, Pedido.status)
+        .where(condicao, Pedido.status.in_(origens))
+        .with_for_update()
+        .subquery('anterior')
+    )
+    return db.session.execute(
+        update(Pedido)
+        .where(Pedido.id == anterior.c.id, Pedido.status == anterior.c.status)
+        .values(status=status_novo, **valores)
+        .returning(Pedido.id, Pedido.usuario_id, Pedido.valor_total, Pedido.total_camisas,
+                   anterior.c.status.label('status_anterior'))
+        .execution_options(synchronize_session=False)
+    ).all()
+
+def _update_com_case(condicao, origens, status_novo, valores):
+    """
+    Alternativa para o SQLite, cujo RETURNING não enxerga as tabelas do FROM
+
+    Lê os status e aplica um único UPDATE condicionado a eles (CASE por id):
+    um pedido alterado por outra transação no meio do caminho fica de fora.
+    """
+    anteriores = dict(db.session.execute(
+        select(Pedido.id, Pedido.status).where(condicao, Pedido.status.in_(origens))
+    ).all())
+    if not anteriores:
+        return []
+    linhas = db.session.execute(
+        update(Pedido)
+        .where(Pedido.id.in_(anteriores), Pedido.status == case(anteriores, value=Pedido.id))
+        .values(status=status_novo, **valores)
+        .returning(Pedido.id, Pedido.usuario_id, Pedido.valor_total, Pedido.total_camisas)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return [
+        SimpleNamespace(**linha._asdict(), status_anterior=anteriores[linha.id])
+        for linha in linhas
+    ]
+
+def atualizar_status_pedidos(condicao, status_novo, origens=None, limite=None, **valores):
+    """
+    Move para status_novo todos os pedidos que atendem à condição
+
+    No PostgreSQL, um único UPDATE ... RETURNING informa o status anterior de
+    cada pedido; no SQLite, um SELECT e um UPDATE condicionado (CASE). Os
+    contadores são ajustados numa única escrita.
+
+    Args:
+        condicao: expressão SQLAlchemy sobre Pedido (ex.: Pedido.id.in_(ids))
+        status_novo (str): status de destino
+        origens: status de origem aceitos (padrão: todos os outros)
+        limite (int): máximo de pedidos alterados, os de menor id primeiro
+        **valores: colunas extras a atualizar (ex.: data_pagamento=agora)
+
+    Returns:
+        list: dicts com id, usuario_id, valor_total, total_camisas e status_anterior
+    """
+    if origens is None:
+        origens = list(COLUNA_STATUS_PEDIDO)
+    origens = [status for status in origens if status != status_novo]
+    if not origens:
+        return []
+    if limite is not None:
+        condicao = Pedido.id.in_(
+            select(Pedido.id).where(condicao, Pedido.status.in_(origens)).order_by(Pedido.id).limit(limite)
+        )
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        linhas = _update_com_status_anterior(condicao, origens, status_novo, valores)
+    else:
+        linhas = _update_com_case(condicao, origens, status_novo, valores)
+    registrar_mudancas_status_pedidos(linhas, status_novo)
+    return [
+        {'id': linha.id, 'usuario_id': linha.usuario_id, 'valor_total': linha.valor_total,
+         'total_camisas': linha.total_camisas, 'status_anterior': linha.status_anterior}
+        for linha in sorted(linhas, key=lambda linha: linha.id)
+    ]
+
+def registrar_auditoria_lote(admin_id, acao, tabela_afetada, registros):
+    """
+    Grava uma linha de auditoria por registro alterado com um único INSERT em lote
+
+    Args:
+        registros: dicts com registro_id, descricao e, opcionalmente,
+            dados_anteriores / dados_novos
+    """
+    if not registros:
+        return
+    ip_address = request.remote_addr
+    user_agent = request.headers.get('User-Agent', '')[:500]
+    agora = datetime.utcnow()
+    db.session.execute(insert(AuditLog), [
+        {
+            'admin_id': admin_id,
+            'acao': acao,
+            'descricao': registro['descricao'],
+            'tabela_afetada': tabela_afetada,
+            'registro_id': registro['registro_id'],
+            'dados_anteriores': json.dumps(registro['dados_anteriores']) if registro.get('dados_anteriores') else None,
+            'dados_novos': json.dumps(registro['dados_novos']) if registro.get('dados_novos') else None,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'timestamp': agora
+        }
+        for registro in registros
+    ])
@@ -0,0 +1,97 @@
+"""
+Paginação por cursor (keyset) para as listagens administrativas
+
+Em vez de OFFSET + COUNT(*), cada página filtra a partir da última linha
+vista pela tupla (data, id), de modo que a página N custa o mesmo que a 1.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from src.models.user import db
+
+MAX_PER_PAGE = 200
+
+def encode_cursor(valor, registro_id):
+    """Gera um cursor opaco a partir da última linha da página"""
+    bruto = json.dumps([valor.isoformat() if valor else None, registro_id])
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor
+    
+    Raises:
+        ValueError: se o cursor estiver malformado
+    """
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        valor, registro_id = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        return datetime.fromisoformat(valor), int(registro_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+def contar(query, modo):
+    """
+    Total opcional da listagem
+    
+    Args:
+        query: consulta já filtrada
+        modo (str): 'exact' (COUNT) ou 'estimate' (estimativa do planejador
+            no PostgreSQL; nos demais bancos cai para COUNT)
+        
+    Returns:
+        int | None: total, ou None se nenhum modo foi pedido
+    """
+    if modo not in ('exact', 'estimate'):
+        return None
+    
+    query = query.order_by(None)
+    if modo == 'estimate' and db.engine.dialect.name == 'postgresql':
+        compilado = query.statement.compile(dialect=db.engine.dialect)
+        plano = db.session.connection().exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + str(compilado), compilado.params
+        ).scalar()
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return int(plano[0]['Plan']['Plan Rows'])
+    
+    return query.count()
+
+def keyset_page(query, coluna, coluna_id, cursor, per_page, serializer, total=None):
+    """
+    Retorna uma página ordenada por (coluna DESC, id DESC)
+    
+    Args:
+        query: consulta já filtrada
+        coluna: coluna de data usada na ordenação
+        coluna_id: chave primária usada como desempate
+        cursor (str): cursor da página anterior ('' para a primeira)
+        per_page (int): itens por página
+        serializer: função item -> dict
+        total (str): 'exact', 'estimate' ou None
+        
+    Returns:
+        dict: itens, next_cursor, per_page e total (se pedido)
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    total = contar(query, total)
+    
+    if cursor:
+        valor, registro_id = decode_cursor(cursor)
+        query = query.filter(tuple_(coluna, coluna_id) < tuple_(valor, registro_id))
+    
+    linhas = query.order_by(coluna.desc(), coluna_id.desc()).limit(per_page + 1).all()
+    itens = linhas[:per_page]
+    
+    next_cursor = None
+    if len(linhas) > per_page:
+        ultimo = itens[-1]
+        next_cursor = encode_cursor(getattr(ultimo, coluna.key), getattr(ultimo, coluna_id.key))
+    
+    return {
+        'items': [serializer(item) for item in itens],
+        'next_cursor': next_cursor,
+        'per_page': per_page,
+        'total': total
+    }
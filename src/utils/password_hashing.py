@@ -0,0 +1,99 @@
+"""
+Hashing de senhas em um pool limitado
+
+O hash de senha (scrypt/pbkdf2) é caro de propósito. Para que uma rajada de
+logins não ocupe todos os workers, gerar e verificar hashes passa por um
+pool com concorrência máxima e fila limitada: quem não consegue vaga dentro
+do tempo de espera recebe HashingBusy (HTTP 503) em vez de travar o worker.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Parâmetros no formato do Werkzeug, ex.: 'scrypt:32768:8:1' ou 'pbkdf2:sha256:600000'
+HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', 2))
+HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 8))
+HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+
+class HashingBusy(Exception):
+    """Pool de hashing lotado além do tempo de espera"""
+
+_executor = ThreadPoolExecutor(max_workers=HASH_CONCURRENCY, thread_name_prefix='password-hash')
+_vagas = threading.BoundedSemaphore(HASH_CONCURRENCY + HASH_MAX_QUEUE)
+
+_lock = threading.Lock()
+_latencias = deque(maxlen=500)
+_contadores = {'hashes': 0, 'verificacoes': 0, 'rejeitados': 0, 'rehashes': 0}
+
+def _executar(operacao, fn, *args):
+    if not _vagas.acquire(timeout=HASH_QUEUE_TIMEOUT):
+        with _lock:
+            _contadores['rejeitados'] += 1
+        raise HashingBusy('Servidor ocupado, tente novamente em instantes')
+    
+    inicio = time.perf_counter()
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _vagas.release()
+        with _lock:
+            _latencias.append(time.perf_counter() - inicio)
+            _contadores[operacao] += 1
+
+def gerar_hash(password):
+    """Gera o hash da senha com os parâmetros atuais (HASH_METHOD)"""
+    return _executar('hashes', generate_password_hash, password, HASH_METHOD)
+
+def verificar_senha(password_hash, password):
+    """Verifica a senha contra o hash armazenado"""
+    return _executar('verificacoes', check_password_hash, password_hash, password)
+
+def _normalizar_metodo(metodo):
+    """
+    Completa o método com os padrões do Werkzeug, como aparece no hash gerado
+    
+    Ex.: 'pbkdf2' -> 'pbkdf2:sha256:600000' e 'scrypt' -> 'scrypt:32768:8:1'
+    """
+    nome, *args = metodo.split(':')
+    if nome == 'scrypt':
+        padroes = ['32768', '8', '1']
+    elif nome == 'pbkdf2':
+        padroes = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return metodo
+    return ':'.join([nome, *args, *padroes[len(args):]])
+
+def precisa_rehash(password_hash):
+    """Indica se o hash foi gerado com parâmetros diferentes dos atuais"""
+    return _normalizar_metodo(password_hash.split('$', 1)[0]) != _normalizar_metodo(HASH_METHOD)
+
+def registrar_rehash():
+    with _lock:
+        _contadores['rehashes'] += 1
+
+def stats():
+    """Contadores e latência (espera + cálculo) das operações de hash neste worker"""
+    with _lock:
+        amostras = sorted(_latencias)
+        contadores = dict(_contadores)
+    
+    def percentil(p):
+        if not amostras:
+            return None
+        return round(amostras[min(len(amostras) - 1, int(p * len(amostras)))] * 1000, 1)
+    
+    return {
+        'method': HASH_METHOD,
+        'concurrency': HASH_CONCURRENCY,
+        'max_queue': HASH_MAX_QUEUE,
+        **contadores,
+        'latency_ms': {
+            'p50': percentil(0.50),
+            'p95': percentil(0.95),
+            'max': round(amostras[-1] * 1000, 1) if amostras else None
+        }
+    }
@@ -0,0 +1,166 @@
+"""
+Geração de pré-visualizações de comprovantes fora da requisição
+
+O upload só grava o original e enfileira o pagamento; um pool de threads gera
+uma miniatura WebP (fotos reduzidas, primeira página de PDFs) e a registra em
+Pagamento.preview_chave. Comprovantes com o mesmo SHA-256 reaproveitam a
+miniatura já gerada.
+
+Pillow e pypdfium2 são opcionais: sem eles o preview fica 'indisponivel' e o
+painel continua usando o original.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update
+from src.models.user import db
+from src.models.pagamento import Pagamento
+from src.utils.eventos import publicar
+from src.utils.storage import armazenar, backend
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - dependência opcional
+    Image = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover - dependência opcional
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_WORKERS = int(os.getenv('PREVIEW_WORKERS', 2))
+PREVIEW_LADO_MAXIMO = int(os.getenv('PREVIEW_LADO_MAXIMO', 640))
+PREVIEW_QUALIDADE = int(os.getenv('PREVIEW_QUALIDADE', 70))
+
+_executor = None
+_lock = threading.Lock()
+_stats = {'enfileirados': 0, 'gerados': 0, 'reaproveitados': 0, 'erros': 0, 'indisponiveis': 0}
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix='preview')
+        return _executor
+
+def _contar(chave):
+    with _lock:
+        _stats[chave] += 1
+
+def stats():
+    with _lock:
+        return dict(_stats, workers=PREVIEW_WORKERS)
+
+def _abrir_imagem(chave, content_type):
+    """Imagem PIL do comprovante (primeira página, no caso de PDF)"""
+    if content_type == 'application/pdf':
+        if pdfium is None:
+            return None
+        pdf = pdfium.PdfDocument(backend().caminho_local(chave))
+        try:
+            pagina = pdf[0]
+            largura, altura = pagina.get_size()
+            escala = PREVIEW_LADO_MAXIMO / max(largura, altura)
+            return pagina.render(scale=escala).to_pil()
+        finally:
+            pdf.close()
+
+    with backend().abrir(chave) as arquivo:
+        imagem = Image.open(arquivo)
+        # Para JPEG, decodifica já reduzido (bem mais barato que abrir 12 MP)
+        imagem.draft('RGB', (PREVIEW_LADO_MAXIMO, PREVIEW_LADO_MAXIMO))
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.load()
+        return imagem
+
+def renderizar_preview(chave, content_type):
+    """
+    Gera a miniatura WebP de um comprovante armazenado
+
+    Returns:
+        str | None: chave da miniatura no storage, ou None se as bibliotecas
+        necessárias não estiverem instaladas
+    """
+    if Image is None:
+        return None
+    imagem = _abrir_imagem(chave, content_type)
+    if imagem is None:
+        return None
+
+    imagem.thumbnail((PREVIEW_LADO_MAXIMO, PREVIEW_LADO_MAXIMO))
+    if imagem.mode not in ('RGB', 'RGBA'):
+        imagem = imagem.convert('RGB')
+
+    saida = io.BytesIO()
+    imagem.save(saida, 'WEBP', quality=PREVIEW_QUALIDADE, method=4)
+    saida.seek(0)
+    return armazenar(saida, 'webp').chave
+
+def _registrar(pagamento_id, chave_original, status, chave=None):
+    # Condicionado ao original: outro upload pode ter substituído o comprovante
+    # enquanto o preview era gerado
+    atualizados = db.session.execute(
+        update(Pagamento)
+        .where(Pagamento.id == pagamento_id, Pagamento.comprovante_chave == chave_original)
+        .values(preview_status=status, preview_chave=chave, preview_gerado_em=datetime.utcnow())
+    ).rowcount
+    if atualizados:
+        publicar('pagamento.preview', id=pagamento_id, status=status)
+    db.session.commit()
+
+def gerar_preview(pagamento_id):
+    """Gera e registra o preview de um pagamento (executa no worker ou no manage.py)"""
+    pagamento = db.session.get(Pagamento, pagamento_id)
+    if pagamento is None or not pagamento.comprovante_chave:
+        return None
+    chave_original = pagamento.comprovante_chave
+
+    # Mesmo conteúdo já processado em outro pagamento
+    existente = db.session.query(Pagamento.preview_chave).filter(
+        Pagamento.comprovante_sha256 == pagamento.comprovante_sha256,
+        Pagamento.preview_status == 'pronto',
+        Pagamento.preview_chave.isnot(None)
+    ).first()
+    if existente:
+        _registrar(pagamento_id, chave_original, 'pronto', existente.preview_chave)
+        _contar('reaproveitados')
+        return 'pronto'
+
+    try:
+        chave = renderizar_preview(chave_original, pagamento.comprovante_content_type)
+    except Exception:
+        logger.exception('Falha ao gerar preview do pagamento %s', pagamento_id)
+        db.session.rollback()
+        _registrar(pagamento_id, chave_original, 'erro')
+        _contar('erros')
+        return 'erro'
+
+    if chave is None:
+        _registrar(pagamento_id, chave_original, 'indisponivel')
+        _contar('indisponiveis')
+        return 'indisponivel'
+
+    _registrar(pagamento_id, chave_original, 'pronto', chave)
+    _contar('gerados')
+    return 'pronto'
+
+def _executar(app, pagamento_id):
+    with app.app_context():
+        try:
+            gerar_preview(pagamento_id)
+        except Exception:
+            logger.exception('Erro no worker de preview (pagamento %s)', pagamento_id)
+        finally:
+            db.session.remove()
+
+def enfileirar_preview(pagamento_id):
+    """Agenda a geração do preview; chamar depois do commit do upload"""
+    app = current_app._get_current_object()
+    _pool().submit(_executar, app, pagamento_id)
+    _contar('enfileirados')
@@ -1,7 +1,47 @@
 """
 Utilitário para cálculo de preços das camisas baseado na idade
+
+As faixas ficam em FAIXAS_PRECO; a tabela de 0 a IDADE_MAXIMA anos é montada
+uma única vez na importação e as funções abaixo apenas consultam a tabela.
 """
 
+# Faixas de preço, da maior idade mínima para a menor.
+# Para incluir uma faixa basta acrescentar uma entrada aqui.
+FAIXAS_PRECO = (
+    {'idade_minima': 13, 'preco': 290.00, 'descricao': '13 anos ou mais'},
+    {'idade_minima': 6, 'preco': 145.00, 'descricao': '6 a 12 anos'},
+    # Crianças menores de 6 anos não precisam de camisa
+    {'idade_minima': 0, 'preco': 0.00, 'descricao': 'Menor de 6 anos'},
+)
+
+IDADE_MAXIMA = 120
+
+def _faixa(idade):
+    """Primeira faixa cuja idade mínima é atendida (a última vale como padrão)"""
+    for faixa in FAIXAS_PRECO:
+        if idade >= faixa['idade_minima']:
+            return faixa
+    return FAIXAS_PRECO[-1]
+
+def _montar_info(idade):
+    faixa = _faixa(idade)
+    preco = faixa['preco']
+    return {
+        'idade': idade,
+        'faixa_etaria': faixa['descricao'],
+        'preco': preco,
+        'preco_formatado': f'R$ {preco:.2f}'.replace('.', ','),
+        'gratuito': preco == 0.00
+    }
+
+# Tabela pré-calculada: TABELA_PRECOS[idade] para 0 <= idade <= IDADE_MAXIMA
+TABELA_PRECOS = tuple(_montar_info(idade) for idade in range(IDADE_MAXIMA + 1))
+
+def _info(idade):
+    if 0 <= idade <= IDADE_MAXIMA:
+        return TABELA_PRECOS[idade]
+    return _montar_info(idade)
+
 def calcular_preco_camisa(idade):
     """
     Calcula o preço da camisa baseado na idade do usuário
@@ -12,13 +52,23 @@ def calcular_preco_camisa(idade):
     Returns:
         float: Preço da camisa
     """
-    if idade >= 13:
-        return 290.00  # R$ 290,00 para 13 anos ou mais
-    elif idade >= 6:
-        return 145.00  # R$ 145,00 para 6 a 12 anos
-    else:
-        # Crianças menores de 6 anos não precisam de camisa
-        return 0.00
+    return _info(idade)['preco']
+
+def calcular_precos_lote(idades):
+    """
+    Calcula o preço da camisa para várias idades de uma vez
+    
+    Cada idade distinta é calculada uma única vez (uma família costuma repetir
+    poucas idades), e o resultado é mapeado de volta na ordem recebida.
+    
+    Args:
+        idades (list[int]): Idades dos membros
+        
+    Returns:
+        list[float]: Preços, na mesma ordem das idades
+    """
+    precos = {idade: calcular_preco_camisa(idade) for idade in set(idades)}
+    return [precos[idade] for idade in idades]
 
 def get_faixa_etaria(idade):
     """
@@ -30,12 +80,7 @@ def get_faixa_etaria(idade):
     Returns:
         str: Descrição da faixa etária
     """
-    if idade >= 13:
-        return "13 anos ou mais"
-    elif idade >= 6:
-        return "6 a 12 anos"
-    else:
-        return "Menor de 6 anos"
+    return _info(idade)['faixa_etaria']
 
 def get_info_preco(idade):
     """
@@ -47,14 +92,17 @@ def get_info_preco(idade):
     Returns:
         dict: Informações sobre preço e faixa etária
     """
-    preco = calcular_preco_camisa(idade)
-    faixa = get_faixa_etaria(idade)
+    return dict(_info(idade))
+
+def get_catalogo_precos():
+    """
+    Retorna as faixas e a tabela completa de preços (0 a IDADE_MAXIMA)
     
+    Returns:
+        dict: {'faixas': [...], 'precos': [...]}
+    """
     return {
-        'idade': idade,
-        'faixa_etaria': faixa,
-        'preco': preco,
-        'preco_formatado': f'R$ {preco:.2f}'.replace('.', ','),
-        'gratuito': preco == 0.00
+        'faixas': [dict(faixa) for faixa in FAIXAS_PRECO],
+        'idade_maxima': IDADE_MAXIMA,
+        'precos': [dict(info) for info in TABELA_PRECOS]
     }
-
@@ -0,0 +1,111 @@
+"""
+Cache do usuário/administrador autenticado
+
+token_required e admin_token_required resolvem o titular do token por
+(tipo, sub, iat) neste cache LRU por worker, com TTL curto, em vez de
+consultar o banco a cada requisição. O cache guarda um retrato leve (sem
+vínculo com a sessão do SQLAlchemy).
+
+Ativar/desativar usuários pelo painel invalida o retrato em todos os workers.
+Administradores não são alterados por nenhuma rota (apenas criados), então uma
+desativação feita direto no banco leva até PRINCIPAL_CACHE_TTL segundos para
+valer: esse TTL é o limite de revogação de um administrador.
+"""
+import os
+from src.models.user import db, User
+from src.models.admin import Admin
+from src.utils.cache import TTLCache
+from src.utils.eventos import ao_receber, difundir, iniciar_listener
+
+principal_cache = TTLCache(ttl=float(os.getenv('PRINCIPAL_CACHE_TTL', 30)), maxsize=2048)
+
+class UserPrincipal:
+    """Retrato somente leitura de um User autenticado"""
+    
+    __slots__ = ('id', 'nome_completo', 'email', 'descendencia', 'idade',
+                 'cidade_residencia', 'created_at', 'is_active')
+    
+    def __init__(self, user):
+        for campo in self.__slots__:
+            setattr(self, campo, getattr(user, campo))
+    
+    def __repr__(self):
+        return f'<UserPrincipal {self.id}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome_completo': self.nome_completo,
+            'email': self.email,
+            'descendencia': self.descendencia,
+            'idade': self.idade,
+            'cidade_residencia': self.cidade_residencia,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'is_active': self.is_active
+        }
+
+class AdminPrincipal:
+    """Retrato somente leitura de um Admin autenticado"""
+    
+    __slots__ = ('id', 'nome_completo', 'email', 'nivel_acesso', 'created_at', 'is_active')
+    
+    def __init__(self, admin):
+        for campo in self.__slots__:
+            setattr(self, campo, getattr(admin, campo))
+    
+    def __repr__(self):
+        return f'<AdminPrincipal {self.id}>'
+
+def carregar_usuario(user_id, iat=None):
+    """
+    Retorna o UserPrincipal do token, consultando o banco apenas em caso de miss
+    
+    Returns:
+        UserPrincipal | None: None se o usuário não existir
+    """
+    def compute():
+        # Este worker passa a guardar retratos: precisa ouvir as invalidações
+        iniciar_listener()
+        user = db.session.get(User, user_id)
+        return UserPrincipal(user) if user else None
+    
+    return principal_cache.get_or_compute(
+        ('user', user_id, iat), compute, cacheable=lambda principal: principal is not None
+    )
+
+def carregar_admin(admin_id, iat=None):
+    """
+    Retorna o AdminPrincipal do token, consultando o banco apenas em caso de miss
+    
+    Returns:
+        AdminPrincipal | None: None se o administrador não existir
+    """
+    def compute():
+        admin = db.session.get(Admin, admin_id)
+        return AdminPrincipal(admin) if admin else None
+    
+    return principal_cache.get_or_compute(
+        ('admin', admin_id, iat), compute, cacheable=lambda principal: principal is not None
+    )
+
+def _invalidar_usuarios_local(ids):
+    ids = set(ids)
+    return principal_cache.invalidate(lambda key: key[0] == 'user' and key[1] in ids)
+
+def invalidar_usuario(*user_ids):
+    """
+    Descarta os retratos em cache dos usuários (ex.: após ativar/desativar)
+    
+    Chamar depois do commit: invalida neste worker na hora e avisa os demais.
+    """
+    removidas = _invalidar_usuarios_local(user_ids)
+    difundir('principal.usuario', ids=list(user_ids))
+    return removidas
+
+def _ao_invalidar_usuarios(dados):
+    # Lotes grandes chegam resumidos (sem a lista de ids): descarta todos os usuários
+    if 'ids' not in dados:
+        return principal_cache.invalidate(lambda key: key[0] == 'user')
+    return _invalidar_usuarios_local(dados['ids'])
+
+ao_receber('principal.usuario', _ao_invalidar_usuarios)
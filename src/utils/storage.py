@@ -0,0 +1,204 @@
+"""
+Armazenamento endereçado por conteúdo para comprovantes
+
+Uploads são lidos em blocos, gravados num arquivo temporário e hasheados
+(SHA-256) ao mesmo tempo. O arquivo final é identificado pelo hash, em
+diretórios particionados pelo prefixo (ab/cd/abcd....pdf); o mesmo
+comprovante enviado duas vezes ocupa o disco uma vez só.
+
+Configuração por variáveis de ambiente:
+    STORAGE_BACKEND       local (padrão) ou s3local
+    STORAGE_ROOT          diretório raiz (padrão: uploads/comprovantes na raiz do projeto)
+    STORAGE_BUCKET        bucket do backend s3local (padrão: comprovantes)
+    STORAGE_SERVE_MODE    python (padrão), accel (nginx X-Accel-Redirect) ou sendfile (X-Sendfile)
+    STORAGE_ACCEL_PREFIX  location interna do nginx (padrão: /protected/comprovantes/)
+"""
+import hashlib
+import json
+import os
+import tempfile
+from flask import Response, request, send_file
+
+TAMANHO_BLOCO = 64 * 1024
+
+RAIZ_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'uploads', 'comprovantes'
+)
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'pdf': 'application/pdf',
+    'webp': 'image/webp',
+}
+
+class ArquivoArmazenado:
+    """Resultado de um upload: chave no backend, hash e tamanho"""
+    __slots__ = ('chave', 'sha256', 'tamanho', 'content_type', 'duplicado')
+
+    def __init__(self, chave, sha256, tamanho, content_type, duplicado):
+        self.chave = chave
+        self.sha256 = sha256
+        self.tamanho = tamanho
+        self.content_type = content_type
+        self.duplicado = duplicado
+
+def chave_para(sha256, extensao):
+    """Chave particionada pelo prefixo do hash: ab/cd/<sha256>.<ext>"""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{extensao}"
+
+class LocalBackend:
+    """Arquivos em disco local, sob STORAGE_ROOT"""
+
+    def __init__(self, raiz):
+        self.raiz = os.path.abspath(raiz)
+        self._tmp = os.path.join(self.raiz, '.tmp')
+        os.makedirs(self._tmp, exist_ok=True)
+
+    def caminho_local(self, chave):
+        return os.path.join(self.raiz, *chave.split('/'))
+
+    def caminho_interno(self, chave):
+        """Caminho relativo usado no X-Accel-Redirect"""
+        return chave
+
+    def arquivo_temporario(self):
+        return tempfile.NamedTemporaryFile(dir=self._tmp, delete=False)
+
+    def existe(self, chave):
+        return os.path.exists(self.caminho_local(chave))
+
+    def gravar(self, chave, caminho_temporario, content_type):
+        destino = self.caminho_local(chave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # os.replace é atômico no mesmo sistema de arquivos
+        os.replace(caminho_temporario, destino)
+
+    def abrir(self, chave):
+        return open(self.caminho_local(chave), 'rb')
+
+class S3LocalBackend(LocalBackend):
+    """
+    Substituto local para um object storage compatível com S3
+
+    Objetos ficam em <raiz>/<bucket>/<chave> com um arquivo .meta.json ao lado
+    (ContentType, ContentLength, ETag), como um put_object/head_object faria.
+    Serve para desenvolver e testar o fluxo sem credenciais de nuvem.
+    """
+
+    def __init__(self, raiz, bucket):
+        self.bucket = bucket
+        super().__init__(os.path.join(raiz, bucket))
+
+    def caminho_interno(self, chave):
+        return f"{self.bucket}/{chave}"
+
+    def existe(self, chave):
+        return self.head_object(chave) is not None
+
+    def head_object(self, chave):
+        try:
+            with open(self.caminho_local(chave) + '.meta.json') as meta:
+                return json.load(meta)
+        except FileNotFoundError:
+            return None
+
+    def gravar(self, chave, caminho_temporario, content_type):
+        tamanho = os.path.getsize(caminho_temporario)
+        super().gravar(chave, caminho_temporario, content_type)
+        metadados = {
+            'Key': chave,
+            'ContentType': content_type,
+            'ContentLength': tamanho,
+            'ETag': chave.rsplit('/', 1)[-1].split('.', 1)[0],
+        }
+        with open(self.caminho_local(chave) + '.meta.json', 'w') as meta:
+            json.dump(metadados, meta)
+
+def _criar_backend():
+    raiz = os.getenv('STORAGE_ROOT', RAIZ_PADRAO)
+    tipo = os.getenv('STORAGE_BACKEND', 'local')
+    if tipo == 's3local':
+        return S3LocalBackend(raiz, os.getenv('STORAGE_BUCKET', 'comprovantes'))
+    if tipo == 'local':
+        return LocalBackend(raiz)
+    raise ValueError(f'STORAGE_BACKEND desconhecido: {tipo}')
+
+_backend = None
+
+def backend():
+    """Backend configurado (criado na primeira chamada)"""
+    global _backend
+    if _backend is None:
+        _backend = _criar_backend()
+    return _backend
+
+def armazenar(stream, extensao):
+    """
+    Grava um upload no backend, deduplicando pelo hash do conteúdo
+
+    Args:
+        stream: objeto com read() (ex.: FileStorage.stream)
+        extensao: extensão já validada, em minúsculas
+
+    Returns:
+        ArquivoArmazenado
+    """
+    destino = backend()
+    content_type = CONTENT_TYPES.get(extensao, 'application/octet-stream')
+    sha = hashlib.sha256()
+    tamanho = 0
+
+    temporario = destino.arquivo_temporario()
+    try:
+        with temporario:
+            while True:
+                bloco = stream.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                sha.update(bloco)
+                temporario.write(bloco)
+                tamanho += len(bloco)
+
+        chave = chave_para(sha.hexdigest(), extensao)
+        duplicado = destino.existe(chave)
+        if not duplicado:
+            destino.gravar(chave, temporario.name, content_type)
+    finally:
+        if os.path.exists(temporario.name):
+            os.remove(temporario.name)
+
+    return ArquivoArmazenado(chave, sha.hexdigest(), tamanho, content_type, duplicado)
+
+def servir(chave, content_type, nome_download=None):
+    """
+    Resposta que entrega o arquivo armazenado
+
+    Em accel/sendfile o Flask só devolve os headers e o servidor web envia o
+    conteúdo; o modo python (padrão) usa send_file para ambientes sem proxy.
+    O conteúdo nunca muda para uma chave, então o hash serve de ETag; um
+    If-None-Match com ele recebe 304 em qualquer modo, sem abrir o arquivo.
+    """
+    destino = backend()
+    modo = os.getenv('STORAGE_SERVE_MODE', 'python')
+    etag = chave.rsplit('/', 1)[-1].split('.', 1)[0]
+
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    elif modo == 'accel':
+        prefixo = os.getenv('STORAGE_ACCEL_PREFIX', '/protected/comprovantes/')
+        resposta = Response(status=200, content_type=content_type)
+        resposta.headers['X-Accel-Redirect'] = prefixo.rstrip('/') + '/' + destino.caminho_interno(chave)
+    elif modo == 'sendfile':
+        resposta = Response(status=200, content_type=content_type)
+        resposta.headers['X-Sendfile'] = destino.caminho_local(chave)
+    else:
+        resposta = send_file(destino.caminho_local(chave), mimetype=content_type, conditional=True, etag=etag)
+
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    if nome_download:
+        resposta.headers['Content-Disposition'] = f'inline; filename="{nome_download}"'
+    return resposta
@@ -0,0 +1,99 @@
+import os
+import sys
+
+import pytest
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_PROJETO not in sys.path:
+    sys.path.insert(0, RAIZ_PROJETO)
+
+# auth.py lê a chave na importação
+os.environ.setdefault('JWT_SECRET_KEY', 'chave-de-teste')
+# Definido antes de qualquer load_dotenv(): os testes nunca usam o banco do .env
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from flask import Flask
+from src.models.user import db, User
+from src.routes.auth import generate_token
+from src.routes.admin_auth import generate_admin_token
+from src.utils.cache import admin_cache, public_cache
+from src.utils.principal import principal_cache
+
+BLUEPRINTS = ['auth', 'admin_auth', 'admin_dashboard', 'pedidos', 'pagamentos', 'reservas', 'status', 'me']
+
+def criar_app_teste(uri):
+    """App com todos os blueprints sobre o banco informado (nunca o DATABASE_URL do .env)"""
+    import importlib
+    from src.manage import _carregar_modelos
+    
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=uri, TESTING=True)
+    db.init_app(app)
+    for nome in BLUEPRINTS:
+        modulo = importlib.import_module(f'src.routes.{nome}')
+        for atributo in dir(modulo):
+            if atributo.endswith('_bp'):
+                app.register_blueprint(getattr(modulo, atributo))
+    _carregar_modelos()
+    with app.app_context():
+        from src.models.mesa import garantir_mesas
+        db.create_all()
+        garantir_mesas()
+    return app
+
+@pytest.fixture(autouse=True)
+def caches_limpos():
+    for cache in (admin_cache, public_cache, principal_cache):
+        cache.invalidate()
+    yield
+
+@pytest.fixture
+def app(tmp_path):
+    app = criar_app_teste(f"sqlite:///{tmp_path / 'teste.db'}")
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app):
+    from src.models.admin import Admin
+    with app.app_context():
+        admin = Admin(nome_completo='Admin Teste', email='admin@teste.local',
+                      password_hash='-', nivel_acesso='super_admin')
+        db.session.add(admin)
+        db.session.commit()
+        return {'Authorization': f'Bearer {generate_admin_token(admin.id)}'}
+
+@pytest.fixture
+def criar_usuario(app):
+    """Fábrica de usuários: devolve (id, headers com o token)"""
+    sequencia = iter(range(1, 10_000))
+    
+    def criar(idade=30, descendencia='veras'):
+        n = next(sequencia)
+        with app.app_context():
+            user = User(nome_completo=f'Usuário {n}', email=f'usuario{n}@teste.local',
+                        password_hash='-', descendencia=descendencia, idade=idade,
+                        cidade_residencia='Mossoró')
+            db.session.add(user)
+            db.session.commit()
+            return user.id, {'Authorization': f'Bearer {generate_token(user.id)}'}
+    return criar
+
+@pytest.fixture
+def dentro_do_prazo(monkeypatch):
+    """Fixa a data antes do encerramento das vendas de camisas"""
+    import datetime as modulo_datetime
+    import src.routes.pedidos as pedidos
+    
+    class DataFixa(modulo_datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 5, 1, 12, 0, 0)
+    
+    monkeypatch.setattr(pedidos, 'datetime', DataFixa)
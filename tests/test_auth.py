@@ -0,0 +1,33 @@
+from src.utils import password_hashing
+from src.utils.dashboard_counters import calcular_contadores, obter_contadores
+
+CADASTRO = {
+    'nomeCompleto': 'Maria Veras', 'email': 'maria@teste.local', 'password': 'Senha1234',
+    'confirmPassword': 'Senha1234', 'descendencia': 'veras', 'idade': 30, 'cidadeResidencia': 'Mossoró'
+}
+
+def test_email_repetido_responde_409(app, client, monkeypatch):
+    monkeypatch.setattr(password_hashing, 'HASH_METHOD', 'pbkdf2:sha256:1000')
+    assert client.post('/api/auth/cadastro', json=CADASTRO).status_code == 201
+    
+    # Mesmo e-mail com outra caixa: o índice único decide, sem SELECT prévio
+    resposta = client.post('/api/auth/cadastro', json={**CADASTRO, 'email': 'MARIA@teste.local'})
+    assert resposta.status_code == 409
+    assert 'E-mail já cadastrado' in resposta.json['error']
+    with app.app_context():
+        contadores = obter_contadores()
+        assert contadores.usuarios_ativos == 1
+        assert {coluna: getattr(contadores, coluna) for coluna in calcular_contadores()} == calcular_contadores()
+
+def test_outra_violacao_de_integridade_nao_vira_conflito(client, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+    import src.routes.auth as auth
+    monkeypatch.setattr(password_hashing, 'HASH_METHOD', 'pbkdf2:sha256:1000')
+    
+    def falhar(user):
+        raise IntegrityError('INSERT INTO users ...', {}, Exception('NOT NULL constraint failed: users.idade'))
+    monkeypatch.setattr(auth, 'registrar_usuario', falhar)
+    
+    resposta = client.post('/api/auth/cadastro', json=CADASTRO)
+    assert resposta.status_code == 500
+    assert resposta.json['error'] == 'Erro interno no servidor'
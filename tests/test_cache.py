@@ -0,0 +1,69 @@
+import json
+
+from src.utils import cache, eventos
+from src.utils.cache import admin_cache, invalidate_admin_cache
+
+def test_invalidacao_do_painel_e_difundida(monkeypatch):
+    enviados = []
+    monkeypatch.setattr(cache, 'difundir', lambda tipo, **dados: enviados.append((tipo, dados)))
+    admin_cache.set(('stats', '/admin/dashboard/stats', ()), 'x')
+    
+    assert invalidate_admin_cache('stats', 'pedidos') == 1
+    assert enviados == [('cache.admin', {'namespaces': ['stats', 'pedidos']})]
+
+def test_outro_worker_aplica_a_invalidacao():
+    """O que a thread de LISTEN faz com a notificação vinda de outro worker"""
+    admin_cache.set(('stats', '/admin/dashboard/stats', ()), 'x')
+    admin_cache.set(('logs', '/admin/dashboard/logs', ()), 'y')
+    payload = json.dumps({'tipo': 'cache.admin', 'dados': {'namespaces': ['stats']}, 'interno': True})
+    
+    eventos._tratar_interno(json.loads(payload))
+    
+    assert admin_cache.get(('stats', '/admin/dashboard/stats', ())) is None
+    assert admin_cache.get(('logs', '/admin/dashboard/logs', ())) == 'y'
+
+def test_mutacao_do_admin_limpa_o_cache(app, client, criar_usuario, admin_headers):
+    usuario_id, _ = criar_usuario()
+    antes = client.get('/admin/dashboard/stats', headers=admin_headers).json
+    client.post(f'/admin/dashboard/usuario/{usuario_id}/toggle-status', headers=admin_headers)
+    depois = client.get('/admin/dashboard/stats', headers=admin_headers).json
+    assert antes != depois
+
+def test_outro_worker_descarta_o_usuario_desativado(monkeypatch):
+    from src.utils import principal
+    enviados = []
+    monkeypatch.setattr(principal, 'difundir', lambda tipo, **dados: enviados.append((tipo, dados)))
+    principal.principal_cache.set(('user', 7, 1), 'retrato')
+    principal.principal_cache.set(('user', 8, 1), 'outro')
+    
+    assert principal.invalidar_usuario(7) == 1
+    assert enviados == [('principal.usuario', {'ids': [7]})]
+    
+    # Em outro worker, a notificação recebida pelo LISTEN tem o mesmo efeito
+    eventos._tratar_interno({'tipo': 'principal.usuario', 'dados': {'ids': [8]}, 'interno': True})
+    assert principal.principal_cache.get(('user', 8, 1)) is None
+
+def test_invalidacao_resumida_descarta_todos_os_usuarios():
+    from src.utils import principal
+    principal.principal_cache.set(('user', 7, 1), 'retrato')
+    principal.principal_cache.set(('admin', 1, 1), 'admin')
+    
+    evento = json.loads(eventos._serializar({'tipo': 'principal.usuario', 'dados': {'ids': list(range(5000))}, 'interno': True}))
+    eventos._tratar_interno(evento)
+    
+    assert principal.principal_cache.get(('user', 7, 1)) is None
+    assert principal.principal_cache.get(('admin', 1, 1)) == 'admin'
+
+def test_calculo_anterior_a_invalidacao_nao_e_gravado():
+    from src.utils.cache import TTLCache
+    cache_teste = TTLCache(ttl=60)
+    
+    def compute():
+        # Uma mutação é commitada e invalida o cache enquanto o líder calcula
+        cache_teste.invalidate()
+        return 'antigo'
+    
+    assert cache_teste.get_or_compute('stats', compute) == 'antigo'
+    assert cache_teste.get('stats') is None
+    assert cache_teste.get_or_compute('stats', lambda: 'novo') == 'novo'
+    assert cache_teste.get('stats') == 'novo'
@@ -0,0 +1,60 @@
+from src.models.user import db
+from src.models.pedido import Pedido
+from src.utils.dashboard_counters import calcular_contadores, obter_contadores, registrar_pedido
+
+def _contadores_batem(app):
+    with app.app_context():
+        db.session.expire_all()
+        contadores = obter_contadores()
+        esperado = calcular_contadores()
+        return {coluna: getattr(contadores, coluna) for coluna in esperado} == esperado
+
+def _reservar(client, headers, numero='VIP-01'):
+    return client.post('/api/reservas', json={
+        'mesa_numero': numero, 'mesa_tipo': 'VIP', 'mesa_capacidade': 8, 'mesa_localizacao': 'Frente do palco'
+    }, headers=headers)
+
+def test_cancelar_reserva_duas_vezes(app, client, criar_usuario, admin_headers):
+    _, headers = criar_usuario()
+    reserva_id = _reservar(client, headers).json['reserva']['id']
+    
+    assert client.post(f'/api/reservas/{reserva_id}/cancelar', headers=headers).status_code == 200
+    assert client.post(f'/api/reservas/{reserva_id}/cancelar', headers=headers).status_code == 400
+    assert client.post(f'/admin/dashboard/reserva/{reserva_id}/cancel', headers=admin_headers).status_code == 400
+    assert _contadores_batem(app)
+    with app.app_context():
+        assert obter_contadores().reservas_confirmadas == 0
+
+def test_admin_cancela_reserva_com_auditoria(app, client, criar_usuario, admin_headers):
+    from src.models.admin import AuditLog
+    _, headers = criar_usuario()
+    reserva_id = _reservar(client, headers).json['reserva']['id']
+    
+    resposta = client.post(f'/admin/dashboard/reserva/{reserva_id}/cancel', headers=admin_headers)
+    assert resposta.status_code == 200
+    assert resposta.json['reserva']['status'] == 'cancelada'
+    with app.app_context():
+        assert AuditLog.query.filter_by(acao='CANCEL_RESERVA', registro_id=reserva_id).count() == 1
+    assert _contadores_batem(app)
+
+def test_cancelar_pedido_duas_vezes(app, client, criar_usuario):
+    usuario_id, headers = criar_usuario()
+    with app.app_context():
+        pedido = Pedido(usuario_id=usuario_id, total_camisas=1, valor_total=290, preco_unitario=290,
+                        camisas_json='{"M": 1}')
+        db.session.add(pedido)
+        registrar_pedido(pedido)
+        db.session.commit()
+        pedido_id = pedido.id
+    
+    assert client.post(f'/api/pedidos/{pedido_id}/cancelar', headers=headers).status_code == 200
+    assert client.post(f'/api/pedidos/{pedido_id}/cancelar', headers=headers).status_code == 400
+    assert _contadores_batem(app)
+
+def test_toggle_status_usuario(app, client, criar_usuario, admin_headers):
+    usuario_id, _ = criar_usuario()
+    for ativo in (False, True, False):
+        resposta = client.post(f'/admin/dashboard/usuario/{usuario_id}/toggle-status', headers=admin_headers)
+        assert resposta.status_code == 200
+        assert resposta.json['user']['is_active'] is ativo
+        assert _contadores_batem(app)
@@ -0,0 +1,38 @@
+import json
+
+from src.utils.eventos import LIMITE_PAYLOAD, _serializar
+
+def test_evento_pequeno_vai_inteiro():
+    evento = {'tipo': 'pedido.status_lote', 'dados': {'ids': [1, 2, 3], 'status': 'pago'}}
+    assert json.loads(_serializar(evento)) == evento
+
+def test_lista_grande_vira_contagem():
+    evento = {'tipo': 'pedido.status_lote', 'dados': {'ids': list(range(100_000, 102_000)), 'status': 'pago'}}
+    payload = _serializar(evento)
+    
+    assert len(payload.encode()) < LIMITE_PAYLOAD
+    assert json.loads(payload) == {
+        'tipo': 'pedido.status_lote',
+        'dados': {'total_ids': 2000, 'status': 'pago'},
+        'resumido': True
+    }
+
+def test_campo_escalar_grande_descarta_os_dados():
+    evento = {'tipo': 'x', 'dados': {'texto': 'a' * LIMITE_PAYLOAD}}
+    assert json.loads(_serializar(evento)) == {'tipo': 'x', 'dados': {}, 'resumido': True}
+
+def test_publicar_lote_divide_os_ids(app):
+    from src.models.user import db
+    from src.utils.eventos import broker, publicar_lote
+    fila = broker.assinar()
+    try:
+        with app.app_context():
+            publicar_lote('pedido.status_lote', list(range(1200)), status='cancelado')
+            db.session.commit()
+        partes = [fila.get_nowait()['dados'] for _ in range(3)]
+    finally:
+        broker.cancelar(fila)
+    
+    assert [len(parte['ids']) for parte in partes] == [500, 500, 200]
+    assert all(parte['total'] == 1200 and parte['partes'] == 3 for parte in partes)
+    assert all(len(json.dumps(parte)) < LIMITE_PAYLOAD for parte in partes)
@@ -0,0 +1,20 @@
+import csv
+import io
+
+from tests.test_mesas import _reservar
+
+def _csv(client, headers):
+    resposta = client.get('/api/admin/reservas?format=csv', headers=headers)
+    assert resposta.status_code == 200
+    return list(csv.reader(io.StringIO(resposta.get_data(as_text=True))))
+
+def test_csv_vazio_tem_cabecalho(client, criar_usuario):
+    _, headers = criar_usuario()
+    vazio = _csv(client, headers)
+    assert len(vazio) == 1
+    
+    assert _reservar(client, headers, 'VIP-01').status_code == 201
+    preenchido = _csv(client, headers)
+    assert preenchido[0] == vazio[0]
+    assert 'usuario.email' in vazio[0]
+    assert len(preenchido) == 2
@@ -0,0 +1,185 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import manage
+from src.models.user import db, User
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """manage.py apontado para um SQLite temporário, já migrado"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'manage.db'}")
+    monkeypatch.setenv('STORAGE_ROOT', str(tmp_path / 'storage'))
+    monkeypatch.setattr(manage, '_app', None)
+    import src.utils.storage as storage
+    monkeypatch.setattr(storage, '_backend', None)
+    manage.migrate()
+    yield manage.obter_app()
+    with manage.obter_app().app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def _usuario():
+    user = User(nome_completo='Maria Saldanha', email='maria@teste.local', password_hash='-',
+                descendencia='saldanha', idade=40, cidade_residencia='Natal')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+def test_executa_como_script():
+    """`python src/manage.py` importa o app sem depender de um módulo `main` no path"""
+    resultado = subprocess.run(
+        [sys.executable, os.path.join(manage.RAIZ_PROJETO, 'src', 'manage.py'), 'comando_inexistente'],
+        capture_output=True, text=True, env=dict(os.environ, DATABASE_URL='sqlite://')
+    )
+    assert resultado.returncode == 1
+    assert 'Comando desconhecido' in resultado.stdout
+
+def test_migrate_cadastra_mesas(banco, capsys):
+    from src.models.mesa import Mesa
+    with banco.app_context():
+        assert Mesa.query.count() > 0
+    # Rodar de novo não duplica nada
+    manage.migrate()
+    assert 'Mesas cadastradas: 0 novas' in capsys.readouterr().out
+
+def test_explain(banco, capsys):
+    manage.explain()
+    saida = capsys.readouterr().out
+    assert '== listar_pedidos' in saida
+    assert '== get_pedidos (cursor)' in saida
+
+def test_rebuild_counters(banco):
+    from src.models.pedido import Pedido
+    from src.utils.dashboard_counters import calcular_contadores, obter_contadores
+    with banco.app_context():
+        user = _usuario()
+        db.session.add(Pedido(usuario_id=user.id, total_camisas=2, valor_total=580, preco_unitario=290,
+                              camisas_json='{"M": 2}', status='pago'))
+        db.session.commit()
+    manage.rebuild_counters()
+    with banco.app_context():
+        contadores = obter_contadores()
+        esperado = calcular_contadores()
+        assert esperado['usuarios_saldanha'] == 1 and esperado['receita_total'] == 580
+        assert {coluna: getattr(contadores, coluna) for coluna in esperado} == esperado
+
+def test_purge_idempotency(banco):
+    from src.models.idempotencia import IdempotencyKey
+    with banco.app_context():
+        user = _usuario()
+        for chave, idade in (('antiga', timedelta(days=2)), ('recente', timedelta(minutes=5))):
+            db.session.add(IdempotencyKey(usuario_id=user.id, chave=chave, rota='/api/pedidos',
+                                          fingerprint='0' * 64, created_at=datetime.utcnow() - idade))
+        db.session.commit()
+    manage.purge_idempotency()
+    with banco.app_context():
+        assert [chave for (chave,) in db.session.query(IdempotencyKey.chave)] == ['recente']
+
+def test_backfill_pedido_itens(banco):
+    from src.models.pedido import Pedido
+    from src.models.pedido_item import PedidoItem
+    with banco.app_context():
+        user = _usuario()
+        db.session.add(Pedido(usuario_id=user.id, total_camisas=3, valor_total=870, preco_unitario=290,
+                              camisas_json=json.dumps({'M': 2, 'GG': 1, 'P': 0})))
+        db.session.commit()
+    manage.backfill_pedido_itens()
+    manage.backfill_pedido_itens()  # idempotente
+    with banco.app_context():
+        itens = sorted((item.tamanho, item.quantidade) for item in PedidoItem.query)
+        assert itens == [('GG', 1), ('M', 2)]
+
+def test_generate_previews(banco):
+    Image = pytest.importorskip('PIL.Image')
+    from src.models.pagamento import Pagamento
+    from src.models.pedido import Pedido
+    from src.utils.storage import armazenar
+    
+    imagem = io.BytesIO()
+    Image.new('RGB', (1200, 800), 'navy').save(imagem, 'PNG')
+    imagem.seek(0)
+    with banco.app_context():
+        arquivo = armazenar(imagem, 'png')
+        user = _usuario()
+        pedido = Pedido(usuario_id=user.id, total_camisas=1, valor_total=290, preco_unitario=290,
+                        camisas_json='{"M": 1}')
+        db.session.add(pedido)
+        db.session.flush()
+        db.session.add(Pagamento(pedido_id=pedido.id, usuario_id=user.id, metodo_pagamento='pix',
+                                 valor=290, comprovante_chave=arquivo.chave, comprovante_sha256=arquivo.sha256,
+                                 comprovante_content_type=arquivo.content_type, preview_status='pendente'))
+        db.session.commit()
+    manage.generate_previews()
+    with banco.app_context():
+        pagamento = Pagamento.query.one()
+        assert pagamento.preview_status == 'pronto'
+        assert pagamento.preview_chave.endswith('.webp')
+
+def test_migrate_falha_com_duplicatas_de_indice_unico(banco, capsys):
+    from sqlalchemy import text
+    from src.models.pedido import Pedido
+    with banco.app_context():
+        db.session.execute(text('DROP INDEX uq_pedidos_usuario_pendente'))
+        user = _usuario()
+        for _ in range(2):
+            db.session.add(Pedido(usuario_id=user.id, total_camisas=1, valor_total=290, preco_unitario=290,
+                                  camisas_json='{"M": 1}', status='pendente'))
+        db.session.commit()
+        usuario_id = user.id
+        capsys.readouterr()
+    
+    with pytest.raises(SystemExit) as erro:
+        manage.migrate()
+    
+    assert 'uq_pedidos_usuario_pendente' in str(erro.value)
+    saida = capsys.readouterr().out
+    assert 'Índice único uq_pedidos_usuario_pendente não criado' in saida
+    assert f'{usuario_id}: 2 linhas' in saida
+    assert 'Migração concluída!' not in saida
+
+def test_migrate_cria_a_linha_de_contadores(banco):
+    from src.models.dashboard import DashboardCounters
+    from src.utils.dashboard_counters import COUNTERS_ID, registrar_usuario
+    with banco.app_context():
+        assert db.session.get(DashboardCounters, COUNTERS_ID) is not None
+        # Escritas antes da primeira leitura do painel já são contadas
+        registrar_usuario(_usuario())
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(DashboardCounters, COUNTERS_ID).usuarios_saldanha == 1
+
+def test_migrate_move_comprovantes_legados(banco, tmp_path, monkeypatch):
+    from src.models.pagamento import Pagamento
+    from src.models.pedido import Pedido
+    from src.utils.storage import backend
+    legado = tmp_path / 'legado'
+    legado.mkdir()
+    (legado / '1_1_20260101_120000_pix.pdf').write_bytes(b'%PDF-1.4 comprovante antigo')
+    monkeypatch.setenv('COMPROVANTES_LEGADOS', str(legado))
+    with banco.app_context():
+        user = _usuario()
+        pedido = Pedido(usuario_id=user.id, total_camisas=1, valor_total=290, preco_unitario=290,
+                        camisas_json='{"M": 1}')
+        db.session.add(pedido)
+        db.session.flush()
+        pagamento = Pagamento(pedido_id=pedido.id, usuario_id=user.id, metodo_pagamento='pix', valor=290,
+                              comprovante_filename='1_1_20260101_120000_pix.pdf')
+        db.session.add(pagamento)
+        db.session.commit()
+        pagamento_id = pagamento.id
+    
+    manage.migrate()
+    
+    with banco.app_context():
+        pagamento = db.session.get(Pagamento, pagamento_id)
+        assert pagamento.comprovante_chave.endswith('.pdf')
+        assert pagamento.comprovante_content_type == 'application/pdf'
+        assert pagamento.preview_status == 'pendente'
+        with backend().abrir(pagamento.comprovante_chave) as arquivo:
+            assert arquivo.read() == b'%PDF-1.4 comprovante antigo'
@@ -0,0 +1,93 @@
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.mesa import Mesa
+
+def _reservar(client, headers, numero):
+    mesa = {'VIP-01': ('VIP', 8, 'Frente do palco'), 'S-01': ('Standard', 12, 'Área geral')}[numero]
+    return client.post('/api/reservas', headers=headers, json={
+        'mesa_numero': numero, 'mesa_tipo': mesa[0], 'mesa_capacidade': mesa[1], 'mesa_localizacao': mesa[2]
+    })
+
+def test_versao_avanca_por_mesa(app, client, criar_usuario):
+    _, headers = criar_usuario()
+    _, outro = criar_usuario()
+    inicial = client.get('/api/mesas', headers=headers)
+    versao = inicial.json['versao']
+    assert client.get('/api/mesas', headers={**headers, 'If-None-Match': inicial.headers['ETag']}).status_code == 304
+    
+    assert _reservar(client, headers, 'VIP-01').status_code == 201
+    assert _reservar(client, outro, 'S-01').status_code == 201
+    
+    parcial = client.get(f'/api/mesas?since={versao}', headers=headers).json
+    assert parcial['versao'] == versao + 2
+    assert [(mesa['numero'], mesa['status']) for mesa in parcial['mesas']] == [
+        ('VIP-01', 'reservada'), ('S-01', 'reservada')
+    ]
+    assert client.get(f"/api/mesas?since={parcial['versao']}", headers=headers).json['mesas'] == []
+
+def test_mesa_inexistente(client, criar_usuario):
+    _, headers = criar_usuario()
+    resposta = client.post('/api/reservas', headers=headers, json={
+        'mesa_numero': 'X-99', 'mesa_tipo': 'VIP', 'mesa_capacidade': 8, 'mesa_localizacao': 'Frente do palco'
+    })
+    assert resposta.status_code == 404
+
+def test_migrate_preenche_versao_nula(tmp_path, monkeypatch):
+    from src import manage
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'legado.db'}")
+    monkeypatch.setattr(manage, '_app', None)
+    with manage.obter_app().app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE mesas (numero VARCHAR(20) PRIMARY KEY, tipo VARCHAR(20) NOT NULL, '
+                'capacidade INTEGER NOT NULL, localizacao VARCHAR(100) NOT NULL, ordem INTEGER NOT NULL, versao INTEGER)'
+            ))
+            conn.execute(text("INSERT INTO mesas VALUES ('VIP-01', 'VIP', 8, 'Frente do palco', 0, NULL)"))
+    
+    manage.migrate()
+    
+    with manage.obter_app().app_context():
+        assert db.session.get(Mesa, 'VIP-01').versao == 0
+        assert Mesa.query.filter(Mesa.versao.is_(None)).count() == 0
+        db.session.remove()
+        db.engine.dispose()
+
+def test_long_poll_acima_do_limite_responde_503(client, criar_usuario, monkeypatch):
+    import threading
+    from src.utils import disponibilidade
+    monkeypatch.setattr(disponibilidade, '_vagas_espera', threading.BoundedSemaphore(1))
+    _, headers = criar_usuario()
+    
+    disponibilidade._vagas_espera.acquire()  # vaga única ocupada por outro long-poll
+    try:
+        resposta = client.get('/api/mesas?since=0&wait=1', headers=headers)
+        assert resposta.status_code == 503
+        assert resposta.headers['Retry-After'] == '2'
+    finally:
+        disponibilidade._vagas_espera.release()
+    
+    assert client.get('/api/mesas?since=999999&wait=0.1', headers=headers).status_code == 200
+
+def test_stream_acima_do_limite_responde_503(client, admin_headers, monkeypatch):
+    from src.utils.eventos import broker
+    monkeypatch.setattr(broker, 'max_assinantes', 0)
+    resposta = client.get('/admin/dashboard/stream', headers=admin_headers)
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == '5'
+    assert broker.stats()['recusados'] >= 1
+
+def test_falha_ao_avancar_versao_nao_desfaz_a_reserva(app, client, criar_usuario):
+    from src.models.mesa import MesasVersao
+    from src.models.reserva import Reserva
+    _, headers = criar_usuario()
+    with app.app_context():
+        MesasVersao.query.delete()
+        db.session.commit()
+    
+    resposta = _reservar(client, headers, 'VIP-01')
+    assert resposta.status_code == 201
+    reserva_id = resposta.json['reserva']['id']
+    assert client.post(f'/api/reservas/{reserva_id}/cancelar', headers=headers).status_code == 200
+    with app.app_context():
+        assert db.session.get(Reserva, reserva_id).status == 'cancelada'
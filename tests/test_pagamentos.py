@@ -0,0 +1,105 @@
+from src.models.user import db
+from src.models.pagamento import Pagamento
+from src.models.pedido import Pedido
+from src.utils.dashboard_counters import calcular_contadores, obter_contadores, reconstruir_contadores
+
+def _pedido_com_pagamento(usuario_id, status_pedido='pendente', status_pagamento='pendente'):
+    pedido = Pedido(usuario_id=usuario_id, total_camisas=1, valor_total=290, preco_unitario=290,
+                    camisas_json='{"M": 1}', status=status_pedido)
+    db.session.add(pedido)
+    db.session.flush()
+    pagamento = Pagamento(pedido_id=pedido.id, usuario_id=usuario_id, metodo_pagamento='pix',
+                          valor=290, status=status_pagamento)
+    db.session.add(pagamento)
+    db.session.flush()
+    return pedido.id, pagamento.id
+
+def test_confirmacao_em_lote(app, client, criar_usuario, admin_headers):
+    ids_usuarios = [criar_usuario()[0] for _ in range(3)]
+    with app.app_context():
+        pendente = _pedido_com_pagamento(ids_usuarios[0])
+        cancelado = _pedido_com_pagamento(ids_usuarios[1], status_pedido='cancelado')
+        processado = _pedido_com_pagamento(ids_usuarios[2], 'pago', 'confirmado')
+        db.session.commit()
+        reconstruir_contadores()
+    
+    resposta = client.post('/api/admin/pagamentos/confirmar-lote', headers=admin_headers,
+                           json={'ids': [pendente[1], cancelado[1], processado[1], 9999]})
+    assert resposta.status_code == 200
+    assert resposta.json['resultados'] == [
+        {'id': pendente[1], 'resultado': 'confirmado', 'pedido_id': pendente[0], 'pedido': 'pago'},
+        {'id': cancelado[1], 'resultado': 'confirmado', 'pedido_id': cancelado[0], 'pedido': 'ignorado'},
+        {'id': processado[1], 'resultado': 'ja_processado', 'status': 'confirmado'},
+        {'id': 9999, 'resultado': 'nao_encontrado'},
+    ]
+    assert resposta.json['resumo'] == {
+        'confirmados': 2, 'ja_processados': 1, 'nao_encontrados': 1,
+        'pedidos_pagos': 1, 'pedidos_ignorados': [cancelado[0]]
+    }
+    
+    with app.app_context():
+        assert db.session.get(Pedido, pendente[0]).status == 'pago'
+        assert db.session.get(Pedido, cancelado[0]).status == 'cancelado'
+        contadores = obter_contadores()
+        esperado = calcular_contadores()
+        assert {coluna: getattr(contadores, coluna) for coluna in esperado} == esperado
+
+def test_lote_invalido(client, admin_headers):
+    for corpo in ({}, {'ids': []}, {'ids': ['1']}, {'ids': list(range(1001))}):
+        assert client.post('/api/admin/pagamentos/confirmar-lote', headers=admin_headers,
+                           json=corpo).status_code == 400
+
+def test_confirmacao_individual_so_paga_pedido_pendente(app, client, criar_usuario):
+    usuario_id, headers = criar_usuario()
+    outro_id, _ = criar_usuario()
+    with app.app_context():
+        cancelado = _pedido_com_pagamento(usuario_id, status_pedido='cancelado')
+        pendente = _pedido_com_pagamento(outro_id)
+        db.session.commit()
+        reconstruir_contadores()
+    
+    resposta = client.post(f'/api/admin/pagamentos/{cancelado[1]}/confirmar', headers=headers)
+    assert resposta.status_code == 400
+    assert client.post(f'/api/admin/pagamentos/{pendente[1]}/confirmar', headers=headers).status_code == 200
+    
+    with app.app_context():
+        assert db.session.get(Pagamento, cancelado[1]).status == 'pendente'
+        assert db.session.get(Pedido, cancelado[0]).status == 'cancelado'
+        assert db.session.get(Pedido, pendente[0]).status == 'pago'
+        contadores = obter_contadores()
+        esperado = calcular_contadores()
+        assert {coluna: getattr(contadores, coluna) for coluna in esperado} == esperado
+
+def test_lote_audita_com_acao_padrao(app, client, criar_usuario, admin_headers):
+    from src.models.admin import AuditLog
+    usuario_id, _ = criar_usuario()
+    with app.app_context():
+        _, pagamento_id = _pedido_com_pagamento(usuario_id)
+        db.session.commit()
+    
+    client.post('/api/admin/pagamentos/confirmar-lote', headers=admin_headers, json={'ids': [pagamento_id]})
+    with app.app_context():
+        assert [log.acao for log in AuditLog.query.all()] == ['CONFIRM_PAGAMENTOS_LOTE']
+
+def test_comprovante_revalidado_com_304(app, client, criar_usuario, tmp_path, monkeypatch):
+    import io
+    import src.utils.storage as storage
+    monkeypatch.setenv('STORAGE_ROOT', str(tmp_path / 'storage'))
+    monkeypatch.setattr(storage, '_backend', None)
+    usuario_id, headers = criar_usuario()
+    with app.app_context():
+        _, pagamento_id = _pedido_com_pagamento(usuario_id)
+        arquivo = storage.armazenar(io.BytesIO(b'%PDF-1.4 comprovante'), 'pdf')
+        pagamento = db.session.get(Pagamento, pagamento_id)
+        pagamento.comprovante_chave = arquivo.chave
+        pagamento.comprovante_content_type = arquivo.content_type
+        db.session.commit()
+    
+    resposta = client.get(f'/api/pagamentos/{pagamento_id}/comprovante', headers=headers)
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] == f'"{arquivo.sha256}"'
+    
+    revalidacao = client.get(f'/api/pagamentos/{pagamento_id}/comprovante',
+                             headers={**headers, 'If-None-Match': resposta.headers['ETag']})
+    assert revalidacao.status_code == 304
+    assert revalidacao.data == b''
@@ -0,0 +1,15 @@
+from werkzeug.security import generate_password_hash
+
+from src.utils import password_hashing
+from src.utils.password_hashing import precisa_rehash
+
+def test_metodo_abreviado_nao_forca_rehash(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'HASH_METHOD', 'pbkdf2')
+    assert not precisa_rehash(generate_password_hash('segredo', 'pbkdf2'))
+    assert not precisa_rehash(generate_password_hash('segredo', 'pbkdf2:sha256'))
+    assert precisa_rehash(generate_password_hash('segredo', 'pbkdf2:sha256:1000'))
+    assert precisa_rehash(generate_password_hash('segredo', 'scrypt'))
+    
+    monkeypatch.setattr(password_hashing, 'HASH_METHOD', 'scrypt')
+    assert not precisa_rehash(generate_password_hash('segredo', 'scrypt:32768:8:1'))
+    assert precisa_rehash(generate_password_hash('segredo', 'scrypt:16384:8:1'))
@@ -0,0 +1,151 @@
+from src.models.user import db
+from src.models.pedido import Pedido
+from src.utils.dashboard_counters import calcular_contadores, obter_contadores, reconstruir_contadores
+
+def _pedido(usuario_id, status='pendente', valor=290):
+    pedido = Pedido(usuario_id=usuario_id, total_camisas=1, valor_total=valor, preco_unitario=valor,
+                    camisas_json='{"M": 1}', status=status)
+    db.session.add(pedido)
+    db.session.flush()
+    return pedido.id
+
+def _contadores_batem():
+    contadores = obter_contadores()
+    esperado = calcular_contadores()
+    return {coluna: getattr(contadores, coluna) for coluna in esperado} == esperado
+
+def test_admin_nao_cria_segundo_pedido_pendente(app, client, criar_usuario, admin_headers):
+    usuario_id, _ = criar_usuario()
+    with app.app_context():
+        _pedido(usuario_id)
+        cancelado = _pedido(usuario_id, 'cancelado')
+        db.session.commit()
+        reconstruir_contadores()
+    
+    resposta = client.post(f'/admin/dashboard/pedido/{cancelado}/update-status', headers=admin_headers,
+                           json={'status': 'pendente'})
+    assert resposta.status_code == 400
+    assert resposta.json['error'] == 'O usuário já possui um pedido pendente'
+    with app.app_context():
+        assert db.session.get(Pedido, cancelado).status == 'cancelado'
+        assert _contadores_batem()
+
+def test_status_em_lote_informa_status_anterior(app, client, criar_usuario, admin_headers):
+    usuarios = [criar_usuario()[0] for _ in range(3)]
+    with app.app_context():
+        ids = {
+            'pendente': _pedido(usuarios[0], 'pendente', 145),
+            'pago': _pedido(usuarios[1], 'pago', 290),
+            'cancelado': _pedido(usuarios[2], 'cancelado'),
+        }
+        db.session.commit()
+        reconstruir_contadores()
+    
+    resposta = client.post('/admin/dashboard/pedidos/status-lote', headers=admin_headers,
+                           json={'status': 'cancelado', 'ids': list(ids.values())})
+    assert resposta.status_code == 200
+    assert resposta.json['pedidos'] == [
+        {'id': ids['pendente'], 'status_anterior': 'pendente'},
+        {'id': ids['pago'], 'status_anterior': 'pago'},
+    ]
+    with app.app_context():
+        assert _contadores_batem()
+        assert obter_contadores().receita_total == 0
+
+PEDIDO = {'camisas': {'M': 1}, 'total_camisas': 1, 'valor_total': 290}
+
+def test_indice_parcial_de_pedido_pendente(app, client, criar_usuario, dentro_do_prazo):
+    _, headers = criar_usuario()
+    primeiro = client.post('/api/pedidos', headers=headers, json=PEDIDO)
+    assert primeiro.status_code == 201
+    
+    segundo = client.post('/api/pedidos', headers=headers, json=PEDIDO)
+    assert segundo.status_code == 400
+    assert segundo.json['error'] == 'Você já possui um pedido pendente'
+    
+    # O índice cobre só os pendentes: cancelado o primeiro, um novo é aceito
+    pedido_id = primeiro.json['pedido']['id']
+    assert client.post(f'/api/pedidos/{pedido_id}/cancelar', headers=headers).status_code == 200
+    assert client.post('/api/pedidos', headers=headers, json=PEDIDO).status_code == 201
+    with app.app_context():
+        assert _contadores_batem()
+
+def test_idempotency_key_repete_a_resposta(app, client, criar_usuario, dentro_do_prazo):
+    _, headers = criar_usuario()
+    headers = {**headers, 'Idempotency-Key': 'pedido-1'}
+    original = client.post('/api/pedidos', headers=headers, json=PEDIDO)
+    assert original.status_code == 201
+    
+    repetida = client.post('/api/pedidos', headers=headers, json=PEDIDO)
+    assert repetida.status_code == 201
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+    assert repetida.json == original.json
+    
+    outra = client.post('/api/pedidos', headers=headers, json={**PEDIDO, 'camisas': {'G': 1}})
+    assert outra.status_code == 422
+    with app.app_context():
+        assert Pedido.query.count() == 1
+
+def test_cursor_invalido_responde_400(client, admin_headers):
+    for listagem in ('usuarios', 'pedidos', 'reservas', 'logs'):
+        resposta = client.get(f'/admin/dashboard/{listagem}?cursor=nao-e-um-cursor', headers=admin_headers)
+        assert resposta.status_code == 400, listagem
+        assert resposta.json['error'] == 'Cursor inválido'
+
+def test_lote_por_filtro_vai_em_partes(app, client, criar_usuario, admin_headers, monkeypatch):
+    import src.routes.admin_dashboard as admin_dashboard
+    from src.utils import eventos
+    monkeypatch.setattr(admin_dashboard, 'MAX_LOTE', 2)
+    usuarios = [criar_usuario()[0] for _ in range(3)]
+    with app.app_context():
+        pedidos = [_pedido(usuario_id) for usuario_id in usuarios]
+        db.session.commit()
+        reconstruir_contadores()
+    
+    fila = eventos.broker.assinar()
+    try:
+        corpo = {'status': 'cancelado', 'filtros': {'status': 'pendente'}}
+        primeira = client.post('/admin/dashboard/pedidos/status-lote', headers=admin_headers, json=corpo).json
+        assert [pedido['id'] for pedido in primeira['pedidos']] == pedidos[:2]
+        assert primeira['continua'] is True
+        
+        segunda = client.post('/admin/dashboard/pedidos/status-lote', headers=admin_headers, json=corpo).json
+        assert [pedido['id'] for pedido in segunda['pedidos']] == pedidos[2:]
+        assert segunda['continua'] is False
+        
+        evento = fila.get_nowait()
+        assert evento['tipo'] == 'pedido.status_lote'
+        assert evento['dados']['ids'] == pedidos[:2]
+    finally:
+        eventos.broker.cancelar(fila)
+    with app.app_context():
+        assert _contadores_batem()
+
+def test_lote_com_data_invalida(client, admin_headers):
+    resposta = client.post('/admin/dashboard/pedidos/status-lote', headers=admin_headers,
+                           json={'status': 'cancelado', 'filtros': {'criado_antes': '10/06/2026'}})
+    assert resposta.status_code == 400
+    assert resposta.json['error'] == '"criado_antes" deve estar no formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS'
+
+def test_chave_abandonada_em_processamento_e_assumida(app, client, criar_usuario, dentro_do_prazo):
+    import hashlib
+    import json
+    from datetime import datetime, timedelta
+    from src.models.idempotencia import IdempotencyKey
+    usuario_id, headers = criar_usuario()
+    corpo = json.dumps(PEDIDO)
+    
+    # Worker que morreu no meio da requisição original
+    with app.app_context():
+        db.session.add(IdempotencyKey(
+            usuario_id=usuario_id, chave='pedido-1', rota='/api/pedidos', status='processando',
+            fingerprint=hashlib.sha256(b'\n'.join([b'POST', b'/api/pedidos', corpo.encode()])).hexdigest(),
+            created_at=datetime.utcnow() - timedelta(minutes=5)
+        ))
+        db.session.commit()
+    
+    resposta = client.post('/api/pedidos', headers={**headers, 'Idempotency-Key': 'pedido-1'},
+                           data=corpo, content_type='application/json')
+    assert resposta.status_code == 201
+    with app.app_context():
+        assert IdempotencyKey.query.one().status == 'concluido'
@@ -0,0 +1,12 @@
+from src import manage
+
+def test_uma_mesa_disputada_tem_um_unico_vencedor(tmp_path):
+    resultado = manage.executar_loadtest_reservas(
+        f"sqlite:///{tmp_path / 'carga.db'}", requisicoes=60, mesas_alvo=1, threads=30
+    )
+    
+    (mesa,) = resultado['mesas']
+    assert resultado['por_mesa'] == {mesa: 1}
+    assert resultado['status'].count(201) == 1
+    # Os perdedores recebem "Mesa já está reservada", nunca um erro interno
+    assert set(resultado['status']) == {201, 400}
@@ -0,0 +1,53 @@
+from flask import Flask, jsonify
+
+from src import manage
+from src.utils.cache import microcache, public_cache
+
+def test_microcache_serve_bytes_e_headers_guardados():
+    app = Flask(__name__)
+    chamadas = []
+    
+    @app.route('/publico')
+    @microcache(ttl=60)
+    def publico():
+        chamadas.append(1)
+        return jsonify({'chamada': len(chamadas)})
+    
+    client = app.test_client()
+    primeira = client.get('/publico')
+    segunda = client.get('/publico')
+    
+    assert len(chamadas) == 1
+    assert segunda.get_data() == primeira.get_data()
+    assert segunda.headers['Cache-Control'] == 'public, max-age=60'
+    assert segunda.headers['Content-Type'] == 'application/json'
+    assert 'Accept-Encoding' in segunda.headers['Vary']
+
+def test_microcache_nao_guarda_erros():
+    app = Flask(__name__)
+    chamadas = []
+    
+    @app.route('/falha')
+    @microcache(ttl=60)
+    def falha():
+        chamadas.append(1)
+        return jsonify({'error': 'indisponível'}), 503
+    
+    client = app.test_client()
+    assert client.get('/falha').status_code == 503
+    assert client.get('/falha').status_code == 503
+    assert len(chamadas) == 2
+
+def test_benchmark_preserva_ttl_global(capsys):
+    ttl = public_cache.ttl
+    manage.benchmark_status(requisicoes=20)
+    assert public_cache.ttl == ttl
+    assert '/status' in capsys.readouterr().out
+
+def test_preco_por_idade_com_etag(client):
+    resposta = client.get('/status/preco/30')
+    assert resposta.status_code == 200
+    assert resposta.json['preco']['preco'] == 290.0
+    
+    revalidacao = client.get('/status/preco/30', headers={'If-None-Match': resposta.headers['ETag']})
+    assert revalidacao.status_code == 304